@@ -4,42 +4,70 @@ import os
 import signal
 import traceback
 from apscheduler.schedulers.blocking import BlockingScheduler
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from scheduler.config_utils import ConfigUtils
 from scheduler.check import check_required_sections, check_required_options, check_impala_health
 from scheduler.scheduler import Scheduler
-from scheduler.constants import ScheduleSectOpts, ReportSectOpts, EmailSectOpts, QUERY_DATA_SAVE_PATH_PREFIX
+from scheduler.constants import ScheduleSectOpts, ReportSectOpts, EmailSectOpts, PoolSectOpts, \
+    QUERY_DATA_SAVE_PATH_PREFIX, DEFAULT_FETCH_QUERIES_PAGE_SIZE, DEFAULT_QUEUE_MONITOR_INTERVAL_SECONDS, \
+    DEFAULT_QUEUE_MONITOR_WINDOW_MINUTES, DEFAULT_ENABLE_METRICS, DEFAULT_METRICS_HOST, DEFAULT_METRICS_PORT
 from scheduler.settings import SCHEDULER_CONFIG_PATH, LOGGING_CONFIG_PATH, PID_FILE_PATH, LOG_FILE_PATH
-from scheduler.global_utils import send_monitor_report, clean_expired_files
+from scheduler.global_utils import send_monitor_report, clean_expired_files, create_query_window, \
+    create_pool_stat_partials, create_demand_forecast, create_allocation_damper, create_context_cache, \
+    create_queue_monitor, create_cycle_profiler, get_cloudera_manager_config
+from scheduler.cloudera_manager import ClouderaManager
+from scheduler.query_ingester import create_query_ingester
+from scheduler.metrics import start_metrics_server
+from scheduler.schedule_context import ScheduleContext
 
 logging.config.dictConfig(ConfigUtils.read(LOGGING_CONFIG_PATH))
 LOGGER = logging.getLogger(__name__)
 
 
-def memory_scheduling_job(scheduler_config):
+def memory_scheduling_job(scheduler_config, query_window=None, pool_stat_partials=None, demand_forecast=None,
+                          allocation_damper=None, context_cache=None, query_ingester=None):
     """
     A job for scheduling impala memory.
     Once check exception occurred, scheduler will be stop and whether to send an email based
     on current report configuration item [enable_monitor_report].
 
+    The checks and the scheduling share one context of cycle, so the impala configuration is fetched once.
+
     Firstly, check scheduler configuration for compliance.
     Secondly, check health of impala cluster.
     Thirdly, schedule impala memory according the fetched query information.
     Fourthly, clean the fetched query information that have expired.
 
     :param scheduler_config: (dict) scheduler configuration in ../conf/scheduler.yml.
+    :param query_window: (QueryWindow) The window of recent queries for incremental fetching.
+    :param pool_stat_partials: (PoolStatPartials) The cached partial statistics of pools.
+    :param demand_forecast: (DemandForecast) The demand forecast of pools.
+    :param allocation_damper: (AllocationDamper) The damper of the allocated memory of pools.
+    :param context_cache: (TtlCache) The cache of rarely changing data across the cycles.
+    :param query_ingester: (QueryIngester) The background query ingester.
     """
     try:
         check_required_sections(scheduler_config)
 
-        check_required_options(scheduler_config)
+        if query_ingester is not None and query_ingester.ingested_time is None:
+            LOGGER.warning("skip current scheduling, because no query information is ingested yet.")
+            return
+        if query_ingester is not None and query_ingester.is_stale():
+            LOGGER.warning("skip current scheduling, because query information is not ingested since %s.",
+                           query_ingester.ingested_time)
+            return
 
-        if not check_impala_health(scheduler_config):
+        context = ScheduleContext(scheduler_config, context_cache)
+        check_required_options(scheduler_config, context)
+
+        if not check_impala_health(scheduler_config, context):
             LOGGER.warning("skip current scheduling, because of impala unhealthy.")
             return
 
-        Scheduler.execute_schedule(scheduler_config)
+        Scheduler.execute_schedule(scheduler_config, query_window, pool_stat_partials,
+                                   demand_forecast=demand_forecast, allocation_damper=allocation_damper,
+                                   context=context, query_ingester=query_ingester)
 
         clean_expired_files(LOG_FILE_PATH, QUERY_DATA_SAVE_PATH_PREFIX)
     except Exception:
@@ -56,10 +84,47 @@ def memory_scheduling_job(scheduler_config):
         stop()
 
 
-def start():
+def queue_monitor_job(scheduler_config, queue_monitor, job_args, scheduling_job=memory_scheduling_job):
+    """
+    A job for monitoring the admission wait of pools between the scheduling, which runs an out-of-band
+    memory_scheduling_job once the admission wait of a pool in the recent queries crosses the threshold
+    [queue_monitor_wait_threshold_seconds]. Only one page of queries is fetched without the query details,
+    and nothing is fetched within [queue_monitor_min_spacing_minutes] after the last scheduling.
+
+    :param scheduler_config: (dict) scheduler configuration in ../conf/scheduler.yml.
+    :param queue_monitor: (QueueMonitor) The queue monitor.
+    :param job_args: (list) The arguments of memory_scheduling_job.
+    :param scheduling_job: (function) The memory_scheduling_job, or it wrapped by the cycle profiler.
+    """
+    try:
+        now = datetime.now()
+        if not queue_monitor.is_due(now):
+            return
+
+        section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+        window_minutes = section_schedule.get(ScheduleSectOpts.OPT_QUEUE_MONITOR_WINDOW_MINUTES,
+                                              DEFAULT_QUEUE_MONITOR_WINDOW_MINUTES)
+        cloudera_manager = ClouderaManager(*get_cloudera_manager_config(scheduler_config))
+        pools_wait_secs = cloudera_manager.get_pools_admission_wait_secs(
+            now - timedelta(minutes=window_minutes), now, section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_FILTER],
+            section_schedule.get(ScheduleSectOpts.OPT_FETCH_QUERIES_PAGE_SIZE, DEFAULT_FETCH_QUERIES_PAGE_SIZE))
+        spiking_pools = queue_monitor.get_spiking_pools(pools_wait_secs, list(scheduler_config[PoolSectOpts.SECT_POOL]))
+        if not spiking_pools:
+            return
+
+        LOGGER.info("pools %s are queueing, trigger out-of-band scheduling.", spiking_pools)
+        queue_monitor.run_cycle(scheduling_job, job_args, out_of_band=True, now=now)
+    except Exception:
+        LOGGER.error("fail to execute queue monitor job.\n %s" % traceback.format_exc())
+
+
+def start(profile=False):
     """
     Start the scheduler in the foreground. The scheduler will execute immediately and every
     [schedule_interval_minutes] minutes thereafter.
+
+    :param profile: (bool) Whether the scheduling cycles are profiled regardless of the configuration item
+        [enable_cycle_profiling].
     """
     if os.path.exists(PID_FILE_PATH):
         with open(PID_FILE_PATH, "r") as f_pid:
@@ -73,18 +138,52 @@ def start():
         f_pid.write("%s\n" % pid)
 
     scheduler_config = ConfigUtils.read(SCHEDULER_CONFIG_PATH)
-    minutes = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE][ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES]
+    section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+    minutes = section_schedule[ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES]
+    if section_schedule.get(ScheduleSectOpts.OPT_ENABLE_METRICS, DEFAULT_ENABLE_METRICS):
+        start_metrics_server(section_schedule.get(ScheduleSectOpts.OPT_METRICS_HOST, DEFAULT_METRICS_HOST),
+                             section_schedule.get(ScheduleSectOpts.OPT_METRICS_PORT, DEFAULT_METRICS_PORT))
+    query_ingester = create_query_ingester(scheduler_config)
+    # the ingester keeps the window of recent queries instead of the scheduling
+    query_window = create_query_window(section_schedule) if query_ingester is None else None
+    pool_stat_partials = create_pool_stat_partials(section_schedule)
+    demand_forecast = create_demand_forecast(section_schedule)
+    allocation_damper = create_allocation_damper(section_schedule)
+    context_cache = create_context_cache(section_schedule)
+    queue_monitor = create_queue_monitor(section_schedule)
+    cycle_profiler = create_cycle_profiler(section_schedule, profile)
+    scheduling_job = memory_scheduling_job if cycle_profiler is None else cycle_profiler.wrap(memory_scheduling_job)
+    job_args = [scheduler_config, query_window, pool_stat_partials, demand_forecast, allocation_damper,
+                context_cache, query_ingester]
+    if query_ingester is not None and not query_ingester.start():
+        LOGGER.warning("the first ingestion of query information is not done, the scheduling waits for it.")
 
     scheduler = BlockingScheduler()
-    scheduler.add_job(memory_scheduling_job, trigger='interval', args=[scheduler_config],
-                      minutes=minutes, next_run_time=datetime.now())
-    scheduler.start()
+    if queue_monitor is None:
+        scheduler.add_job(scheduling_job, trigger='interval', args=job_args,
+                          minutes=minutes, next_run_time=datetime.now())
+    else:
+        # the regular and the out-of-band scheduling run exclusively through the queue monitor
+        scheduler.add_job(queue_monitor.run_cycle, trigger='interval', args=[scheduling_job, job_args],
+                          minutes=minutes, next_run_time=datetime.now())
+        scheduler.add_job(queue_monitor_job, trigger='interval',
+                          args=[scheduler_config, queue_monitor, job_args, scheduling_job],
+                          seconds=section_schedule.get(ScheduleSectOpts.OPT_QUEUE_MONITOR_INTERVAL_SECONDS,
+                                                       DEFAULT_QUEUE_MONITOR_INTERVAL_SECONDS))
+    try:
+        scheduler.start()
+    finally:
+        if cycle_profiler is not None:
+            cycle_profiler.close()
 
 
-def start_with_daemon():
+def start_with_daemon(profile=False):
     """
     Start the scheduler in the background. The scheduler will execute immediately and every
     [schedule_interval_minutes] minutes thereafter.
+
+    :param profile: (bool) Whether the scheduling cycles are profiled regardless of the configuration item
+        [enable_cycle_profiling].
     """
     try:
         pid = os.fork()
@@ -97,7 +196,7 @@ def start_with_daemon():
     os.setsid()
     os.umask(0)
 
-    start()
+    start(profile)
 
 
 def stop():
@@ -125,19 +224,21 @@ def stop():
 
 if __name__ == "__main__":
 
-    if len(sys.argv) == 2:
+    if len(sys.argv) == 2 or (len(sys.argv) == 3 and sys.argv[1] in ("start", "restart")
+                              and "--profile" == sys.argv[2]):
+        profile = len(sys.argv) == 3
         if "start" == sys.argv[1]:
-            start_with_daemon()
+            start_with_daemon(profile)
         elif "stop" == sys.argv[1]:
             stop()
         elif "restart" == sys.argv[1]:
             stop()
-            start_with_daemon()
+            start_with_daemon(profile)
         else:
             sys.exit("Unknown command: %s" % sys.argv[1:])
         print("%s successfully" % sys.argv[1])
     else:
-        print("usage: %s start|stop|restart" % sys.argv[0])
+        print("usage: %s start|stop|restart [--profile]" % sys.argv[0])
         sys.exit(1)
 
     sys.exit(0)
@@ -1,3 +1,3 @@
 #!/bin/sh
 
-python3 $SCHEDULER_HOME/bin/scheduler_daemon.py $1
\ No newline at end of file
+python3 $SCHEDULER_HOME/bin/scheduler_daemon.py "$@"
\ No newline at end of file
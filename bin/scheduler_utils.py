@@ -1,13 +1,22 @@
 import logging
 import json
 import sys
+from datetime import datetime, timedelta
 
+from scheduler.backtest import backtest_strategies, STATIC_STRATEGY, STRATEGY_DELIMITER
 from scheduler.check import check_required_options
 from scheduler.cloudera_manager import ClouderaManager
 from scheduler.global_utils import get_cloudera_manager_config
 from scheduler.config_utils import ConfigUtils
-from scheduler.settings import SCHEDULER_CONFIG_PATH, LOGGING_CONFIG_PATH, IMPALA_CONFIG_BACKUP_PATH
+from scheduler.settings import SCHEDULER_CONFIG_PATH, LOGGING_CONFIG_PATH, IMPALA_CONFIG_BACKUP_PATH, \
+    QUERY_HISTORY_PATH
 from scheduler.impala_pool_config import ImpalaScheduledAllocations
+from scheduler.constants import ScheduleSectOpts, DEFAULT_QUERY_HISTORY_RETENTION_DAYS
+from scheduler.query_history import QueryHistory
+from scheduler.query_source import ReplaySource
+from scheduler.scheduler import Scheduler
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 logging.config.dictConfig(ConfigUtils.read(LOGGING_CONFIG_PATH))
 LOGGER = logging.getLogger(__name__)
@@ -46,6 +55,59 @@ def rollback_impala_config(scheduler_config):
     LOGGER.info("rollback impala config success")
 
 
+def replay_schedule(scheduler_config, start_time, end_time):
+    """
+    Replay the scheduling against the query history and the backup impala configuration, without
+    touching cloudera manager.
+
+    :param scheduler_config: (dict) scheduler configuration in ../conf/scheduler.yml.
+    :param start_time: (datetime) The start time of replay.
+    :param end_time: (datetime) The end time of replay.
+    """
+    section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+    query_history = QueryHistory(QUERY_HISTORY_PATH, section_schedule.get(
+        ScheduleSectOpts.OPT_QUERY_HISTORY_RETENTION_DAYS, DEFAULT_QUERY_HISTORY_RETENTION_DAYS))
+    with open(IMPALA_CONFIG_BACKUP_PATH, "r") as f:
+        impala_config_json = json.load(f)
+
+    replay_source = ReplaySource(query_history, impala_config_json, start_time,
+                                 section_schedule[ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES])
+    Scheduler.replay_schedule(scheduler_config, replay_source, end_time)
+
+    LOGGER.info("replay schedule success")
+
+
+def backtest_schedule(scheduler_config, start_time, end_time, strategies):
+    """
+    Backtest the scheduling strategies against the query history and the backup impala configuration, and
+    print the comparison table.
+
+    :param scheduler_config: (dict) scheduler configuration in ../conf/scheduler.yml.
+    :param start_time: (datetime) The start time of backtest.
+    :param end_time: (datetime) The end time of backtest.
+    :param strategies: (list) The strategies in format "module_name.py_name.class_name", empty means
+        "static" and the strategy in configuration.
+    """
+    section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+    if not strategies:
+        strategies = [STATIC_STRATEGY, STRATEGY_DELIMITER.join([
+            section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MODULE_NAME],
+            section_schedule[ScheduleSectOpts.OPT_SCHEDULE_PY_NAME],
+            section_schedule[ScheduleSectOpts.OPT_SCHEDULE_CLASS_NAME]])]
+    query_history = QueryHistory(QUERY_HISTORY_PATH, section_schedule.get(
+        ScheduleSectOpts.OPT_QUERY_HISTORY_RETENTION_DAYS, DEFAULT_QUERY_HISTORY_RETENTION_DAYS))
+    queries_info = query_history.read(start_time - timedelta(
+        minutes=section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_TIMEDELTA_MINUTES]), end_time)
+    if queries_info is None:
+        sys.exit("No query in history between %s ~ %s" % (start_time, end_time))
+    with open(IMPALA_CONFIG_BACKUP_PATH, "r") as f:
+        impala_config_json = json.load(f)
+
+    comparison = backtest_strategies(scheduler_config, strategies, queries_info, impala_config_json, start_time,
+                                     end_time)
+    print(comparison.to_string(index=False))
+
+
 if __name__ == "__main__":
     scheduler_config = ConfigUtils.read(SCHEDULER_CONFIG_PATH)
     if len(sys.argv) == 2:
@@ -58,6 +120,16 @@ if __name__ == "__main__":
         else:
             sys.exit("Unknown command")
         sys.exit(0)
+    elif len(sys.argv) == 4 and "replay" == sys.argv[1]:
+        replay_schedule(scheduler_config, datetime.strptime(sys.argv[2], TIME_FORMAT),
+                        datetime.strptime(sys.argv[3], TIME_FORMAT))
+        sys.exit(0)
+    elif len(sys.argv) >= 4 and "backtest" == sys.argv[1]:
+        backtest_schedule(scheduler_config, datetime.strptime(sys.argv[2], TIME_FORMAT),
+                          datetime.strptime(sys.argv[3], TIME_FORMAT), sys.argv[4:])
+        sys.exit(0)
     else:
-        print("usage: %s check|backup|rollback" % sys.argv[0])
+        print("usage: %s check|backup|rollback\n       %s replay \"start_time\" \"end_time\"\n"
+              "       %s backtest \"start_time\" \"end_time\" [module_name.py_name.class_name ...]" %
+              (sys.argv[0], sys.argv[0], sys.argv[0]))
         sys.exit(2)
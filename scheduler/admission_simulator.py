@@ -0,0 +1,333 @@
+from collections import deque
+import heapq
+import logging
+import numpy as np
+import pandas as pd
+
+from scheduler.base_schedule import get_demand_steps, get_percentile
+from scheduler.constants import FormativeQueryInfoColumn
+
+REJECTED_QUERY_STATE = "REJECTED"
+INFINITE_MILLI_SEC = np.iinfo(np.int64).max
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SimulatedPoolStat(object):
+    """
+    The SimulatedPoolStat class that provides encapsulation for the simulated admission statistics of the pool.
+    """
+    def __init__(self, pool_name, query_total=0, wait_query_total=0, rejected_query_total=0, wait_secs=0,
+                 wait_secs_p95=0, wait_secs_max=0):
+        """
+        Create a SimulatedPoolStat object.
+
+        :param pool_name: (str) The pool name.
+        :param query_total: (int) The total query number.
+        :param wait_query_total: (int) The number of queries that have been queued.
+        :param rejected_query_total: (int) The number of queries that have been rejected or timed out in queue.
+        :param wait_secs: (float) The total wait seconds of queries.
+        :param wait_secs_p95: (float) The 95th percentile of wait seconds of queries.
+        :param wait_secs_max: (float) The max wait seconds of queries.
+        """
+        self.pool_name = pool_name
+        self.query_total = query_total
+        self.wait_query_total = wait_query_total
+        self.rejected_query_total = rejected_query_total
+        self.wait_secs = wait_secs
+        self.wait_secs_p95 = wait_secs_p95
+        self.wait_secs_max = wait_secs_max
+
+    def __str__(self):
+        return "(SimulatedPoolStat: {pool_name:%s, query_total:%s, wait_query_total:%s, rejected_query_total:%s, " \
+               "wait_secs:%s, wait_secs_p95:%s, wait_secs_max:%s})" % \
+               (self.pool_name, self.query_total, self.wait_query_total, self.rejected_query_total,
+                self.wait_secs, self.wait_secs_p95, self.wait_secs_max)
+
+    __repr__ = __str__
+
+
+def get_naive_milli_sec(datetimes):
+    """
+    Convert the datetimes to milliseconds without time zone, which keeps the intervals between datetimes.
+
+    :param datetimes: (datetime or Series) The datetimes.
+    :return: (int or ndarray) The milliseconds.
+    """
+    if isinstance(datetimes, pd.Series):
+        return pd.to_datetime(datetimes).to_numpy().astype("datetime64[ms]").astype(np.int64)
+    return int(np.datetime64(datetimes, "ms").astype(np.int64))
+
+
+def simulate_pool_admission(arrival_milli_secs, run_milli_secs, used_mems, pool_mem, queue_timeout_milli_secs=None,
+                            pool_mem_changes=(), running=(), queued_number=0):
+    """
+    Simulate the admission of queries to one pool. The queries are admitted in FIFO order while the used
+    memory of admitted queries fits the pool memory, otherwise queued. A query that needs more memory than
+    the pool is rejected, and a query that has been queued longer than the queue timeout is rejected. The
+    pool memory may be changed at given milliseconds, the running queries are never preempted, and a queued
+    query that needs more memory than the shrunk pool is rejected when it reaches the head of queue, as impala
+    does on dequeue.
+
+    The simulation is driven by events in time order, the arrivals are sorted in advance, the ends of
+    running queries are kept in a heap, and only the head of queue can time out or be admitted, so each
+    query is handled in O(log n). If the peak concurrent memory of queries fits the pool memory, no query
+    is queued, the simulation is skipped.
+
+    The simulation can be resumed from a state, where the queries in running are admitted and the first
+    queued_number queries are queued, the other queries arrive after them.
+
+    :param arrival_milli_secs: (ndarray) The arrival milliseconds of queries, sorted.
+    :param run_milli_secs: (ndarray) The running milliseconds of queries.
+    :param used_mems: (ndarray) The used memory of queries.
+    :param pool_mem: (float) The memory of pool, None means unlimited.
+    :param queue_timeout_milli_secs: (int) The queue timeout milliseconds, None means never time out.
+    :param pool_mem_changes: (list) The sorted tuples that contains the milliseconds and the pool memory
+        since then.
+    :param running: (list) The tuples that contains the end milliseconds and the used memory of the queries
+        admitted before the simulation.
+    :param queued_number: (int) The number of queries queued before the simulation.
+    :return: (tuple) A tuple object that contains the wait milliseconds and whether queries are rejected.
+    """
+    query_total = arrival_milli_secs.shape[0]
+    wait_milli_secs = np.zeros(query_total, dtype=np.int64)
+    rejected = np.zeros(query_total, dtype=bool)
+    if pool_mem is None or query_total == 0:
+        return wait_milli_secs, rejected
+    min_pool_mem = min([pool_mem] + [changed_mem for _, changed_mem in pool_mem_changes])
+    # a query without running milliseconds still holds its memory at the arrival
+    _, levels = get_demand_steps(arrival_milli_secs, arrival_milli_secs + np.maximum(run_milli_secs, 1), used_mems)
+    if not running and queued_number == 0 and used_mems.max() <= min_pool_mem and (
+            levels.shape[0] == 0 or levels.max() <= min_pool_mem):
+        return wait_milli_secs, rejected
+
+    arrivals, runs, mems = arrival_milli_secs.tolist(), run_milli_secs.tolist(), used_mems.tolist()
+    running, queue, changes = list(running), deque(range(queued_number)), deque(pool_mem_changes)
+    heapq.heapify(running)
+    used_mem = sum(mem for _, mem in running)
+
+    def admit_queue(now, is_timeout=False):
+        nonlocal used_mem
+        while queue:
+            index = queue[0]
+            if queue_timeout_milli_secs is not None and (arrivals[index] + queue_timeout_milli_secs < now or (
+                    is_timeout and arrivals[index] + queue_timeout_milli_secs == now)):
+                rejected[index] = True
+                wait_milli_secs[index] = queue_timeout_milli_secs
+            elif mems[index] > pool_mem:
+                rejected[index] = True
+                wait_milli_secs[index] = now - arrivals[index]
+            elif used_mem + mems[index] <= pool_mem:
+                used_mem += mems[index]
+                wait_milli_secs[index] = now - arrivals[index]
+                heapq.heappush(running, (now + runs[index], mems[index]))
+            else:
+                break
+            queue.popleft()
+
+    next_index = queued_number
+    while next_index < query_total or running or queue:
+        next_arrival = arrivals[next_index] if next_index < query_total else INFINITE_MILLI_SEC
+        next_end = running[0][0] if running else INFINITE_MILLI_SEC
+        next_timeout = arrivals[queue[0]] + queue_timeout_milli_secs \
+            if queue and queue_timeout_milli_secs is not None else INFINITE_MILLI_SEC
+        next_change = changes[0][0] if changes else INFINITE_MILLI_SEC
+        now = min(next_arrival, next_end, next_timeout, next_change)
+        if now == INFINITE_MILLI_SEC:
+            # unreachable, the head of queue is admitted or rejected once no query is running
+            break
+
+        if next_change == now:
+            pool_mem = changes.popleft()[1]
+            admit_queue(now)
+        elif next_end == now:
+            while running and running[0][0] == now:
+                used_mem -= heapq.heappop(running)[1]
+            admit_queue(now)
+        elif next_timeout == now:
+            admit_queue(now, True)
+        else:
+            index = next_index
+            next_index += 1
+            if mems[index] > pool_mem:
+                rejected[index] = True
+            elif not queue and used_mem + mems[index] <= pool_mem:
+                used_mem += mems[index]
+                heapq.heappush(running, (now + runs[index], mems[index]))
+            else:
+                queue.append(index)
+    return wait_milli_secs, rejected
+
+
+def get_queries_arrays(queries_info):
+    """
+    Get the arrival milliseconds, running milliseconds and used memory of queries as arrays.
+
+    :param queries_info: (DataFrame) The query information.
+    :return: (tuple) A tuple object that contains the arrival milliseconds, the running milliseconds and the
+        used memory of queries.
+    """
+    arrival_milli_secs = get_naive_milli_sec(queries_info[FormativeQueryInfoColumn.START_TIME])
+    run_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.DURATION_MILLIS]).fillna(0) \
+        .to_numpy().astype(np.int64)
+    used_mems = (queries_info[FormativeQueryInfoColumn.MEM_LIMIT] * queries_info[FormativeQueryInfoColumn.MAX_HOST]) \
+        .to_numpy()
+    return arrival_milli_secs, run_milli_secs, used_mems
+
+
+def get_simulated_queries_info(queries_info, wait_milli_secs, rejected, run_milli_secs):
+    """
+    Get the query information with the simulated admission.
+
+    :param queries_info: (DataFrame) The query information.
+    :param wait_milli_secs: (ndarray) The simulated wait milliseconds of queries.
+    :param rejected: (ndarray) Whether queries are rejected.
+    :param run_milli_secs: (ndarray) The running milliseconds of queries.
+    :return: (DataFrame) The query information with simulated admission_wait, the rejected queries are in
+        REJECTED state with zero duration.
+    """
+    simulated_queries_info = queries_info.copy()
+    simulated_queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT] = wait_milli_secs
+    simulated_queries_info[FormativeQueryInfoColumn.DURATION_MILLIS] = np.where(rejected, 0, run_milli_secs)
+    if FormativeQueryInfoColumn.QUERY_STATE in simulated_queries_info:
+        simulated_queries_info[FormativeQueryInfoColumn.QUERY_STATE] = np.where(
+            rejected, REJECTED_QUERY_STATE, simulated_queries_info[FormativeQueryInfoColumn.QUERY_STATE].to_numpy())
+    return simulated_queries_info
+
+
+def simulate_admission(queries_info, pools_mem, queue_timeout_milli_secs=None, pools_mem_changes=None):
+    """
+    Simulate the impala admission control of a query trace under the given pool memory.
+
+    :param queries_info: (DataFrame) The query information as the query trace. The admission_wait of the
+        trace is ignored, the duration_millis is the running milliseconds after admitted.
+    :param pools_mem: (dict) A dict object mapping pool name to pool memory, the pools not in it are unlimited.
+    :param queue_timeout_milli_secs: (int) The queue timeout milliseconds, None means never time out.
+    :param pools_mem_changes: (dict) A dict object mapping pool name to the sorted tuples that contains the
+        time and the pool memory since then.
+    :return: (tuple) A tuple object that contains the query information with simulated admission_wait,
+        the rejected queries are in REJECTED state with zero duration, and a dict object mapping pool name
+        to a SimulatedPoolStat object.
+    """
+    queries_info = queries_info.reset_index(drop=True)
+    arrival_milli_secs, run_milli_secs, used_mems = get_queries_arrays(queries_info)
+    wait_milli_secs = np.zeros(queries_info.shape[0], dtype=np.int64)
+    rejected = np.zeros(queries_info.shape[0], dtype=bool)
+
+    pools_stat = {}
+    for pool_name, indexes in queries_info.groupby(FormativeQueryInfoColumn.POOL).indices.items():
+        indexes = indexes[np.argsort(arrival_milli_secs[indexes], kind="stable")]
+        pool_mem_changes = [(get_naive_milli_sec(change_time), changed_mem) for change_time, changed_mem in
+                            (pools_mem_changes or {}).get(pool_name, [])]
+        pool_wait_milli_secs, pool_rejected = simulate_pool_admission(
+            arrival_milli_secs[indexes], run_milli_secs[indexes], used_mems[indexes], pools_mem.get(pool_name),
+            queue_timeout_milli_secs, pool_mem_changes)
+        wait_milli_secs[indexes], rejected[indexes] = pool_wait_milli_secs, pool_rejected
+        pools_stat[pool_name] = SimulatedPoolStat(
+            pool_name, indexes.shape[0], int(np.count_nonzero(pool_wait_milli_secs)), int(pool_rejected.sum()),
+            pool_wait_milli_secs.sum().item() / 1000, get_percentile(pool_wait_milli_secs, 95) / 1000,
+            pool_wait_milli_secs.max().item() / 1000)
+
+    simulated_queries_info = get_simulated_queries_info(queries_info, wait_milli_secs, rejected, run_milli_secs)
+    LOGGER.debug("simulated pools stat: %s", pools_stat)
+    return simulated_queries_info, pools_stat
+
+
+class AdmissionSimulation(object):
+    """
+    The AdmissionSimulation class that provides methods for simulating the admission of a query trace
+    incrementally, while the pool memory changes are appended at the end of the simulated trace, such as the
+    cycles of backtest.
+
+    A decision of admission made before the end time of last simulation is final, because the later pool
+    memory changes can not change it. So every simulation resumes from the state at that time, the final
+    queries still running are the running queries, the undecided queries are queued, and only they and the
+    newly arrived queries are simulated, which is the same as simulating the whole trace again.
+    """
+
+    def __init__(self, queries_info, pools_mem, queue_timeout_milli_secs=None):
+        """
+        Create a AdmissionSimulation object.
+
+        :param queries_info: (DataFrame) The query information as the query trace.
+        :param pools_mem: (dict) A dict object mapping pool name to the initial pool memory, the pools not in it
+            are unlimited.
+        :param queue_timeout_milli_secs: (int) The queue timeout milliseconds, None means never time out.
+        """
+        self.__queries_info = queries_info.sort_values(FormativeQueryInfoColumn.START_TIME, kind="stable") \
+            .reset_index(drop=True)
+        self.__arrival_milli_secs, self.__run_milli_secs, self.__used_mems = \
+            get_queries_arrays(self.__queries_info)
+        self.__wait_milli_secs = np.zeros(self.__queries_info.shape[0], dtype=np.int64)
+        self.__rejected = np.zeros(self.__queries_info.shape[0], dtype=bool)
+        self.__pools_mem = pools_mem
+        self.__queue_timeout_milli_secs = queue_timeout_milli_secs
+        self.__pools_indexes = self.__queries_info.groupby(FormativeQueryInfoColumn.POOL).indices
+        # the position in pool before which the queries are final and not running at the resume time
+        self.__pools_position = {pool_name: 0 for pool_name in self.__pools_indexes}
+        self.__pools_simulated_number = {pool_name: 0 for pool_name in self.__pools_indexes}
+        self.__resume_milli_sec = None
+
+    def simulate(self, end_time, pools_mem_changes=None):
+        """
+        Simulate the admission of the queries started before or at end_time.
+
+        :param end_time: (datetime) The end time, which must not be earlier than the end time of last simulation.
+        :param pools_mem_changes: (dict) A dict object mapping pool name to the sorted tuples that contains the
+            time and the pool memory since then, the changes must not be earlier than the end time of last
+            simulation.
+        """
+        end_milli_sec = get_naive_milli_sec(end_time)
+        resume_milli_sec = self.__resume_milli_sec
+        for pool_name, indexes in self.__pools_indexes.items():
+            arrivals = self.__arrival_milli_secs[indexes]
+            simulated_number = int(np.searchsorted(arrivals, end_milli_sec, side="right"))
+            pool_mem = self.__pools_mem.get(pool_name)
+            pool_mem_changes = [(get_naive_milli_sec(change_time), changed_mem) for change_time, changed_mem in
+                                (pools_mem_changes or {}).get(pool_name, [])]
+            running, queued = [], indexes[:0]
+            if resume_milli_sec is not None:
+                position, last_number = self.__pools_position[pool_name], self.__pools_simulated_number[pool_name]
+                region = indexes[position:last_number]
+                decisions = self.__arrival_milli_secs[region] + self.__wait_milli_secs[region]
+                ends = np.where(self.__rejected[region], decisions, decisions + self.__run_milli_secs[region])
+                final = decisions < resume_milli_sec
+                unfinished = ~final | (ends >= resume_milli_sec)
+                self.__pools_position[pool_name] = position + (int(np.argmax(unfinished)) if unfinished.any()
+                                                               else region.shape[0])
+                admitted = final & ~self.__rejected[region] & (ends >= resume_milli_sec)
+                running = list(zip(ends[admitted].tolist(), self.__used_mems[region][admitted].tolist()))
+                # the queries arrived at the resume time arrive again after the pool memory changes at that time
+                queued = region[~final & (self.__arrival_milli_secs[region] < resume_milli_sec)]
+                indexes = np.concatenate((region[~final & (self.__arrival_milli_secs[region] >= resume_milli_sec)],
+                                          indexes[last_number:simulated_number]))
+                if pool_mem is not None:
+                    for change_milli_sec, changed_mem in pool_mem_changes:
+                        if change_milli_sec < resume_milli_sec:
+                            pool_mem = changed_mem
+                pool_mem_changes = [change for change in pool_mem_changes if change[0] >= resume_milli_sec]
+            else:
+                indexes = indexes[:simulated_number]
+            self.__pools_simulated_number[pool_name] = simulated_number
+
+            indexes = np.concatenate((queued, indexes))
+            self.__wait_milli_secs[indexes], self.__rejected[indexes] = simulate_pool_admission(
+                self.__arrival_milli_secs[indexes], self.__run_milli_secs[indexes], self.__used_mems[indexes],
+                pool_mem, self.__queue_timeout_milli_secs, pool_mem_changes, running, queued.shape[0])
+        self.__resume_milli_sec = end_milli_sec
+
+    def get_queries_info(self, start_time, end_time):
+        """
+        Get the simulated query information of the queries started in [start_time, end_time].
+
+        :param start_time: (datetime) The start time.
+        :param end_time: (datetime) The end time.
+        :return: (DataFrame) The query information with simulated admission_wait, the rejected queries are in
+            REJECTED state with zero duration.
+        """
+        start_index = int(np.searchsorted(self.__arrival_milli_secs, get_naive_milli_sec(start_time), side="left"))
+        end_index = int(np.searchsorted(self.__arrival_milli_secs, get_naive_milli_sec(end_time), side="right"))
+        return get_simulated_queries_info(self.__queries_info.iloc[start_index:end_index],
+                                          self.__wait_milli_secs[start_index:end_index],
+                                          self.__rejected[start_index:end_index],
+                                          self.__run_milli_secs[start_index:end_index])
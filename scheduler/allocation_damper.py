@@ -0,0 +1,145 @@
+from datetime import timedelta
+import heapq
+import logging
+
+EPSILON = 1e-9
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AllocationDamper(object):
+    """
+    The AllocationDamper class that provides methods for damping the allocated memory of pools between the
+    scheduling strategy and the update of impala configuration, so the noisy pools do not flip memory back
+    and forth and the impala configuration is pushed and the pools are refreshed less often.
+
+    The allocated memory of every pool is smoothed by an exponential moving average of targets, and the change
+    of pool is suppressed if it is less than the minimum change, if the pool has been changed within the
+    cooldown, or if it reverses the last change of pool within the oscillation window (A -> B -> A). The
+    suppressed changes are balanced by reducing the other changes in memory units, so the total memory is
+    conserved.
+
+    The moving averages and the changes of damp are pending until they are committed after the damped memory
+    is applied, so a plan that is checked out or skipped does not move the cooldown and oscillation windows.
+    """
+
+    def __init__(self, memory_unit, min_change_mem=0, min_change_ratio=0, cooldown_minutes=0, ema_alpha=1,
+                 oscillation_minutes=0):
+        """
+        Create a AllocationDamper object.
+
+        :param memory_unit: (int) The memory unit of scheduling.
+        :param min_change_mem: (float) The minimum memory of change.
+        :param min_change_ratio: (float) The minimum ratio of change to the current memory of pool.
+        :param cooldown_minutes: (int) The minutes that the pool is not changed again after a change.
+        :param ema_alpha: (float) The smoothing factor of targets, 1 means no smoothing.
+        :param oscillation_minutes: (int) The minutes that the last change of pool is not reversed.
+        """
+        self.__memory_unit = memory_unit
+        self.__min_change_mem = min_change_mem
+        self.__min_change_ratio = min_change_ratio
+        self.__cooldown = timedelta(minutes=cooldown_minutes)
+        self.__ema_alpha = ema_alpha
+        self.__oscillation = timedelta(minutes=oscillation_minutes)
+        self.__emas = {}
+        self.__last_changes = {}
+        self.__pending_emas = {}
+        self.__pending_changes = {}
+        self.planned_pushes = 0
+        self.saved_pushes = 0
+
+    def __get_suppressed_reason(self, pool_info, delta, time):
+        """
+        Get the reason why the change of pool is suppressed.
+
+        :param pool_info: (PoolInfo) The information of pool that participates in the scheduling.
+        :param delta: (float) The change of pool memory.
+        :param time: (datetime) The time of the cycle.
+        :return: (str) The reason, None if the change is not suppressed.
+        """
+        if abs(delta) < max(self.__min_change_mem, self.__min_change_ratio * pool_info.current_mem):
+            return "less than minimum change"
+        last_change = self.__last_changes.get(pool_info.pool_name)
+        if last_change is None:
+            return None
+        last_time, last_delta = last_change
+        if time - last_time < self.__cooldown:
+            return "in cooldown"
+        if time - last_time < self.__oscillation and delta * last_delta < 0:
+            return "reverse of last change"
+        return None
+
+    def __balance(self, deltas):
+        """
+        Reduce the changes in memory units until the sum of changes is zero.
+
+        :param deltas: (dict) A dict object mapping pool name to the change of pool memory.
+        """
+        net_units = int(round(sum(deltas.values()) / self.__memory_unit))
+        sign = 1 if net_units > 0 else -1
+        heap = [(-sign * delta, pool_name) for pool_name, delta in deltas.items() if sign * delta > 0]
+        heapq.heapify(heap)
+        for _ in range(abs(net_units)):
+            if not heap:
+                break
+            delta, pool_name = heapq.heappop(heap)
+            deltas[pool_name] -= sign * self.__memory_unit
+            if sign * deltas[pool_name] > 0:
+                heapq.heappush(heap, (-sign * deltas[pool_name], pool_name))
+
+    def damp(self, pools_info, pools_allocated_mem, time):
+        """
+        Damp the allocated memory of pools.
+
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :param pools_allocated_mem: (dict) A dict object mapping pool name to the allocated memory.
+        :param time: (datetime) The time of the cycle.
+        :return: (dict) A dict object mapping pool name to the damped allocated memory, only the pools whose
+            memory is changed.
+        """
+        deltas = {}
+        self.__pending_emas, self.__pending_changes = {}, {}
+        for pool_name, pool_info in pools_info.items():
+            current_mem = pool_info.current_mem
+            target_mem = pools_allocated_mem.get(pool_name, current_mem)
+            ema = self.__ema_alpha * target_mem + (1 - self.__ema_alpha) * self.__emas.get(pool_name, current_mem)
+            self.__pending_emas[pool_name] = ema
+            # truncate toward the current memory, so the damped memory never passes the targets
+            units = (ema - current_mem) / self.__memory_unit
+            delta = self.__memory_unit * int(units + (EPSILON if units > 0 else -EPSILON))
+            if delta == 0:
+                continue
+            reason = self.__get_suppressed_reason(pool_info, delta, time)
+            if reason is not None:
+                LOGGER.info("change %s of pool %s is suppressed, because of %s.", delta, pool_name, reason)
+                delta = 0
+            deltas[pool_name] = delta
+        self.__balance(deltas)
+
+        damped_pools_allocated_mem = {}
+        for pool_name, delta in deltas.items():
+            if delta != 0:
+                damped_pools_allocated_mem[pool_name] = pools_info[pool_name].current_mem + delta
+                self.__pending_changes[pool_name] = (time, delta)
+
+        if any(allocated_mem != pools_info[pool_name].current_mem for pool_name, allocated_mem in
+               pools_allocated_mem.items()):
+            self.planned_pushes += 1
+            if not damped_pools_allocated_mem:
+                self.saved_pushes += 1
+        LOGGER.info("pools damped allocated memory: %s, damping saved %d of %d pushes", damped_pools_allocated_mem,
+                    self.saved_pushes, self.planned_pushes)
+        return damped_pools_allocated_mem
+
+    def commit(self, applied_pools_mem):
+        """
+        Commit the moving averages and the changes of the last damp once its damped memory is applied.
+
+        :param applied_pools_mem: (dict) A dict object mapping pool name to the applied memory, only the pools
+            whose memory is changed.
+        """
+        self.__emas.update(self.__pending_emas)
+        for pool_name in applied_pools_mem:
+            if pool_name in self.__pending_changes:
+                self.__last_changes[pool_name] = self.__pending_changes[pool_name]
+        self.__pending_emas, self.__pending_changes = {}, {}
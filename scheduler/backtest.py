@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import copy
+import logging
+import numpy as np
+import pandas as pd
+
+from scheduler.admission_simulator import AdmissionSimulation, get_naive_milli_sec, REJECTED_QUERY_STATE
+from scheduler.base_schedule import get_pools_info, get_percentile
+from scheduler.check import check_pools_allocated_mem
+from scheduler.constants import ScheduleSectOpts, PoolSectOpts, FormativeQueryInfoColumn, \
+    DEFAULT_ENABLE_HIERARCHICAL_ALLOCATION
+from scheduler.global_utils import create_schedule, create_demand_forecast, create_allocation_damper
+from scheduler.hierarchical_allocation import HierarchicalAllocation
+from scheduler.impala_pool_config import ImpalaScheduledAllocations
+from scheduler.query_source import get_queries_info_at
+
+STATIC_STRATEGY = "static"
+STRATEGY_DELIMITER = "."
+
+
+class BacktestColumn(object):
+    """
+    The wrapper class contains the columns of backtest comparison table.
+    """
+    STRATEGY = "strategy"
+    QUERY_TOTAL = "query_total"
+    WAIT_QUERY_TOTAL = "wait_query_total"
+    REJECTED_QUERY_TOTAL = "rejected_query_total"
+    WAIT_SECS = "wait_secs"
+    WAIT_SECS_P95 = "wait_secs_p95"
+    MEM_UTILIZATION = "mem_utilization"
+    PUSHES = "pushes"
+
+
+BACKTEST_COLUMNS = [BacktestColumn.STRATEGY,
+                    BacktestColumn.QUERY_TOTAL,
+                    BacktestColumn.WAIT_QUERY_TOTAL,
+                    BacktestColumn.REJECTED_QUERY_TOTAL,
+                    BacktestColumn.WAIT_SECS,
+                    BacktestColumn.WAIT_SECS_P95,
+                    BacktestColumn.MEM_UTILIZATION,
+                    BacktestColumn.PUSHES]
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_strategy_schedule(section_schedule, strategy):
+    """
+    Get the schedule class of strategy, which is loaded in the same way as create_schedule.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :param strategy: (str) The strategy in format "module_name.py_name.class_name", or "static" that never
+        changes the pool memory.
+    :return: (AbstractSchedule) A AbstractSchedule class, None if the strategy is "static".
+    """
+    if strategy == STATIC_STRATEGY:
+        return None
+    section_schedule = dict(section_schedule)
+    section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MODULE_NAME], section_schedule[
+        ScheduleSectOpts.OPT_SCHEDULE_PY_NAME], section_schedule[ScheduleSectOpts.OPT_SCHEDULE_CLASS_NAME] = \
+        strategy.rsplit(STRATEGY_DELIMITER, 2)
+    return create_schedule(section_schedule)
+
+
+def get_mem_utilization(simulated_queries_info, pools_mem, pools_mem_changes, start_time, end_time):
+    """
+    Get the memory utilization of the scheduled pools, which is the used memory multiplied by running
+    milliseconds divided by the pool memory multiplied by milliseconds in [start_time, end_time).
+
+    :param simulated_queries_info: (DataFrame) The simulated query information.
+    :param pools_mem: (dict) A dict object mapping pool name to the initial pool memory.
+    :param pools_mem_changes: (dict) A dict object mapping pool name to the sorted tuples that contains the
+        time and the pool memory since then.
+    :param start_time: (datetime) The start time.
+    :param end_time: (datetime) The end time.
+    :return: (float) The memory utilization.
+    """
+    start_milli_sec, end_milli_sec = get_naive_milli_sec(start_time), get_naive_milli_sec(end_time)
+    pool_mem_total = 0
+    for pool_name, pool_mem in pools_mem.items():
+        bounds = [start_milli_sec] + [get_naive_milli_sec(change_time) for change_time, _ in
+                                      pools_mem_changes.get(pool_name, [])] + [end_milli_sec]
+        mems = [pool_mem] + [changed_mem for _, changed_mem in pools_mem_changes.get(pool_name, [])]
+        pool_mem_total += sum(mem * (bound_end - bound_start) for mem, bound_start, bound_end in
+                              zip(mems, bounds[:-1], bounds[1:]))
+
+    queries_info = simulated_queries_info[simulated_queries_info[FormativeQueryInfoColumn.POOL].isin(pools_mem)]
+    run_starts = get_naive_milli_sec(queries_info[FormativeQueryInfoColumn.START_TIME]) + \
+        queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT].to_numpy()
+    run_ends = run_starts + queries_info[FormativeQueryInfoColumn.DURATION_MILLIS].to_numpy()
+    run_milli_secs = np.clip(run_ends, start_milli_sec, end_milli_sec) - np.clip(run_starts, start_milli_sec,
+                                                                                 end_milli_sec)
+    used_mem_total = (queries_info[FormativeQueryInfoColumn.MEM_LIMIT] *
+                      queries_info[FormativeQueryInfoColumn.MAX_HOST]).to_numpy() * run_milli_secs
+    return 0 if pool_mem_total == 0 else float(used_mem_total.sum() / pool_mem_total)
+
+
+def backtest_strategy(scheduler_config, strategy, queries_info, impala_config, start_time, end_time):
+    """
+    Replay the cycle-by-cycle decisions of strategy over the query trace. Every
+    [schedule.schedule_interval_minutes] minutes, the strategy sees the queries of last
+    [schedule.fetch_queries_timedelta_minutes] minutes as they were simulated under its earlier decisions,
+    and its allocated pool memory takes effect from then on.
+
+    :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :param strategy: (str) The strategy in format "module_name.py_name.class_name", or "static".
+    :param queries_info: (DataFrame) The query information as the query trace.
+    :param impala_config: (dict) The impala configuration at start_time.
+    :param start_time: (datetime) The start time of backtest.
+    :param end_time: (datetime) The end time of backtest.
+    :return: (dict) A dict object mapping the backtest column to value.
+    """
+    section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+    interval = timedelta(minutes=section_schedule[ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES])
+    fetch_timedelta = timedelta(minutes=section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_TIMEDELTA_MINUTES])
+    schedule = get_strategy_schedule(section_schedule, strategy)
+    demand_forecast = create_demand_forecast(section_schedule, path=None)
+    allocation_damper = create_allocation_damper(section_schedule)
+
+    impala_scheduled_allocations = ImpalaScheduledAllocations(copy.deepcopy(impala_config))
+    pools_mem = {pool_name: impala_pool.get_pool_mem() for pool_name, impala_pool in
+                 impala_scheduled_allocations.get_pools().items()}
+    pools_mem_changes = {pool_name: [] for pool_name in pools_mem}
+    # the changes are appended at the cycle time, so each cycle resumes the simulation of last one
+    admission_simulation = AdmissionSimulation(queries_info, pools_mem)
+
+    pushes = 0
+    cycle_time = start_time
+    while schedule is not None and cycle_time <= end_time:
+        cycle_start_time = cycle_time - fetch_timedelta
+        admission_simulation.simulate(cycle_time, pools_mem_changes)
+        simulated_queries_info = admission_simulation.get_queries_info(cycle_start_time, cycle_time)
+        seen_queries_info = get_queries_info_at(simulated_queries_info, cycle_time) \
+            if simulated_queries_info.shape[0] else None
+
+        pools_stat = schedule.get_pools_stat(seen_queries_info, cycle_start_time, cycle_time) or {}
+        pools_info = get_pools_info(impala_scheduled_allocations, scheduler_config, pools_stat)
+        if demand_forecast is not None:
+            demand_forecast.update(pools_info, cycle_time)
+            demand_forecast.set_pools_forecast(pools_info, cycle_time, cycle_time + interval)
+        if section_schedule.get(ScheduleSectOpts.OPT_ENABLE_HIERARCHICAL_ALLOCATION,
+                                DEFAULT_ENABLE_HIERARCHICAL_ALLOCATION):
+            pools_allocated_mem = HierarchicalAllocation(schedule, section_schedule, impala_scheduled_allocations) \
+                .get_pools_allocated_mem(pools_info)
+        else:
+            pools_allocated_mem = schedule.get_pools_allocated_mem(section_schedule, pools_info)
+        if allocation_damper is not None:
+            pools_allocated_mem = allocation_damper.damp(pools_info, pools_allocated_mem, cycle_time)
+        check_pools_allocated_mem(section_schedule, pools_allocated_mem, pools_info)
+        # the pushes of no-op plans are skipped like the scheduling does
+        pools_allocated_mem = {pool_name: allocated_mem for pool_name, (_, allocated_mem) in
+                               impala_scheduled_allocations.get_pools_mem_diff(pools_allocated_mem).items()}
+        if pools_allocated_mem:
+            impala_scheduled_allocations.update_pools(pools_allocated_mem)
+            for pool_name, allocated_mem in pools_allocated_mem.items():
+                pools_mem_changes[pool_name].append((cycle_time, allocated_mem))
+            pushes += 1
+        if allocation_damper is not None:
+            allocation_damper.commit(pools_allocated_mem)
+        cycle_time += interval
+
+    admission_simulation.simulate(end_time, pools_mem_changes)
+    simulated_queries_info = admission_simulation.get_queries_info(start_time, end_time)
+    simulated_queries_info = simulated_queries_info[
+        simulated_queries_info[FormativeQueryInfoColumn.START_TIME] < end_time]
+    wait_milli_secs = simulated_queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT].to_numpy()
+    rejected = simulated_queries_info[FormativeQueryInfoColumn.QUERY_STATE] == REJECTED_QUERY_STATE
+    scheduled_pools_mem = {pool_name: pools_mem[pool_name] for pool_name in scheduler_config[PoolSectOpts.SECT_POOL]
+                           if pool_name in pools_mem}
+    return {BacktestColumn.STRATEGY: strategy,
+            BacktestColumn.QUERY_TOTAL: simulated_queries_info.shape[0],
+            BacktestColumn.WAIT_QUERY_TOTAL: int(np.count_nonzero(wait_milli_secs)),
+            BacktestColumn.REJECTED_QUERY_TOTAL: int(rejected.sum()),
+            BacktestColumn.WAIT_SECS: wait_milli_secs.sum().item() / 1000,
+            BacktestColumn.WAIT_SECS_P95: get_percentile(wait_milli_secs, 95) / 1000,
+            BacktestColumn.MEM_UTILIZATION: get_mem_utilization(simulated_queries_info, scheduled_pools_mem,
+                                                                pools_mem_changes, start_time, end_time),
+            BacktestColumn.PUSHES: pushes}
+
+
+def backtest_strategies(scheduler_config, strategies, queries_info, impala_config, start_time, end_time,
+                        max_workers=None):
+    """
+    Backtest the strategies in a process pool and compare them.
+
+    :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :param strategies: (list) The strategies in format "module_name.py_name.class_name", or "static".
+    :param queries_info: (DataFrame) The query information as the query trace.
+    :param impala_config: (dict) The impala configuration at start_time.
+    :param start_time: (datetime) The start time of backtest.
+    :param end_time: (datetime) The end time of backtest.
+    :param max_workers: (int) The max number of processes, None means the number of strategies.
+    :return: (DataFrame) A DataFrame object of comparison table, one row per strategy.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers or len(strategies)) as executor:
+        futures = [executor.submit(backtest_strategy, scheduler_config, strategy, queries_info, impala_config,
+                                   start_time, end_time) for strategy in strategies]
+        results = [future.result() for future in futures]
+    comparison = pd.DataFrame(data=results, columns=BACKTEST_COLUMNS)
+    LOGGER.info("backtest between %s ~ %s:\n%s", start_time, end_time, comparison.to_string(index=False))
+    return comparison
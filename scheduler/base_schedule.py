@@ -1,10 +1,14 @@
 import logging
 from abc import ABCMeta, abstractmethod
 import time
+import numpy as np
+import pandas as pd
 
 from scheduler.constants import FormativeQueryInfoColumn
 from scheduler.constants import PoolSectOpts
 
+MAX_UTC_OFFSET_PROBES = 24 * 366
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -19,7 +23,8 @@ class ScheduleInterface(metaclass=ABCMeta):
         Get the statistics of the pool participating in the scheduling.
 
         :param fetched_query_info: (DataFrame) The fetched query information. Columns as follow:
-            ["query_id", "pool", "start_time", "admission_wait", "duration_millis", "mem_limit", "max_host"]
+            ["query_id", "pool", "start_time", "admission_wait", "duration_millis", "mem_limit", "max_host",
+             "query_state"]
         :param start_time: (datetime) The start time to fetching query information.
         :param end_time: (datetime) The end time to fetching query information.
         :return: (dict) A dict object mapping pool name to a PoolStat object.
@@ -70,50 +75,7 @@ class AbstractSchedule(ScheduleInterface):
             return None
         stat_start_milli_sec = int(time.mktime(start_time.timetuple()) * 1000)
         stat_end_milli_sec = int(time.mktime(end_time.timetuple()) * 1000)
-        pools_stat = {}
-        for pool_name, pool_group in queries_info.groupby(FormativeQueryInfoColumn.POOL):
-            pool_group_sort = pool_group.sort_values(by=FormativeQueryInfoColumn.START_TIME)
-
-            query_total, wait_query_total, wait_mem_total, used_mem_total = 0, 0, 0, 0
-            wait_milli_secs, run_milli_secs, wait_milli_sec_cursor, run_sec_cursor = 0, 0, 0, 0
-            for _, row in pool_group_sort.iterrows():
-                start = row.get(FormativeQueryInfoColumn.START_TIME)
-                start_milli_sec = int(time.mktime(start.timetuple()) * 1000)
-                queued_milli_secs = int(row.get(FormativeQueryInfoColumn.ADMISSION_WAIT))
-                duration_milli_sec = row.get(FormativeQueryInfoColumn.DURATION_MILLIS)
-                mem_limit = row.get(FormativeQueryInfoColumn.MEM_LIMIT)
-                hosts = row.get(FormativeQueryInfoColumn.MAX_HOST)
-                used_mem = mem_limit * hosts
-                end_milli_sec = start_milli_sec + duration_milli_sec + queued_milli_secs
-                query_total += 1
-                if queued_milli_secs > 0:
-                    wait_query_total += 1
-
-                wait_start_milli_sec = max(start_milli_sec, stat_start_milli_sec)
-                wait_end_milli_sec = min(start_milli_sec + queued_milli_secs, stat_end_milli_sec)
-                if wait_end_milli_sec > wait_start_milli_sec:
-                    wait_mem_total += used_mem * (wait_end_milli_sec - wait_start_milli_sec)
-
-                difference = wait_end_milli_sec - max(wait_start_milli_sec, wait_milli_sec_cursor)
-                if difference > 0:
-                    wait_milli_secs += difference
-                    wait_milli_sec_cursor = wait_end_milli_sec
-
-                run_start_milli_sec = max(start_milli_sec + queued_milli_secs, stat_start_milli_sec)
-                run_end_milli_sec = min(end_milli_sec, stat_end_milli_sec)
-                used_mem_total += used_mem * (run_end_milli_sec - run_start_milli_sec)
-
-                difference = run_end_milli_sec - max(run_start_milli_sec, run_sec_cursor)
-                if difference > 0:
-                    run_milli_secs += difference
-                    run_sec_cursor = run_end_milli_sec
-
-            wait_mem_avg = 0 if wait_milli_secs == 0 else wait_mem_total / wait_milli_secs
-            used_mem_avg = 0 if run_milli_secs == 0 else used_mem_total / run_milli_secs
-            pool_stat = PoolStat(
-                pool_name, query_total, wait_query_total, run_milli_secs / 1000,
-                wait_milli_secs / 1000, int(used_mem_avg), int(wait_mem_avg))
-            pools_stat[pool_name] = pool_stat
+        pools_stat = calculate_pools_stat(queries_info, stat_start_milli_sec, stat_end_milli_sec)
         LOGGER.info("pools stat info: %s", pools_stat)
         return pools_stat
 
@@ -128,7 +90,7 @@ class PoolStat(object):
     the scheduling.
     """
     def __init__(self, pool_name="", query_total=0, wait_query_total=0,
-                 run_secs=0, wait_secs=0, used_mem_avg=0, wait_mem_avg=0):
+                 run_secs=0, wait_secs=0, used_mem_avg=0, wait_mem_avg=0, demand=None, forecast_mem=None):
         """
         Create a PoolStat object to encapsulating statistics for the pool.
 
@@ -139,6 +101,8 @@ class PoolStat(object):
         :param wait_secs: (int) The wait seconds for wait query.
         :param used_mem_avg: (int) The average used memory.
         :param wait_mem_avg: (int) The average wait memory.
+        :param demand: (PoolDemand) The concurrent memory demand timeline. By default, demand is None.
+        :param forecast_mem: (float) The forecast memory demand of next interval. By default, forecast_mem is None.
         """
         self.pool_name = pool_name
         self.query_total = query_total
@@ -147,12 +111,138 @@ class PoolStat(object):
         self.wait_secs = wait_secs
         self.used_mem_avg = used_mem_avg
         self.wait_mem_avg = wait_mem_avg
+        self.demand = demand
+        self.forecast_mem = forecast_mem
 
     def __str__(self):
         return "(PoolStat: {pool_name:%s, query_total:%s, wait_query_total:%s, run_secs:%s, " \
-               "wait_secs:%s, used_mem_avg:%s, wait_mem_avg:%s})" % \
-               (self.pool_name, self.query_total, self.wait_query_total,
-                self.run_secs, self.wait_secs, self.used_mem_avg, self.wait_mem_avg)
+               "wait_secs:%s, used_mem_avg:%s, wait_mem_avg:%s, demand:%s, forecast_mem:%s})" % \
+               (self.pool_name, self.query_total, self.wait_query_total, self.run_secs, self.wait_secs,
+                self.used_mem_avg, self.wait_mem_avg, self.demand, self.forecast_mem)
+
+    __repr__ = __str__
+
+    @classmethod
+    def from_partial(cls, pool_stat_partial):
+        """
+        Create a PoolStat object from the partial statistics of the pool.
+
+        :param pool_stat_partial: (PoolStatPartial) The partial statistics of the pool.
+        :return: (PoolStat) A PoolStat object.
+        """
+        partial = pool_stat_partial
+        used_mem_avg = 0 if partial.run_milli_secs == 0 else partial.used_mem_total / partial.run_milli_secs
+        wait_mem_avg = 0 if partial.wait_milli_secs == 0 else partial.wait_mem_total / partial.wait_milli_secs
+        return cls(partial.pool_name, partial.query_total + partial.carried_query_total,
+                   partial.wait_query_total + partial.carried_wait_query_total, partial.run_milli_secs / 1000,
+                   partial.wait_milli_secs / 1000, int(used_mem_avg), int(wait_mem_avg))
+
+
+class PoolDemand(object):
+    """
+    The PoolDemand class that provides encapsulation for the concurrent memory demand timeline of the pool,
+    which is the concurrent memory of admitted queries and queued queries sampled at a fixed resolution.
+    """
+    def __init__(self, pool_name, sample_milli_secs, used_mems, wait_mems, used_mem_peak=0, wait_mem_peak=0):
+        """
+        Create a PoolDemand object to encapsulating the memory demand timeline for the pool.
+
+        :param pool_name: (str) The pool name.
+        :param sample_milli_secs: (ndarray) The sample milliseconds.
+        :param used_mems: (ndarray) The concurrent memory of admitted queries at sample milliseconds.
+        :param wait_mems: (ndarray) The concurrent memory of queued queries at sample milliseconds.
+        :param used_mem_peak: (int) The peak concurrent memory of admitted queries.
+        :param wait_mem_peak: (int) The peak concurrent memory of queued queries.
+        """
+        self.pool_name = pool_name
+        self.sample_milli_secs = sample_milli_secs
+        self.used_mems = used_mems
+        self.wait_mems = wait_mems
+        self.used_mem_peak = used_mem_peak
+        self.wait_mem_peak = wait_mem_peak
+        self.used_mem_p95 = get_percentile(used_mems, 95)
+        self.used_mem_p99 = get_percentile(used_mems, 99)
+        self.wait_mem_p95 = get_percentile(wait_mems, 95)
+        self.wait_mem_p99 = get_percentile(wait_mems, 99)
+
+    def __str__(self):
+        return "(PoolDemand: {pool_name:%s, used_mem_peak:%s, used_mem_p95:%s, used_mem_p99:%s, " \
+               "wait_mem_peak:%s, wait_mem_p95:%s, wait_mem_p99:%s})" % \
+               (self.pool_name, self.used_mem_peak, self.used_mem_p95, self.used_mem_p99,
+                self.wait_mem_peak, self.wait_mem_p95, self.wait_mem_p99)
+
+    __repr__ = __str__
+
+
+class PoolStatPartial(object):
+    """
+    The PoolStatPartial class that provides encapsulation for the mergeable partial statistics of the
+    pool in a time slice [start_milli_sec, end_milli_sec).
+
+    The intervals of queries are clipped to the time slice, so the union of intervals in adjacent time
+    slices never overlaps, and the partial statistics of adjacent time slices are merged by sums. A query is
+    counted in the time slice which it starts in, and the queries started before the time slice but still
+    queued or running in it are counted as carried queries, only those of the earliest time slice are kept
+    by merging, so each query is counted once in the merged time slice.
+    """
+    def __init__(self, pool_name, start_milli_sec, end_milli_sec, query_total=0, wait_query_total=0,
+                 run_milli_secs=0, wait_milli_secs=0, used_mem_total=0, wait_mem_total=0, carried_query_total=0,
+                 carried_wait_query_total=0):
+        """
+        Create a PoolStatPartial object to encapsulating partial statistics for the pool.
+
+        :param pool_name: (str) The pool name.
+        :param start_milli_sec: (int) The start milliseconds of time slice.
+        :param end_milli_sec: (int) The end milliseconds of time slice.
+        :param query_total: (int) The number of queries started in time slice.
+        :param wait_query_total: (int) The number of wait queries started in time slice.
+        :param run_milli_secs: (int) The milliseconds covered by running queries in time slice.
+        :param wait_milli_secs: (int) The milliseconds covered by wait queries in time slice.
+        :param used_mem_total: (int) The sum of used memory multiplied by running milliseconds.
+        :param wait_mem_total: (int) The sum of used memory multiplied by wait milliseconds.
+        :param carried_query_total: (int) The number of queries started before time slice and overlapping it.
+        :param carried_wait_query_total: (int) The number of wait queries started before time slice and
+            overlapping it.
+        """
+        self.pool_name = pool_name
+        self.start_milli_sec = start_milli_sec
+        self.end_milli_sec = end_milli_sec
+        self.query_total = query_total
+        self.wait_query_total = wait_query_total
+        self.run_milli_secs = run_milli_secs
+        self.wait_milli_secs = wait_milli_secs
+        self.used_mem_total = used_mem_total
+        self.wait_mem_total = wait_mem_total
+        self.carried_query_total = carried_query_total
+        self.carried_wait_query_total = carried_wait_query_total
+
+    def merge(self, other):
+        """
+        Merge with the partial statistics of the adjacent time slice.
+
+        :param other: (PoolStatPartial) The partial statistics of the same pool in adjacent time slice.
+        :return: (PoolStatPartial) A PoolStatPartial object of the merged time slice.
+        """
+        if other.pool_name != self.pool_name or \
+                not (self.end_milli_sec == other.start_milli_sec or other.end_milli_sec == self.start_milli_sec):
+            LOGGER.error("partial stat %s is not adjacent to %s.", other, self)
+            raise ValueError("partial stat {} is not adjacent to {}.".format(other, self))
+        earlier = self if self.start_milli_sec < other.start_milli_sec else other
+        return PoolStatPartial(
+            self.pool_name, min(self.start_milli_sec, other.start_milli_sec),
+            max(self.end_milli_sec, other.end_milli_sec), self.query_total + other.query_total,
+            self.wait_query_total + other.wait_query_total, self.run_milli_secs + other.run_milli_secs,
+            self.wait_milli_secs + other.wait_milli_secs, self.used_mem_total + other.used_mem_total,
+            self.wait_mem_total + other.wait_mem_total, earlier.carried_query_total,
+            earlier.carried_wait_query_total)
+
+    def __str__(self):
+        return "(PoolStatPartial: {pool_name:%s, start_milli_sec:%s, end_milli_sec:%s, query_total:%s, " \
+               "wait_query_total:%s, run_milli_secs:%s, wait_milli_secs:%s, used_mem_total:%s, wait_mem_total:%s, " \
+               "carried_query_total:%s, carried_wait_query_total:%s})" \
+               % (self.pool_name, self.start_milli_sec, self.end_milli_sec, self.query_total, self.wait_query_total,
+                  self.run_milli_secs, self.wait_milli_secs, self.used_mem_total, self.wait_mem_total,
+                  self.carried_query_total, self.carried_wait_query_total)
 
     __repr__ = __str__
 
@@ -201,8 +291,9 @@ def get_pools_info(impala_pool_config, scheduler_config, pools_stat):
     pools_info = {}
     section_pool = scheduler_config[PoolSectOpts.SECT_POOL]
     for pool_name in section_pool.keys():
-        current_mem = impala_pool_config.get_pool(pool_name).get_pool_mem()
-        weight = impala_pool_config.get_pool(pool_name).get_pool_weight()
+        impala_pool = impala_pool_config.get_pool(pool_name)
+        current_mem = impala_pool.get_pool_mem()
+        weight = impala_pool.get_pool_weight()
         min_mem = section_pool[pool_name][PoolSectOpts.OPT_MIN_MEM]
         max_mem = section_pool[pool_name][PoolSectOpts.OPT_MAX_MEM]
         pool_stat = pools_stat.get(pool_name, PoolStat())
@@ -210,3 +301,284 @@ def get_pools_info(impala_pool_config, scheduler_config, pools_stat):
         pools_info[pool_name] = pool_info
 
     return pools_info
+
+
+def get_pool_demand_mems(pool_info):
+    """
+    Get the memory demand samples of pool, which are the samples of demand timeline if it is built, or the
+    averages of statistics. A pool that has queued queries needs its current memory as well as the queued
+    memory, and the forecast memory demand of next interval is the floor of demand if it is set.
+
+    :param pool_info: (PoolInfo) The information of pool that participates in the scheduling.
+    :return: (ndarray) The memory demand samples.
+    """
+    pool_stat = pool_info.pool_stat
+    if pool_stat.demand is not None and pool_stat.demand.used_mems.shape[0] > 0:
+        used_mems = pool_stat.demand.used_mems.astype(np.float64)
+        wait_mems = pool_stat.demand.wait_mems.astype(np.float64)
+    else:
+        used_mems = np.array([pool_stat.used_mem_avg], dtype=np.float64)
+        wait_mems = np.array([pool_stat.wait_mem_avg if pool_stat.wait_secs > 0 else 0], dtype=np.float64)
+    demands = np.where(wait_mems > 0, np.maximum(used_mems, pool_info.current_mem) + wait_mems, used_mems)
+    if pool_stat.forecast_mem is not None:
+        demands = np.maximum(demands, pool_stat.forecast_mem)
+    return demands
+
+
+def get_milli_secs(datetimes):
+    """
+    Convert the local datetimes to milliseconds since epoch, which is the vectorized version of
+    int(time.mktime(datetime.timetuple()) * 1000), so the milliseconds of datetime are truncated.
+
+    The utc offset is computed by time.mktime at every hour in the range of datetimes, and applied to the
+    whole array if it does not change, otherwise, each distinct datetime is converted by time.mktime.
+
+    :param datetimes: (Series) The local datetimes.
+    :return: (ndarray) A int64 array of milliseconds since epoch.
+    """
+    naive_secs = pd.to_datetime(datetimes).to_numpy().astype("datetime64[s]").astype(np.int64)
+    if naive_secs.shape[0] == 0:
+        return naive_secs
+
+    def local_secs(naive_sec):
+        return int(time.mktime(time.gmtime(int(naive_sec))[:8] + (-1,)))
+
+    min_naive_sec, max_naive_sec = int(naive_secs.min()), int(naive_secs.max())
+    hours = range(min_naive_sec - min_naive_sec % 3600, max_naive_sec + 3600, 3600)
+    if len(hours) <= MAX_UTC_OFFSET_PROBES:
+        utc_offsets = {hour - local_secs(hour) for hour in hours}
+        if len(utc_offsets) == 1:
+            return (naive_secs - utc_offsets.pop()) * 1000
+
+    unique_naive_secs, inverse = np.unique(naive_secs, return_inverse=True)
+    unique_local_secs = np.array([local_secs(naive_sec) for naive_sec in unique_naive_secs], dtype=np.int64)
+    return unique_local_secs[inverse] * 1000
+
+
+def calculate_pools_stat(queries_info, stat_start_milli_sec, stat_end_milli_sec):
+    """
+    Calculate the statistics of each pool from the query information, the queries are clipped to the
+    statistic window. The statistics are the view of partial statistics of the whole window, so they are
+    the same as the merged partial statistics of time slices in PoolStatPartials.
+
+    The run and wait seconds are covered by the union of running and wait intervals of queries, so a query
+    running within the wait of an earlier started query is covered too, and the queries queued or running in
+    the window are counted.
+
+    :param queries_info: (DataFrame) The query information.
+    :param stat_start_milli_sec: (int) The start milliseconds of statistic window.
+    :param stat_end_milli_sec: (int) The end milliseconds of statistic window.
+    :return: (dict) A dict object mapping pool name to a PoolStat object.
+    """
+    pools_stat_partial = calculate_pools_stat_partials(queries_info, stat_start_milli_sec, stat_end_milli_sec)
+    return {pool_name: PoolStat.from_partial(pools_stat_partial[pool_name]) for pool_name in sorted(pools_stat_partial)}
+
+
+def get_queries_intervals(queries_info):
+    """
+    Get the pool, time intervals and used memory of each query as arrays.
+
+    :param queries_info: (DataFrame) The query information.
+    :return: (tuple) A tuple object that contains the pool codes, the sorted pool names, the start
+        milliseconds, the queued milliseconds, the end milliseconds and the used memory of queries.
+    """
+    pool_codes, pool_names = pd.factorize(queries_info[FormativeQueryInfoColumn.POOL], sort=True)
+    start_milli_secs = get_milli_secs(queries_info[FormativeQueryInfoColumn.START_TIME])
+    queued_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT]) \
+        .to_numpy().astype(np.int64)
+    duration_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.DURATION_MILLIS]).to_numpy()
+    used_mems = queries_info[FormativeQueryInfoColumn.MEM_LIMIT].to_numpy() * \
+        queries_info[FormativeQueryInfoColumn.MAX_HOST].to_numpy()
+    end_milli_secs = start_milli_secs + duration_milli_secs + queued_milli_secs
+    return pool_codes, pool_names, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems
+
+
+def get_pools_union_milli_secs(pool_codes, starts, ends, pool_number, span):
+    """
+    Get the covered milliseconds of the union of intervals for each pool. The intervals must be in
+    [0, span), each pool is shifted by a multiple of span, so one running max over the intervals sorted
+    by pool and start never crosses pools.
+
+    :param pool_codes: (ndarray) The pool codes of intervals.
+    :param starts: (ndarray) The starts of intervals.
+    :param ends: (ndarray) The ends of intervals.
+    :param pool_number: (int) The number of pools.
+    :param span: (int) The upper bound of intervals.
+    :return: (ndarray) A int64 array of covered milliseconds indexed by pool code.
+    """
+    union_milli_secs = np.zeros(pool_number, dtype=np.int64)
+    nonempty = ends > starts
+    if not nonempty.any():
+        return union_milli_secs
+    pool_codes, starts, ends = pool_codes[nonempty], starts[nonempty], ends[nonempty]
+    offsets = pool_codes.astype(np.int64) * span
+    order = np.lexsort((starts, pool_codes))
+    starts, ends, pool_codes = (starts + offsets)[order], (ends + offsets)[order], pool_codes[order]
+    cursors = np.maximum.accumulate(np.concatenate(([0], ends[:-1])))
+    np.add.at(union_milli_secs, pool_codes, np.maximum(ends - np.maximum(starts, cursors), 0))
+    return union_milli_secs
+
+
+def calculate_pools_stat_partials(queries_info, start_milli_sec, end_milli_sec):
+    """
+    Calculate the mergeable partial statistics of each pool in time slice [start_milli_sec, end_milli_sec).
+
+    The wait and run intervals of queries are clipped to the time slice, and a query is counted in the
+    time slice which it starts in, or counted as carried if it starts before the time slice.
+
+    :param queries_info: (DataFrame) The query information.
+    :param start_milli_sec: (int) The start milliseconds of time slice.
+    :param end_milli_sec: (int) The end milliseconds of time slice.
+    :return: (dict) A dict object mapping pool name to a PoolStatPartial object.
+    """
+    return calculate_intervals_stat_partials(get_queries_intervals(queries_info), start_milli_sec, end_milli_sec)
+
+
+def calculate_intervals_stat_partials(queries_intervals, start_milli_sec, end_milli_sec):
+    """
+    Calculate the mergeable partial statistics of each pool in time slice [start_milli_sec, end_milli_sec) from
+    the intervals of queries, so the intervals are got once for many time slices.
+
+    :param queries_intervals: (tuple) The intervals of queries got by get_queries_intervals.
+    :param start_milli_sec: (int) The start milliseconds of time slice.
+    :param end_milli_sec: (int) The end milliseconds of time slice.
+    :return: (dict) A dict object mapping pool name to a PoolStatPartial object.
+    """
+    pool_codes, pool_names, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems = queries_intervals
+    valid = (pool_codes >= 0) & (start_milli_secs < end_milli_sec) & ((start_milli_secs >= start_milli_sec) | (
+        np.maximum(end_milli_secs, start_milli_secs + queued_milli_secs) > start_milli_sec))
+    pool_codes, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems = \
+        pool_codes[valid], start_milli_secs[valid], queued_milli_secs[valid], end_milli_secs[valid], used_mems[valid]
+    pool_number = len(pool_names)
+
+    counted = start_milli_secs >= start_milli_sec
+    query_totals = np.bincount(pool_codes[counted], minlength=pool_number)
+    wait_query_totals = np.bincount(pool_codes[counted & (queued_milli_secs > 0)], minlength=pool_number)
+    carried_query_totals = np.bincount(pool_codes[~counted], minlength=pool_number)
+    carried_wait_query_totals = np.bincount(pool_codes[~counted & (queued_milli_secs > 0)], minlength=pool_number)
+
+    wait_starts = np.clip(start_milli_secs, start_milli_sec, end_milli_sec) - start_milli_sec
+    wait_ends = np.clip(start_milli_secs + queued_milli_secs, start_milli_sec, end_milli_sec) - start_milli_sec
+    run_starts = np.clip(start_milli_secs + queued_milli_secs, start_milli_sec, end_milli_sec) - start_milli_sec
+    run_ends = np.clip(end_milli_secs, start_milli_sec, end_milli_sec) - start_milli_sec
+
+    span = end_milli_sec - start_milli_sec
+    wait_milli_secs = get_pools_union_milli_secs(pool_codes, wait_starts, wait_ends, pool_number, span)
+    run_milli_secs = get_pools_union_milli_secs(pool_codes, run_starts, run_ends, pool_number, span)
+    wait_mem_totals = np.zeros(pool_number, dtype=used_mems.dtype)
+    np.add.at(wait_mem_totals, pool_codes, used_mems * np.maximum(wait_ends - wait_starts, 0))
+    used_mem_totals = np.zeros(pool_number, dtype=used_mems.dtype)
+    np.add.at(used_mem_totals, pool_codes, used_mems * np.maximum(run_ends - run_starts, 0))
+
+    pools_stat_partial = {}
+    for code in np.unique(pool_codes):
+        pool_name = pool_names[code]
+        pools_stat_partial[pool_name] = PoolStatPartial(
+            pool_name, start_milli_sec, end_milli_sec, query_totals[code].item(), wait_query_totals[code].item(),
+            run_milli_secs[code].item(), wait_milli_secs[code].item(), used_mem_totals[code].item(),
+            wait_mem_totals[code].item(), carried_query_totals[code].item(), carried_wait_query_totals[code].item())
+    return pools_stat_partial
+
+
+def get_percentile(values, percent):
+    """
+    Get the percentile of values, which is one of values that not less than the given percent of values.
+
+    :param values: (ndarray) The values.
+    :param percent: (int) The percent.
+    :return: (int) The percentile of values, 0 if values is empty.
+    """
+    if values.shape[0] == 0:
+        return 0
+    return int(np.percentile(values, percent, method="higher"))
+
+
+def get_demand_steps(starts, ends, mems):
+    """
+    Get the step function of concurrent memory by a sweep line over the starts and ends of intervals.
+
+    :param starts: (ndarray) The starts of intervals.
+    :param ends: (ndarray) The ends of intervals.
+    :param mems: (ndarray) The memory of intervals.
+    :return: (tuple) A tuple object that contains the sorted milliseconds at which the concurrent memory
+        changes, and the concurrent memory since then.
+    """
+    nonempty = ends > starts
+    milli_secs = np.concatenate((starts[nonempty], ends[nonempty]))
+    deltas = np.concatenate((mems[nonempty], -mems[nonempty]))
+    order = np.argsort(milli_secs, kind="stable")
+    milli_secs, levels = milli_secs[order], np.cumsum(deltas[order])
+    # keep the level after all changes at the same millisecond
+    last = np.concatenate((milli_secs[1:] != milli_secs[:-1], [True])) if milli_secs.shape[0] else milli_secs
+    return milli_secs[last], levels[last]
+
+
+def get_demand_samples(step_milli_secs, levels, sample_milli_secs):
+    """
+    Sample the step function of concurrent memory.
+
+    :param step_milli_secs: (ndarray) The sorted milliseconds at which the concurrent memory changes.
+    :param levels: (ndarray) The concurrent memory since the milliseconds.
+    :param sample_milli_secs: (ndarray) The sample milliseconds.
+    :return: (ndarray) The concurrent memory at sample milliseconds.
+    """
+    indexes = np.searchsorted(step_milli_secs, sample_milli_secs, side="right") - 1
+    if levels.shape[0] == 0:
+        return np.zeros(sample_milli_secs.shape[0], dtype=np.int64)
+    return np.where(indexes >= 0, levels[np.maximum(indexes, 0)], 0)
+
+
+def calculate_pools_demand(queries_info, start_milli_sec, end_milli_sec, resolution_milli_secs):
+    """
+    Calculate the concurrent memory demand timeline of each pool in [start_milli_sec, end_milli_sec).
+
+    The wait interval [start, start + admission_wait) and the run interval [start + admission_wait, end) of
+    each query carry the used memory mem_limit * max_host. For each pool, the starts and ends of intervals
+    are swept in sorted order to build the step function of concurrent memory, so the timeline is built in
+    O(n log n), then the step function is sampled every resolution_milli_secs.
+
+    :param queries_info: (DataFrame) The query information.
+    :param start_milli_sec: (int) The start milliseconds of statistic window.
+    :param end_milli_sec: (int) The end milliseconds of statistic window.
+    :param resolution_milli_secs: (int) The milliseconds between samples.
+    :return: (dict) A dict object mapping pool name to a PoolDemand object.
+    """
+    pool_codes, pool_names, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems = \
+        get_queries_intervals(queries_info.reset_index(drop=True))
+    wait_starts = np.clip(start_milli_secs, start_milli_sec, end_milli_sec)
+    wait_ends = np.clip(start_milli_secs + queued_milli_secs, start_milli_sec, end_milli_sec)
+    run_ends = np.clip(end_milli_secs, start_milli_sec, end_milli_sec)
+    sample_milli_secs = np.arange(start_milli_sec, end_milli_sec, resolution_milli_secs, dtype=np.int64)
+
+    pools_demand = {}
+    for code, pool_name in enumerate(pool_names):
+        in_pool = pool_codes == code
+        pool_demand = []
+        for starts, ends in ((wait_ends, run_ends), (wait_starts, wait_ends)):
+            step_milli_secs, levels = get_demand_steps(starts[in_pool], ends[in_pool], used_mems[in_pool])
+            peak = levels.max().item() if levels.shape[0] else 0
+            pool_demand.append((get_demand_samples(step_milli_secs, levels, sample_milli_secs), peak))
+        (used_samples, used_mem_peak), (wait_samples, wait_mem_peak) = pool_demand
+        pools_demand[pool_name] = PoolDemand(pool_name, sample_milli_secs, used_samples, wait_samples,
+                                             int(used_mem_peak), int(wait_mem_peak))
+    return pools_demand
+
+
+def set_pools_demand(pools_stat, queries_info, start_time, end_time, resolution_seconds):
+    """
+    Set the concurrent memory demand timeline to the statistics of pools.
+
+    :param pools_stat: (dict) A dict object mapping pool name to a PoolStat object.
+    :param queries_info: (DataFrame) The query information.
+    :param start_time: (datetime) The start time of statistic window.
+    :param end_time: (datetime) The end time of statistic window.
+    :param resolution_seconds: (int) The seconds between samples of timeline.
+    """
+    if not pools_stat or queries_info is None:
+        return
+    start_milli_sec = int(time.mktime(start_time.timetuple()) * 1000)
+    end_milli_sec = int(time.mktime(end_time.timetuple()) * 1000)
+    pools_demand = calculate_pools_demand(queries_info, start_milli_sec, end_milli_sec, resolution_seconds * 1000)
+    for pool_name, pool_stat in pools_stat.items():
+        pool_stat.demand = pools_demand.get(pool_name)
+    LOGGER.info("pools demand info: %s", pools_demand)
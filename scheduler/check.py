@@ -1,9 +1,8 @@
 import logging
 
 from scheduler.constants import ClouderaManagerSectOpts, ScheduleSectOpts, PoolSectOpts, EmailSectOpts, ReportSectOpts
-from scheduler.cloudera_manager import ClouderaManager
-from scheduler.global_utils import get_cloudera_manager_config
-from scheduler.impala_pool_config import ImpalaScheduledAllocations
+from scheduler.constants import MAX_FETCH_QUERIES_PAGE_SIZE, MAX_METRICS_PORT
+from scheduler.schedule_context import ScheduleContext
 
 REQUIRED_CONFIG_SECTIONS = [ClouderaManagerSectOpts.SECT_CLOUDERA_MANAGER,
                             ScheduleSectOpts.SECT_SCHEDULE,
@@ -23,6 +22,32 @@ REQUIRED_SCHEDULE_OPTIONS = [ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES,
                              ScheduleSectOpts.OPT_BUSY_POOL_THRESHOLD_SECONDS,
                              ScheduleSectOpts.OPT_FETCH_QUERIES_TIMEDELTA_MINUTES]
 
+OPTIONAL_POSITIVE_INTEGER_SCHEDULE_OPTIONS = [ScheduleSectOpts.OPT_FETCH_DETAILS_CONCURRENCY,
+                                              ScheduleSectOpts.OPT_QUERY_DETAILS_CACHE_TTL_HOURS,
+                                              ScheduleSectOpts.OPT_QUERY_DETAILS_CACHE_MAX_SIZE,
+                                              ScheduleSectOpts.OPT_FETCH_QUERIES_SLICES,
+                                              ScheduleSectOpts.OPT_POOL_STAT_PARTIAL_MINUTES,
+                                              ScheduleSectOpts.OPT_POOL_DEMAND_RESOLUTION_SECONDS,
+                                              ScheduleSectOpts.OPT_QUERY_HISTORY_RETENTION_DAYS,
+                                              ScheduleSectOpts.OPT_QUERY_INGEST_WINDOW_MAX_SIZE,
+                                              ScheduleSectOpts.OPT_PROFILE_EVERY_N_CYCLES,
+                                              ScheduleSectOpts.OPT_PROFILE_RETENTION_COUNT,
+                                              ScheduleSectOpts.OPT_PROFILE_TOP_ALLOCATIONS]
+
+OPTIONAL_RATIO_SCHEDULE_OPTIONS = [ScheduleSectOpts.OPT_DEMAND_FORECAST_ALPHA,
+                                   ScheduleSectOpts.OPT_DEMAND_FORECAST_TREND_ALPHA,
+                                   ScheduleSectOpts.OPT_DAMPING_EMA_ALPHA]
+
+OPTIONAL_NON_NEGATIVE_SCHEDULE_OPTIONS = [ScheduleSectOpts.OPT_DAMPING_MIN_CHANGE_MEM,
+                                          ScheduleSectOpts.OPT_DAMPING_COOLDOWN_MINUTES,
+                                          ScheduleSectOpts.OPT_DAMPING_OSCILLATION_MINUTES,
+                                          ScheduleSectOpts.OPT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS,
+                                          ScheduleSectOpts.OPT_QUEUE_MONITOR_MIN_SPACING_MINUTES]
+
+OPTIONAL_POSITIVE_SCHEDULE_OPTIONS = [ScheduleSectOpts.OPT_QUEUE_MONITOR_INTERVAL_SECONDS,
+                                      ScheduleSectOpts.OPT_QUEUE_MONITOR_WINDOW_MINUTES,
+                                      ScheduleSectOpts.OPT_QUERY_INGEST_INTERVAL_SECONDS]
+
 REQUIRED_EMAIL_OPTIONS = [EmailSectOpts.OPT_SERVER,
                           EmailSectOpts.OPT_USERNAME,
                           EmailSectOpts.OPT_PASSWORD,
@@ -39,6 +64,7 @@ TYPE_IMPALAD = "IMPALAD"
 TYPE_STATE_STORE = "STATESTORE"
 HEALTH_SUMMARY = "healthSummary"
 HEALTH_SUMMARY_VALUE = "GOOD"
+STATIC_OPTIONS_CHECKED_KEY = "static_options_checked"
 
 
 def check_required_sections(scheduler_config):
@@ -53,22 +79,37 @@ def check_required_sections(scheduler_config):
             raise KeyError("section [{}] is required.".format(section))
 
 
-def check_required_options(scheduler_config):
+def check_required_options(scheduler_config, context=None):
     """
     Check the options that must be configured.
 
+    The options that do not depend on the impala configuration are checked once as long as the result is
+    cached by the context.
+
     :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :param context: (ScheduleContext) The context of scheduling cycle.
+    """
+    if context is None:
+        context = ScheduleContext(scheduler_config)
+
+    context.get_cached(STATIC_OPTIONS_CHECKED_KEY, lambda: check_static_options(scheduler_config))
+
+    check_pool_options(context.get_impala_scheduled_allocations(), scheduler_config)
+
+
+def check_static_options(scheduler_config):
+    """
+    Check the options that do not depend on the impala configuration.
+
+    :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :return: (bool) True if the options are checked.
     """
     check_cloudera_manager_options(scheduler_config)
 
     check_schedule_options(scheduler_config)
 
-    cloudera_manager = ClouderaManager(*get_cloudera_manager_config(scheduler_config))
-    impala_config_json = cloudera_manager.get_impala_config()
-    impala_scheduled_allocations = ImpalaScheduledAllocations(impala_config_json)
-    check_pool_options(impala_scheduled_allocations, scheduler_config)
-
     check_report_options(scheduler_config)
+    return True
 
 
 def check_cloudera_manager_options(scheduler_config):
@@ -115,6 +156,55 @@ def check_schedule_options(scheduler_config):
             raise ValueError("option [{}: {}] is not allowed, it must be valued in (0, 1.0]."
                              .format(option, section_schedule[option]))
 
+    check_optional_options(section_schedule, OPTIONAL_POSITIVE_INTEGER_SCHEDULE_OPTIONS,
+                           lambda value: isinstance(value, int) and value > 0, "a positive integer")
+    check_optional_options(section_schedule, OPTIONAL_RATIO_SCHEDULE_OPTIONS,
+                           lambda value: is_number(value) and 0 < value <= 1.0, "valued in (0, 1.0]")
+    check_optional_options(section_schedule, OPTIONAL_NON_NEGATIVE_SCHEDULE_OPTIONS,
+                           lambda value: is_number(value) and value >= 0, "a non-negative number")
+    check_optional_options(section_schedule, OPTIONAL_POSITIVE_SCHEDULE_OPTIONS,
+                           lambda value: is_number(value) and value > 0, "a positive number")
+    check_optional_options(section_schedule, [ScheduleSectOpts.OPT_METRICS_PORT],
+                           lambda value: isinstance(value, int) and 0 < value <= MAX_METRICS_PORT,
+                           "valued in [1, {}]".format(MAX_METRICS_PORT))
+    check_optional_options(section_schedule, [ScheduleSectOpts.OPT_DAMPING_MIN_CHANGE_RATIO],
+                           lambda value: is_number(value) and 0 <= value <= 1.0, "valued in [0, 1.0]")
+
+    page_size = section_schedule.get(ScheduleSectOpts.OPT_FETCH_QUERIES_PAGE_SIZE, MAX_FETCH_QUERIES_PAGE_SIZE)
+    if not (isinstance(page_size, int) and 0 < page_size <= MAX_FETCH_QUERIES_PAGE_SIZE):
+        LOGGER.error("option [%s: %s] is not allowed, it must be valued in [1, %d].",
+                     ScheduleSectOpts.OPT_FETCH_QUERIES_PAGE_SIZE, page_size, MAX_FETCH_QUERIES_PAGE_SIZE)
+        raise ValueError("option [{}: {}] is not allowed, it must be valued in [1, {}]."
+                         .format(ScheduleSectOpts.OPT_FETCH_QUERIES_PAGE_SIZE, page_size, MAX_FETCH_QUERIES_PAGE_SIZE))
+
+
+def is_number(value):
+    """
+    Check whether the value is a number, the bool value is not a number.
+
+    :param value: The value of option.
+    :return: (bool) True if the value is a int or float number.
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_optional_options(section_schedule, options, is_allowed, requirement):
+    """
+    Check the values of the optional schedule options that are configured.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :param options: (list) The optional options.
+    :param is_allowed: (function) The function returns whether the value of option is allowed.
+    :param requirement: (str) The requirement of value in error message, such as "a positive integer".
+    """
+    for option in options:
+        # check optional value
+        if option in section_schedule and not is_allowed(section_schedule[option]):
+            LOGGER.error("option [%s: %s] is not allowed, it must be %s.", option, section_schedule[option],
+                         requirement)
+            raise ValueError("option [{}: {}] is not allowed, it must be {}."
+                             .format(option, section_schedule[option], requirement))
+
 
 def check_pool_options(impala_scheduled_allocations, scheduler_config):
     """
@@ -128,7 +218,8 @@ def check_pool_options(impala_scheduled_allocations, scheduler_config):
 
     for pool_name, pool_value in section_pool.items():
         # check pool name
-        if pool_name not in pool_names:
+        impala_pool = impala_scheduled_allocations.get_pool(pool_name)
+        if impala_pool is None:
             LOGGER.error("option [%s: %s] is not allowed, it must be valued in %s.",
                          pool_name, section_pool[pool_name], pool_names)
             raise KeyError("option [{}: {}] is not allowed, it must be valued in {}"
@@ -136,15 +227,15 @@ def check_pool_options(impala_scheduled_allocations, scheduler_config):
 
         # check pool value
         if not (0 < pool_value[PoolSectOpts.OPT_MIN_MEM] <=
-                impala_scheduled_allocations.get_pool(pool_name).get_pool_mem() <=
+                impala_pool.get_pool_mem() <=
                 pool_value[PoolSectOpts.OPT_MAX_MEM]):
             LOGGER.error("option [%s: %s] is not allowed, it must be valued in 0 < %s <= %s <= %s",
                          pool_name, section_pool[pool_name], pool_value[PoolSectOpts.OPT_MIN_MEM],
-                         impala_scheduled_allocations.get_pool(pool_name).get_pool_mem(),
+                         impala_pool.get_pool_mem(),
                          pool_value[PoolSectOpts.OPT_MAX_MEM])
             raise ValueError("option [{}: {}] is not allowed, it must be valued in 0 < {} <= {} <= {}"
                              .format(pool_name, section_pool[pool_name], pool_value[PoolSectOpts.OPT_MIN_MEM],
-                                     impala_scheduled_allocations.get_pool(pool_name).get_pool_mem(),
+                                     impala_pool.get_pool_mem(),
                                      pool_value[PoolSectOpts.OPT_MAX_MEM]))
 
 
@@ -184,19 +275,21 @@ def check_report_options(scheduler_config):
         check_email_options(scheduler_config)
 
 
-def check_impala_health(scheduler_config):
+def check_impala_health(scheduler_config, context=None):
     """
     Check the health of impala cluster.
 
     :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :param context: (ScheduleContext) The context of scheduling cycle.
     :return: (bool) a bool object represent the health status of impala cluster.
     """
-    cloudera_manager = ClouderaManager(*get_cloudera_manager_config(scheduler_config))
+    if context is None:
+        context = ScheduleContext(scheduler_config)
     section_schedule = scheduler_config.get(ScheduleSectOpts.SECT_SCHEDULE)
     schedule_available_impalad_threshold = section_schedule[ScheduleSectOpts.OPT_SCHEDULE_AVAILABLE_IMPALAD_THRESHOLD]
     health_imaplad_count = 0
     health_state_store_status = False
-    for role in cloudera_manager.get_roles().get(ITEMS):
+    for role in context.get_roles().get(ITEMS):
         temp_type = role.get(TYPE)
         heath_summary = role.get(HEALTH_SUMMARY)
         if temp_type == TYPE_IMPALAD and heath_summary == HEALTH_SUMMARY_VALUE:
@@ -1,15 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
 import re
 import pandas as pd
 
 from scheduler.impala_api_client import ImpalaApiResource
-from scheduler.constants import NativeQueryInfoColumn, FormativeQueryInfoColumn
+from scheduler.constants import NativeQueryInfoColumn, FormativeQueryInfoColumn, \
+    DEFAULT_FETCH_DETAILS_CONCURRENCY, DEFAULT_FETCH_QUERIES_PAGE_SIZE, COMPLETED_QUERY_STATES, QUERY_INFO_COLUMNS
 from scheduler.global_utils import convert_mem_unit, spend_time
+from scheduler.metrics import REGISTRY, PHASE_SECONDS
 
 MEM_LIMIT_REGEX = re.compile(r"MEM_LIMIT=(\d+)")
 HOSTS_REGEX = re.compile(r"hosts=(\d+)")
 
+MIN_SLICE_TIMEDELTA = timedelta(seconds=1)
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -19,7 +24,7 @@ class ClouderaManager(object):
     impala cluster and update the configuration of impala cluster.
     """
 
-    def __init__(self, server_url, api_version, cluster_name, username, password):
+    def __init__(self, server_url, api_version, cluster_name, username, password, transport_options=None):
         """
         Creates a ClouderaManager object that provides methods to get and update the query information and
         the configuration of impala cluster.
@@ -29,8 +34,9 @@ class ClouderaManager(object):
         :param cluster_name: (str) The cluster name.
         :param username: (str) The username for login cloudera manager.
         :param password: (str) The password for login cloudera manager.
+        :param transport_options: (dict) The options of http transport.
         """
-        self.__api = ImpalaApiResource(server_url, api_version, cluster_name, username, password)
+        self.__api = ImpalaApiResource(server_url, api_version, cluster_name, username, password, transport_options)
 
     @classmethod
     def __add_timedelta(cls, gmt):
@@ -64,13 +70,23 @@ class ClouderaManager(object):
         str_hosts = HOSTS_REGEX.findall(content)
         return max(int(str_host) for str_host in str_hosts) if str_hosts else 0
 
-    def __parse_requires_from_details(self, query_id):
+    def __parse_requires_from_details(self, query_id, details_cache=None, is_completed=False):
         """
         Parse mem limit and max hosts from query details by query_id.
 
+        If details_cache is given, the cached query details are returned without fetching, and the
+        parsed query details of completed query are cached.
+
         :param query_id: (str) The query id.
+        :param details_cache: (QueryDetailsCache) The cache of parsed query details.
+        :param is_completed: (bool) Whether the query has been completed.
         :return: (tuple) A tuple object that contains mem limit and max hosts.
         """
+        if details_cache is not None:
+            cached_details = details_cache.get(query_id)
+            if cached_details is not None:
+                return cached_details
+
         mem_limit, max_hosts = 0, 0
         try:
             query_details_response = self.get_query_details(query_id)
@@ -78,84 +94,245 @@ class ClouderaManager(object):
             query_details = query_details_response[NativeQueryInfoColumn.DETAILS]
             mem_limit = ClouderaManager.__find_mem_limit(query_details)
             max_hosts = ClouderaManager.__find_max_hosts(query_details)
+            if details_cache is not None and is_completed:
+                details_cache.put(query_id, convert_mem_unit(mem_limit, "B", "MB"), max_hosts)
         except Exception as e:
-            LOGGER.warning(e, "query_id", query_id)
+            LOGGER.warning("fail to parse details of query_id: %s, caused by: %s", query_id, e)
         return convert_mem_unit(mem_limit, "B", "MB"), max_hosts
 
-    def fetch_page_impala_query_info(self, start_time, end_time, filter_str=""):
+    def __fetch_requires_from_details(self, query_ids, query_states, details_concurrency, details_cache=None):
         """
-        Get filtered impala query information by page from the end_time to the start_time.
+        Fetch query details and parse mem limit and max hosts of the given queries concurrently, the number
+        of running http requests is bounded by details_concurrency.
+
+        :param query_ids: (list) The query ids.
+        :param query_states: (list) The query states, in the same order as query_ids.
+        :param details_concurrency: (int) The max number of query details fetched concurrently.
+        :param details_cache: (QueryDetailsCache) The cache of parsed query details.
+        :return: (list) A list of tuples that contains mem limit and max hosts, in the same order as query_ids.
+        """
+        def parse(query_id, query_state):
+            return self.__parse_requires_from_details(query_id, details_cache, query_state in COMPLETED_QUERY_STATES)
+
+        if details_concurrency <= 1 or len(query_ids) <= 1:
+            return [parse(query_id, query_state) for query_id, query_state in zip(query_ids, query_states)]
+
+        with ThreadPoolExecutor(max_workers=min(details_concurrency, len(query_ids))) as executor:
+            return list(executor.map(parse, query_ids, query_states))
+
+    def iter_impala_query_pages(self, start_time, end_time, filter_str="",
+                                page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE):
+        """
+        Iterate the filtered impala queries by page from the end_time to the start_time. The end time of next
+        page is the earliest start time of current page.
 
         :param start_time: (datetime) The start time to fetching query information.
         :param end_time: (datetime) The end time to fetching query information.
         :param filter_str: (str) The filter string to fetch query information.
-        :return: (DataFrame) A DataFrame object of fetched query information.
+        :param page_size: (int) The max number of queries in one page.
+        :return: (generator) A generator of tuples that contains the native queries of one page and
+            their start times.
         """
-        LOGGER.info("fetching impala query info page data, start_time: %s, end_time: %s" % (start_time, end_time))
-        impala_query_response = self.get_impala_queries(start_time, end_time, filter_str)
+        while start_time < end_time:
+            LOGGER.info("fetching impala query info page data, start_time: %s, end_time: %s", start_time, end_time)
+            queries, start_times = self.__get_impala_query_page(start_time, end_time, filter_str, page_size)
+            LOGGER.info("impala query info page data size: %d", len(queries))
+            if not queries:
+                break
+
+            yield queries, start_times
+            end_time = min(start_times) - timedelta(milliseconds=1)
+
+    def __get_impala_query_page(self, start_time, end_time, filter_str, page_size):
+        """
+        Get the latest page of filtered impala queries between end_time and start_time.
+
+        :param start_time: (datetime) The start time to fetching query information.
+        :param end_time: (datetime) The end time to fetching query information.
+        :param filter_str: (str) The filter string to fetch query information.
+        :param page_size: (int) The max number of queries in one page.
+        :return: (tuple) A tuple object that contains the native queries of the page and their start times.
+        """
+        impala_query_response = self.get_impala_queries(start_time, end_time, filter_str, page_size)
         queries = impala_query_response[NativeQueryInfoColumn.QUERIES]
-        LOGGER.info("impala query info page data size: %d" % len(queries))
-        if not queries:
-            return None
-        df_queries = pd.DataFrame(impala_query_response[NativeQueryInfoColumn.QUERIES])
+        start_times = [ClouderaManager.__add_timedelta(query[NativeQueryInfoColumn.START_TIME])
+                       for query in queries]
+        return queries, start_times
+
+    def iter_sliced_impala_query_pages(self, start_time, end_time, filter_str="",
+                                       page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE, slices=1):
+        """
+        Iterate the filtered impala queries by page from the end_time to the start_time, the time range is
+        split into slices which are fetched concurrently.
 
-        sr_query_ids = df_queries[NativeQueryInfoColumn.QUERY_ID]
-        sr_start_times = df_queries[NativeQueryInfoColumn.START_TIME].apply(ClouderaManager.__add_timedelta)
-        sr_duration_mills = df_queries[NativeQueryInfoColumn.DURATION_MILLIS]
-        sr_pools = [x[NativeQueryInfoColumn.POOL] for x in df_queries[NativeQueryInfoColumn.ATTRIBUTES]]
-        sr_admission_waits = [x[NativeQueryInfoColumn.ADMISSION_WAIT] for x in df_queries[NativeQueryInfoColumn.ATTRIBUTES]]
-        df_base = pd.DataFrame(data={FormativeQueryInfoColumn.QUERY_ID: sr_query_ids,
-                                     FormativeQueryInfoColumn.START_TIME: sr_start_times,
-                                     FormativeQueryInfoColumn.DURATION_MILLIS: sr_duration_mills,
-                                     FormativeQueryInfoColumn.POOL: sr_pools,
-                                     FormativeQueryInfoColumn.ADMISSION_WAIT: sr_admission_waits})
+        A slice is completed once its page is not full. Otherwise, the rest of the slice, which ends before the
+        earliest start time of the page just like the serial paging, is bisected and fetched concurrently. The
+        pages are yielded from the latest slice to the earliest one, so the merged pages are in the same order
+        as the serial paging.
 
-        sr_details = sr_query_ids.apply(self.__parse_requires_from_details)
-        df_details = pd.DataFrame(data=(x for x in sr_details),
-                                  columns=[FormativeQueryInfoColumn.MEM_LIMIT, FormativeQueryInfoColumn.MAX_HOST])
-        LOGGER.info("finish fetch impala query info page data, start_time: %s, end_time: %s" % (start_time, end_time))
+        :param start_time: (datetime) The start time to fetching query information.
+        :param end_time: (datetime) The end time to fetching query information.
+        :param filter_str: (str) The filter string to fetch query information.
+        :param page_size: (int) The max number of queries in one page.
+        :param slices: (int) The number of slices fetched concurrently.
+        :return: (generator) A generator of tuples that contains the native queries of one page and
+            their start times.
+        """
+        if slices <= 1:
+            yield from self.iter_impala_query_pages(start_time, end_time, filter_str, page_size)
+            return
+
+        LOGGER.info("fetching impala query info by %d slices, start_time: %s, end_time: %s",
+                    slices, start_time, end_time)
+        with ThreadPoolExecutor(max_workers=slices) as executor:
+            def split(range_start_time, range_end_time, number):
+                """
+                Split the time range into slices and submit them, from the latest one to the earliest one.
+                Adjacent slices share the bound, the duplicated queries are removed when building.
+                """
+                if range_end_time - range_start_time < MIN_SLICE_TIMEDELTA * number:
+                    number = 1
+                step = (range_end_time - range_start_time) / number
+                bounds = [range_end_time - step * i for i in range(number)] + [range_start_time]
+                return [(bounds[i + 1], bounds[i], executor.submit(self.__get_impala_query_page, bounds[i + 1],
+                                                                   bounds[i], filter_str, page_size))
+                        for i in range(number)]
+
+            pending_slices = split(start_time, end_time, slices)
+            while pending_slices:
+                slice_start_time, slice_end_time, future = pending_slices.pop(0)
+                queries, start_times = future.result()
+                LOGGER.info("impala query info page data size: %d, start_time: %s, end_time: %s",
+                            len(queries), slice_start_time, slice_end_time)
+                if not queries:
+                    continue
+
+                yield queries, start_times
+                rest_end_time = min(start_times) - timedelta(milliseconds=1)
+                if len(queries) >= page_size and slice_start_time < rest_end_time:
+                    pending_slices[0:0] = split(slice_start_time, rest_end_time, 2)
+
+    def __build_query_info(self, pages, details_concurrency, details_cache):
+        """
+        Build the query information of the given pages. Queries are deduplicated by query id as they arrive,
+        so the details of duplicated queries are fetched only once, and the columns are accumulated in lists
+        before building the DataFrame at once.
+
+        :param pages: (iterable) The tuples that contains the native queries of one page and their start times.
+        :param details_concurrency: (int) The max number of query details fetched concurrently.
+        :param details_cache: (QueryDetailsCache) The cache of parsed query details.
+        :return: (DataFrame) A DataFrame object of query information, None if there is no query.
+        """
+        columns = {column: [] for column in QUERY_INFO_COLUMNS}
+        seen_query_ids = set()
+        for queries, start_times in pages:
+            query_ids, query_states = [], []
+            for query, start_time in zip(queries, start_times):
+                query_id = query[NativeQueryInfoColumn.QUERY_ID]
+                if query_id in seen_query_ids:
+                    continue
+                seen_query_ids.add(query_id)
+
+                attributes = query[NativeQueryInfoColumn.ATTRIBUTES]
+                query_ids.append(query_id)
+                query_states.append(query.get(NativeQueryInfoColumn.QUERY_STATE))
+                columns[FormativeQueryInfoColumn.START_TIME].append(start_time)
+                columns[FormativeQueryInfoColumn.DURATION_MILLIS].append(
+                    query.get(NativeQueryInfoColumn.DURATION_MILLIS))
+                columns[FormativeQueryInfoColumn.POOL].append(attributes[NativeQueryInfoColumn.POOL])
+                columns[FormativeQueryInfoColumn.ADMISSION_WAIT].append(
+                    attributes[NativeQueryInfoColumn.ADMISSION_WAIT])
+
+            with REGISTRY.time(PHASE_SECONDS, phase="details"):
+                requires = self.__fetch_requires_from_details(query_ids, query_states, details_concurrency,
+                                                              details_cache)
+            for mem_limit, max_host in requires:
+                columns[FormativeQueryInfoColumn.MEM_LIMIT].append(mem_limit)
+                columns[FormativeQueryInfoColumn.MAX_HOST].append(max_host)
+            columns[FormativeQueryInfoColumn.QUERY_ID].extend(query_ids)
+            columns[FormativeQueryInfoColumn.QUERY_STATE].extend(query_states)
+
+        if not columns[FormativeQueryInfoColumn.QUERY_ID]:
+            return None
+        return pd.DataFrame(data=columns, columns=QUERY_INFO_COLUMNS)
 
-        return df_base.join(df_details)
+    def fetch_page_impala_query_info(self, start_time, end_time, filter_str="",
+                                     details_concurrency=DEFAULT_FETCH_DETAILS_CONCURRENCY, details_cache=None,
+                                     page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE):
+        """
+        Get filtered impala query information by page from the end_time to the start_time.
 
-    def fetch_impala_query_info(self, start_time, end_time, filter_str):
+        :param start_time: (datetime) The start time to fetching query information.
+        :param end_time: (datetime) The end time to fetching query information.
+        :param filter_str: (str) The filter string to fetch query information.
+        :param details_concurrency: (int) The max number of query details fetched concurrently.
+        :param details_cache: (QueryDetailsCache) The cache of parsed query details.
+        :param page_size: (int) The max number of queries in one page.
+        :return: (DataFrame) A DataFrame object of fetched query information.
+        """
+        pages = self.iter_impala_query_pages(start_time, end_time, filter_str, page_size)
+        first_page = next(pages, None)
+        pages.close()
+        return self.__build_query_info([first_page] if first_page else [], details_concurrency, details_cache)
+
+    def fetch_impala_query_info(self, start_time, end_time, filter_str,
+                                details_concurrency=DEFAULT_FETCH_DETAILS_CONCURRENCY, details_cache=None,
+                                page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE, slices=1):
         """
         Get total filtered impala query information between end_time and start_time.
 
         :param start_time: (datetime) The start time to fetching query information.
         :param end_time: (datetime) The end time to fetching query information.
         :param filter_str: (str) The filter string to fetch query information.
+        :param details_concurrency: (int) The max number of query details fetched concurrently.
+        :param details_cache: (QueryDetailsCache) The cache of parsed query details.
+        :param page_size: (int) The max number of queries in one page.
+        :param slices: (int) The number of time slices fetched concurrently.
         :return: (DataFrame) A DataFrame object of total fetched query information.
         """
-        LOGGER.info("start fetch impala query info data, start_time: %s, end_time: %s" % (start_time, end_time))
-        data = pd.DataFrame()
-        while start_time < end_time:
-            page_data = self.fetch_page_impala_query_info(start_time, end_time, filter_str)
-            if page_data is None:
-                break
-
-            data = pd.concat([data, page_data], ignore_index=True)
-            end_time = page_data[FormativeQueryInfoColumn.START_TIME].min() - timedelta(milliseconds=1)
-
-        LOGGER.info("finish fetch impala query info data")
+        LOGGER.info("start fetch impala query info data, start_time: %s, end_time: %s", start_time, end_time)
+        pages = self.iter_sliced_impala_query_pages(start_time, end_time, filter_str, page_size, slices)
+        data = self.__build_query_info(pages, details_concurrency, details_cache)
+        LOGGER.info("finish fetch impala query info data, size: %d", 0 if data is None else data.shape[0])
+        return data
 
-        if data.shape[0] == 0:
-            return None
+    def get_pools_admission_wait_secs(self, start_time, end_time, filter_str="",
+                                      page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE):
+        """
+        Get the total admission wait of pools from the latest page of queries between end_time and start_time.
+        The query details are not fetched, so it is a cheap signal of queueing.
 
-        data = data.drop_duplicates([FormativeQueryInfoColumn.QUERY_ID])
-        return data
+        :param start_time: (datetime) The start time to fetching query information.
+        :param end_time: (datetime) The end time to fetching query information.
+        :param filter_str: (str) The filter string to fetch query information.
+        :param page_size: (int) The max number of queries to get.
+        :return: (dict) A dict object mapping pool name to the total admission wait seconds.
+        """
+        pools_wait_secs = {}
+        for query in self.get_impala_queries(start_time, end_time, filter_str, page_size)[
+                NativeQueryInfoColumn.QUERIES]:
+            attributes = query[NativeQueryInfoColumn.ATTRIBUTES]
+            pool = attributes.get(NativeQueryInfoColumn.POOL)
+            admission_wait = attributes.get(NativeQueryInfoColumn.ADMISSION_WAIT)
+            if pool is None or not admission_wait:
+                continue
+            pools_wait_secs[pool] = pools_wait_secs.get(pool, 0) + float(admission_wait) / 1000
+        return pools_wait_secs
 
     @spend_time
-    def get_impala_queries(self, start_time, end_time, filter_str):
+    def get_impala_queries(self, start_time, end_time, filter_str, page_size=DEFAULT_FETCH_QUERIES_PAGE_SIZE):
         """
         Get the filtered impala queries between end_time and start_time.
 
         :param start_time: (datetime) The start time to fetching query information.
         :param end_time: (datetime) The end time to fetching query information.
         :param filter_str: (str) The filter string to fetch query information.
+        :param page_size: (int) The max number of queries to get.
         :return: (dict) A dict object of filtered impala queries between end_time and start_time.
         """
-        return self.__api.get_impala_queries(start_time, end_time, filter_str)
+        return self.__api.get_impala_queries(start_time, end_time, filter_str, page_size)
 
+    @spend_time
     def get_query_details(self, query_id):
         """
         Get the query details by query_id.
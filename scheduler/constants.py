@@ -1,6 +1,54 @@
 IMPALA_SCHEDULED_ALLOCATIONS = "impala_scheduled_allocations"
 QUERY_DATA_SAVE_PATH_PREFIX = "data-"
 SCHEDULER_HOME = "SCHEDULER_HOME"
+DEFAULT_FETCH_DETAILS_CONCURRENCY = 8
+DEFAULT_FETCH_QUERIES_PAGE_SIZE = 100
+MAX_FETCH_QUERIES_PAGE_SIZE = 1000
+DEFAULT_FETCH_QUERIES_SLICES = 1
+DEFAULT_ENABLE_QUERY_DETAILS_CACHE = False
+DEFAULT_QUERY_DETAILS_CACHE_TTL_HOURS = 24
+DEFAULT_QUERY_DETAILS_CACHE_MAX_SIZE = 100000
+COMPLETED_QUERY_STATES = ["FINISHED", "EXCEPTION"]
+DEFAULT_ENABLE_INCREMENTAL_FETCH_QUERIES = False
+DEFAULT_ENABLE_POOL_STAT_PARTIALS = False
+DEFAULT_POOL_STAT_PARTIAL_MINUTES = 1
+DEFAULT_ENABLE_POOL_DEMAND = False
+DEFAULT_POOL_DEMAND_RESOLUTION_SECONDS = 10
+DEFAULT_QUERY_HISTORY_RETENTION_DAYS = 7
+DEFAULT_FAIR_DEMAND_PERCENTILE = 95
+DEFAULT_ENABLE_DEMAND_FORECAST = False
+DEFAULT_DEMAND_FORECAST_ALPHA = 0.3
+DEFAULT_DEMAND_FORECAST_TREND_ALPHA = 0.1
+DEFAULT_ENABLE_ALLOCATION_DAMPING = False
+DEFAULT_DAMPING_MIN_CHANGE_MEM = 0
+DEFAULT_DAMPING_MIN_CHANGE_RATIO = 0.05
+DEFAULT_DAMPING_COOLDOWN_MINUTES = 60
+DEFAULT_DAMPING_EMA_ALPHA = 0.5
+DEFAULT_DAMPING_OSCILLATION_MINUTES = 120
+DEFAULT_ENABLE_HIERARCHICAL_ALLOCATION = False
+DEFAULT_CONTEXT_CACHE_TTL_SECONDS = 0
+DEFAULT_ENABLE_QUEUE_MONITOR = False
+DEFAULT_QUEUE_MONITOR_INTERVAL_SECONDS = 60
+DEFAULT_QUEUE_MONITOR_WINDOW_MINUTES = 5
+DEFAULT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS = 300
+DEFAULT_QUEUE_MONITOR_MIN_SPACING_MINUTES = 10
+DEFAULT_ENABLE_QUERY_INGESTER = False
+DEFAULT_QUERY_INGEST_INTERVAL_SECONDS = 60
+DEFAULT_QUERY_INGEST_WINDOW_MAX_SIZE = 1000000
+DEFAULT_ENABLE_METRICS = False
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+MAX_METRICS_PORT = 65535
+DEFAULT_ENABLE_CYCLE_PROFILING = False
+DEFAULT_PROFILE_EVERY_N_CYCLES = 10
+DEFAULT_PROFILE_RETENTION_COUNT = 20
+DEFAULT_PROFILE_TOP_ALLOCATIONS = 20
+DEFAULT_PROFILE_TRACE_BETWEEN_CYCLES = False
+DEFAULT_HTTP_POOL_SIZE = 16
+DEFAULT_HTTP_CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_HTTP_MAX_RETRIES = 3
+DEFAULT_HTTP_BACKOFF_SECONDS = 0.5
+DEFAULT_HTTP_BACKOFF_MAX_SECONDS = 10
 
 
 class NativeQueryInfoColumn(object):
@@ -15,6 +63,7 @@ class NativeQueryInfoColumn(object):
     POOL = "pool"
     ADMISSION_WAIT = "admission_wait"
     DETAILS = "details"
+    QUERY_STATE = "queryState"
 
 
 class FormativeQueryInfoColumn(object):
@@ -28,6 +77,17 @@ class FormativeQueryInfoColumn(object):
     ADMISSION_WAIT = "admission_wait"
     MEM_LIMIT = "mem_limit"
     MAX_HOST = "max_host"
+    QUERY_STATE = "query_state"
+
+
+QUERY_INFO_COLUMNS = [FormativeQueryInfoColumn.QUERY_ID,
+                      FormativeQueryInfoColumn.START_TIME,
+                      FormativeQueryInfoColumn.DURATION_MILLIS,
+                      FormativeQueryInfoColumn.POOL,
+                      FormativeQueryInfoColumn.ADMISSION_WAIT,
+                      FormativeQueryInfoColumn.QUERY_STATE,
+                      FormativeQueryInfoColumn.MEM_LIMIT,
+                      FormativeQueryInfoColumn.MAX_HOST]
 
 
 class ClouderaManagerSectOpts(object):
@@ -40,6 +100,12 @@ class ClouderaManagerSectOpts(object):
     OPT_API_VERSION = "api_version"
     OPT_USERNAME = "username"
     OPT_PASSWORD = "password"
+    OPT_HTTP_POOL_SIZE = "http_pool_size"
+    OPT_HTTP_CONNECT_TIMEOUT_SECONDS = "http_connect_timeout_seconds"
+    OPT_HTTP_READ_TIMEOUT_SECONDS = "http_read_timeout_seconds"
+    OPT_HTTP_MAX_RETRIES = "http_max_retries"
+    OPT_HTTP_BACKOFF_SECONDS = "http_backoff_seconds"
+    OPT_HTTP_BACKOFF_MAX_SECONDS = "http_backoff_max_seconds"
 
 
 class ScheduleSectOpts(object):
@@ -58,6 +124,46 @@ class ScheduleSectOpts(object):
     OPT_FETCH_QUERIES_TIMEDELTA_MINUTES = "fetch_queries_timedelta_minutes"
     OPT_FETCH_QUERIES_FILTER = "fetch_queries_filter"
     OPT_ENABLE_FETCH_QUERIES_FILE = "enable_fetch_queries_file"
+    OPT_QUERY_HISTORY_RETENTION_DAYS = "query_history_retention_days"
+    OPT_FETCH_DETAILS_CONCURRENCY = "fetch_details_concurrency"
+    OPT_FETCH_QUERIES_PAGE_SIZE = "fetch_queries_page_size"
+    OPT_FETCH_QUERIES_SLICES = "fetch_queries_slices"
+    OPT_ENABLE_QUERY_DETAILS_CACHE = "enable_query_details_cache"
+    OPT_QUERY_DETAILS_CACHE_TTL_HOURS = "query_details_cache_ttl_hours"
+    OPT_QUERY_DETAILS_CACHE_MAX_SIZE = "query_details_cache_max_size"
+    OPT_ENABLE_INCREMENTAL_FETCH_QUERIES = "enable_incremental_fetch_queries"
+    OPT_ENABLE_POOL_STAT_PARTIALS = "enable_pool_stat_partials"
+    OPT_POOL_STAT_PARTIAL_MINUTES = "pool_stat_partial_minutes"
+    OPT_ENABLE_POOL_DEMAND = "enable_pool_demand"
+    OPT_POOL_DEMAND_RESOLUTION_SECONDS = "pool_demand_resolution_seconds"
+    OPT_FAIR_DEMAND_PERCENTILE = "fair_demand_percentile"
+    OPT_ENABLE_DEMAND_FORECAST = "enable_demand_forecast"
+    OPT_DEMAND_FORECAST_ALPHA = "demand_forecast_alpha"
+    OPT_DEMAND_FORECAST_TREND_ALPHA = "demand_forecast_trend_alpha"
+    OPT_ENABLE_ALLOCATION_DAMPING = "enable_allocation_damping"
+    OPT_DAMPING_MIN_CHANGE_MEM = "damping_min_change_mem"
+    OPT_DAMPING_MIN_CHANGE_RATIO = "damping_min_change_ratio"
+    OPT_DAMPING_COOLDOWN_MINUTES = "damping_cooldown_minutes"
+    OPT_DAMPING_EMA_ALPHA = "damping_ema_alpha"
+    OPT_DAMPING_OSCILLATION_MINUTES = "damping_oscillation_minutes"
+    OPT_ENABLE_HIERARCHICAL_ALLOCATION = "enable_hierarchical_allocation"
+    OPT_CONTEXT_CACHE_TTL_SECONDS = "context_cache_ttl_seconds"
+    OPT_ENABLE_QUEUE_MONITOR = "enable_queue_monitor"
+    OPT_QUEUE_MONITOR_INTERVAL_SECONDS = "queue_monitor_interval_seconds"
+    OPT_QUEUE_MONITOR_WINDOW_MINUTES = "queue_monitor_window_minutes"
+    OPT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS = "queue_monitor_wait_threshold_seconds"
+    OPT_QUEUE_MONITOR_MIN_SPACING_MINUTES = "queue_monitor_min_spacing_minutes"
+    OPT_ENABLE_QUERY_INGESTER = "enable_query_ingester"
+    OPT_QUERY_INGEST_INTERVAL_SECONDS = "query_ingest_interval_seconds"
+    OPT_QUERY_INGEST_WINDOW_MAX_SIZE = "query_ingest_window_max_size"
+    OPT_ENABLE_METRICS = "enable_metrics"
+    OPT_METRICS_HOST = "metrics_host"
+    OPT_METRICS_PORT = "metrics_port"
+    OPT_ENABLE_CYCLE_PROFILING = "enable_cycle_profiling"
+    OPT_PROFILE_EVERY_N_CYCLES = "profile_every_n_cycles"
+    OPT_PROFILE_RETENTION_COUNT = "profile_retention_count"
+    OPT_PROFILE_TOP_ALLOCATIONS = "profile_top_allocations"
+    OPT_PROFILE_TRACE_BETWEEN_CYCLES = "profile_trace_between_cycles"
 
 
 class PoolSectOpts(object):
@@ -105,3 +211,23 @@ class ReportColumn(object):
     WEIGHT = "Weight"
     MIN_MEM = "MinMem"
     MAX_MEM = "MaxMem"
+
+
+class HttpEndpoint(object):
+    """
+    The wrapper class contains the endpoints of cloudera manager api.
+    """
+    DEFAULT = "default"
+    IMPALA_QUERIES = "impala_queries"
+    QUERY_DETAILS = "query_details"
+    IMPALA_CONFIG = "impala_config"
+    POOLS_REFRESH = "pools_refresh"
+    ROLES = "roles"
+
+
+DEFAULT_HTTP_READ_TIMEOUT_SECONDS = {HttpEndpoint.DEFAULT: 60,
+                                     HttpEndpoint.IMPALA_QUERIES: 120,
+                                     HttpEndpoint.QUERY_DETAILS: 30,
+                                     HttpEndpoint.IMPALA_CONFIG: 60,
+                                     HttpEndpoint.POOLS_REFRESH: 120,
+                                     HttpEndpoint.ROLES: 30}
@@ -0,0 +1,143 @@
+from datetime import datetime
+import cProfile
+import functools
+import logging
+import os
+import tracemalloc
+
+PROFILE_FILE_PREFIX = "cycle-profile-"
+PROFILE_FILE_SUFFIX = ".prof"
+MEMORY_FILE_PREFIX = "cycle-memory-"
+MEMORY_FILE_SUFFIX = ".txt"
+TIME_FORMAT = "%Y%m%d-%H%M%S"
+TRACEMALLOC_FRAMES = 5
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CycleProfiler(object):
+    """
+    The CycleProfiler class that provides methods for profiling every Nth scheduling cycle by cProfile and
+    tracemalloc, the statistics of cProfile are dumped to a .prof file, and the top allocation diffs within the
+    cycle are dumped to a text file, so the slow phases and the memory retained by cycles of long-running daemon
+    can be tracked over time. Only the latest retention_count dumps of each kind are kept.
+
+    tracemalloc only traces the sampled cycles by default, because tracing slows down every thread of daemon.
+    If trace_between_cycles is True, it keeps tracing from the first sampled cycle until the profiler is closed,
+    and the allocation diffs since the last sampled cycle are also dumped. cProfile only profiles the thread of
+    cycle, the time spent in the worker threads, such as fetching query details concurrently, shows as waiting.
+    """
+
+    def __init__(self, path, every_n_cycles=1, retention_count=20, top_allocations=20, trace_between_cycles=False):
+        """
+        Create a CycleProfiler object.
+
+        :param path: (str) The directory of dumped files.
+        :param every_n_cycles: (int) Sample one cycle every every_n_cycles cycles, starting from the first one.
+        :param retention_count: (int) The max number of dumps of each kind kept in path.
+        :param top_allocations: (int) The number of top allocation diffs dumped.
+        :param trace_between_cycles: (bool) Whether tracemalloc keeps tracing between the sampled cycles.
+        """
+        if not (isinstance(every_n_cycles, int) and every_n_cycles > 0):
+            LOGGER.error("every_n_cycles %s is not allowed, it must be a positive integer.", every_n_cycles)
+            raise ValueError("every_n_cycles {} is not allowed, it must be a positive integer.".format(every_n_cycles))
+        self.__path = path
+        self.__every_n_cycles = every_n_cycles
+        self.__retention_count = retention_count
+        self.__top_allocations = top_allocations
+        self.__trace_between_cycles = trace_between_cycles
+        self.__cycles = 0
+        self.__last_snapshot = None
+        self.__started_tracemalloc = False
+
+    def wrap(self, job):
+        """
+        Wrap the scheduling job, so its runs are sampled by the profiler.
+
+        :param job: (function) The scheduling job.
+        :return: (function) The wrapped job.
+        """
+        @functools.wraps(job)
+        def wrapper(*args, **kwargs):
+            return self.run(job, *args, **kwargs)
+        return wrapper
+
+    def run(self, job, *args, **kwargs):
+        """
+        Run the scheduling job, and profile it if the cycle is sampled.
+
+        :param job: (function) The scheduling job.
+        :return: Reference the result of job.
+        """
+        self.__cycles += 1
+        if (self.__cycles - 1) % self.__every_n_cycles != 0:
+            return job(*args, **kwargs)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.__started_tracemalloc = True
+        name = "%s-%06d" % (datetime.now().strftime(TIME_FORMAT), self.__cycles)
+        start_snapshot = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(job, *args, **kwargs)
+        finally:
+            end_snapshot = tracemalloc.take_snapshot()
+            self.__dump(name, profile, start_snapshot, end_snapshot)
+            if self.__trace_between_cycles:
+                self.__last_snapshot = end_snapshot
+            else:
+                self.close()
+
+    def __dump(self, name, profile, start_snapshot, end_snapshot):
+        """
+        Dump the statistics of cProfile and the top allocation diffs of cycle, and clean the old dumps.
+
+        :param name: (str) The name of cycle in file names.
+        :param profile: (Profile) The cProfile object of cycle.
+        :param start_snapshot: (Snapshot) The tracemalloc snapshot at the start of cycle.
+        :param end_snapshot: (Snapshot) The tracemalloc snapshot at the end of cycle.
+        """
+        try:
+            profile_path = os.path.join(self.__path, PROFILE_FILE_PREFIX + name + PROFILE_FILE_SUFFIX)
+            profile.dump_stats(profile_path)
+
+            lines = ["traced memory: current %d B, peak %d B" % tracemalloc.get_traced_memory()]
+            diffs = [("within the cycle", start_snapshot)]
+            if self.__last_snapshot is not None:
+                diffs.append(("since the last sampled cycle", self.__last_snapshot))
+            for title, snapshot in diffs:
+                stats = end_snapshot.compare_to(snapshot, "lineno")
+                lines.append("")
+                lines.append("top %d allocation diffs %s (total %+d B):" % (
+                    self.__top_allocations, title, sum(stat.size_diff for stat in stats)))
+                lines.extend(str(stat) for stat in stats[:self.__top_allocations])
+            memory_path = os.path.join(self.__path, MEMORY_FILE_PREFIX + name + MEMORY_FILE_SUFFIX)
+            with open(memory_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            LOGGER.info("profiled scheduling cycle is dumped to %s and %s", profile_path, memory_path)
+
+            self.__clean(PROFILE_FILE_PREFIX)
+            self.__clean(MEMORY_FILE_PREFIX)
+        except Exception as e:
+            LOGGER.warning("fail to dump the profile of scheduling cycle, caused by: %s", e)
+
+    def __clean(self, file_name_prefix):
+        """
+        Remove the oldest dumps beyond the retention count.
+
+        :param file_name_prefix: (str) The name prefix of dumps.
+        """
+        # the names start with the time of cycle, so they sort from the oldest
+        files = sorted(file for file in os.listdir(self.__path) if file.startswith(file_name_prefix))
+        for file in files[:max(0, len(files) - self.__retention_count)]:
+            os.remove(os.path.join(self.__path, file))
+
+    def close(self):
+        """
+        Stop tracemalloc if it is started by the profiler, the next sampled cycle starts it again.
+        """
+        if self.__started_tracemalloc:
+            tracemalloc.stop()
+            self.__started_tracemalloc = False
+        self.__last_snapshot = None
@@ -0,0 +1,135 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+from scheduler.base_schedule import get_pool_demand_mems, get_percentile
+
+HOURS_OF_WEEK = 7 * 24
+OBSERVED_DEMAND_PERCENTILE = 95
+PROFILES = "profiles"
+OBSERVED = "observed"
+LEVELS = "levels"
+TRENDS = "trends"
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_hour_of_week(time):
+    """
+    Get the hour of week of time, 0 is the first hour of Monday.
+
+    :param time: (datetime) The time.
+    :return: (int) The hour of week.
+    """
+    return time.weekday() * 24 + time.hour
+
+
+class DemandForecast(object):
+    """
+    The DemandForecast class that provides methods for forecasting the memory demand of pools in the next
+    interval, so the strategies can move memory ahead of the load.
+
+    Every pool has an hour-of-week profile of demand, which is the exponential moving average of the demand
+    observed in the same hour of past weeks, and a short-term level and trend of demand by double exponential
+    smoothing over the cycles. The forecast is the profile of the next hour of week plus the deviation of short
+    term from the profile of the current hour of week, or the short term if the profile has not been observed.
+    The profiles, levels and trends are updated incrementally after every cycle and persisted to local file.
+    """
+
+    def __init__(self, path, alpha, trend_alpha):
+        """
+        Create a DemandForecast object and load the persisted profiles if exists.
+
+        :param path: (str) The path of file to persist the profiles, None means never persisted.
+        :param alpha: (float) The smoothing factor of profiles and levels.
+        :param trend_alpha: (float) The smoothing factor of trends.
+        """
+        self.__path = path
+        self.__alpha = alpha
+        self.__trend_alpha = trend_alpha
+        self.__profiles = {}
+        self.__observed = {}
+        self.__levels = {}
+        self.__trends = {}
+
+        if self.__path is not None and os.path.exists(self.__path):
+            try:
+                state = pd.read_pickle(self.__path)
+                self.__profiles = state[PROFILES]
+                self.__observed = state[OBSERVED]
+                self.__levels = state[LEVELS]
+                self.__trends = state[TRENDS]
+            except Exception as e:
+                LOGGER.warning("fail to load demand forecast from %s, caused by: %s", self.__path, e)
+
+    def update(self, pools_info, time):
+        """
+        Update the profiles, levels and trends of pools by the demand observed in the cycle.
+
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :param time: (datetime) The time of the cycle.
+        """
+        hour_of_week = get_hour_of_week(time)
+        for pool_name, pool_info in pools_info.items():
+            demand = get_percentile(get_pool_demand_mems(pool_info), OBSERVED_DEMAND_PERCENTILE)
+            if pool_name not in self.__profiles:
+                self.__profiles[pool_name] = np.zeros(HOURS_OF_WEEK)
+                self.__observed[pool_name] = np.zeros(HOURS_OF_WEEK, dtype=bool)
+                self.__levels[pool_name] = demand
+                self.__trends[pool_name] = 0
+
+            profile, observed = self.__profiles[pool_name], self.__observed[pool_name]
+            profile[hour_of_week] = demand if not observed[hour_of_week] else \
+                self.__alpha * demand + (1 - self.__alpha) * profile[hour_of_week]
+            observed[hour_of_week] = True
+
+            level, trend = self.__levels[pool_name], self.__trends[pool_name]
+            self.__levels[pool_name] = self.__alpha * demand + (1 - self.__alpha) * (level + trend)
+            self.__trends[pool_name] = self.__trend_alpha * (self.__levels[pool_name] - level) + \
+                (1 - self.__trend_alpha) * trend
+
+    def get_forecast_mem(self, pool_name, time, forecast_time):
+        """
+        Get the forecast memory demand of pool.
+
+        :param pool_name: (str) The pool name.
+        :param time: (datetime) The time of the cycle.
+        :param forecast_time: (datetime) The time to be forecast, usually the next cycle.
+        :return: (float) The forecast memory demand, None if the pool has never been observed.
+        """
+        if pool_name not in self.__profiles:
+            return None
+        profile, observed = self.__profiles[pool_name], self.__observed[pool_name]
+        short_term = self.__levels[pool_name] + self.__trends[pool_name]
+        hour_of_week, forecast_hour_of_week = get_hour_of_week(time), get_hour_of_week(forecast_time)
+        if observed[hour_of_week] and observed[forecast_hour_of_week]:
+            forecast_mem = profile[forecast_hour_of_week] + short_term - profile[hour_of_week]
+        else:
+            forecast_mem = short_term
+        return max(0.0, float(forecast_mem))
+
+    def set_pools_forecast(self, pools_info, time, forecast_time):
+        """
+        Set the forecast memory demand to the statistics of pools.
+
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :param time: (datetime) The time of the cycle.
+        :param forecast_time: (datetime) The time to be forecast, usually the next cycle.
+        """
+        for pool_name, pool_info in pools_info.items():
+            pool_info.pool_stat.forecast_mem = self.get_forecast_mem(pool_name, time, forecast_time)
+        LOGGER.info("pools forecast memory at %s: %s", forecast_time,
+                    {pool_name: pool_info.pool_stat.forecast_mem for pool_name, pool_info in pools_info.items()})
+
+    def save(self):
+        """
+        Persist the profiles, levels and trends to local file.
+        """
+        if self.__path is None:
+            return
+        state = {PROFILES: self.__profiles,
+                 OBSERVED: self.__observed,
+                 LEVELS: self.__levels,
+                 TRENDS: self.__trends}
+        pd.to_pickle(state, self.__path)
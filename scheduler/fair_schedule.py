@@ -0,0 +1,147 @@
+import logging
+import math
+import numpy as np
+
+from scheduler.constants import ScheduleSectOpts, DEFAULT_FAIR_DEMAND_PERCENTILE
+from scheduler.base_schedule import AbstractSchedule, get_percentile, get_pool_demand_mems
+
+MIN_WEIGHT = 1e-6
+
+LOGGER = logging.getLogger(__name__)
+
+
+def water_fill(weights, low_mems, high_mems, total_mem):
+    """
+    Fill the total memory into pools like water, the pool i gets clip(weights[i] * level, low_mems[i],
+    high_mems[i]), and the level is raised until the total memory is filled. It is the same as giving every
+    unsatisfied pool a share in proportion to its weight and redistributing the surplus of satisfied pools
+    iteratively, but the level is found directly among the sorted breakpoints in O(n log n).
+
+    :param weights: (ndarray) The positive weights of pools.
+    :param low_mems: (ndarray) The lowest memory of pools.
+    :param high_mems: (ndarray) The highest memory of pools.
+    :param total_mem: (float) The total memory, between the sum of low_mems and the sum of high_mems.
+    :return: (ndarray) The filled memory of pools.
+    """
+    low_levels, high_levels = low_mems / weights, high_mems / weights
+    low_order, high_order = np.argsort(low_levels), np.argsort(high_levels)
+    sorted_low_levels, sorted_high_levels = low_levels[low_order], high_levels[high_order]
+    # suffix sums of pools still at the lowest memory, prefix sums of pools already at the highest memory
+    low_mem_sums = np.concatenate([np.cumsum(low_mems[low_order][::-1])[::-1], [0]])
+    low_weight_sums = np.concatenate([[0], np.cumsum(weights[low_order])])
+    high_mem_sums = np.concatenate([[0], np.cumsum(high_mems[high_order])])
+    high_weight_sums = np.concatenate([[0], np.cumsum(weights[high_order])])
+
+    def fill_mems(levels):
+        lows = np.searchsorted(sorted_low_levels, levels, side="right")
+        highs = np.searchsorted(sorted_high_levels, levels, side="right")
+        return low_mem_sums[lows] + high_mem_sums[highs] + levels * (low_weight_sums[lows] - high_weight_sums[highs])
+
+    levels = np.unique(np.concatenate([low_levels, high_levels]))
+    index = min(int(np.searchsorted(fill_mems(levels), total_mem, side="left")), levels.shape[0] - 1)
+    level = levels[index]
+    if index > 0:
+        previous_level = levels[index - 1]
+        previous_mem, mem = fill_mems(np.array([previous_level, level]))
+        if mem > previous_mem:
+            level = previous_level + (level - previous_level) * (total_mem - previous_mem) / (mem - previous_mem)
+    return np.clip(weights * level, low_mems, high_mems)
+
+
+class FairSchedule(AbstractSchedule):
+    """
+    The FairSchedule class that provides methods for calculating the statistic data of fetched
+    query information and allocating the impala pool memory by weighted max-min fairness.
+
+    The memory demand of pool is the [schedule.fair_demand_percentile] percentile of its demand samples,
+    floored at min_mem and capped at max_mem. If the cluster is oversubscribed, the total memory is water-filled
+    up to the demands, so the busy pools get shares in proportion to their weights. Otherwise every pool gets its
+    demand and the surplus is water-filled up to max_mem by weight.
+    """
+
+    @classmethod
+    def __get_pool_demand(cls, section_schedule, pool_info):
+        """
+        Get the memory demand of pool.
+
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param pool_info: (PoolInfo) The information of pool that participates in the scheduling.
+        :return: (float) The memory demand of pool.
+        """
+        demand = get_percentile(get_pool_demand_mems(pool_info), section_schedule.get(
+            ScheduleSectOpts.OPT_FAIR_DEMAND_PERCENTILE, DEFAULT_FAIR_DEMAND_PERCENTILE))
+        return min(max(demand, pool_info.min_mem), pool_info.max_mem)
+
+    @classmethod
+    def __round_mems(cls, memory_unit, pools_info, fair_mems):
+        """
+        Round the fair memory of pools to memory units away from the current memory within min_mem and max_mem,
+        the total memory is conserved by rounding up the pools with the largest remainders, or rounding down the
+        pools with the smallest remainders if the pools raised to min_mem exceed it.
+
+        :param memory_unit: (int) The memory unit of scheduling.
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :param fair_mems: (ndarray) The fair memory of pools.
+        :return: (list) The rounded memory of pools.
+        """
+        rounded_mems, lower_mems, upper_mems = [], [], []
+        for pool_info, fair_mem in zip(pools_info.values(), fair_mems):
+            current_mem = pool_info.current_mem
+            lower_mem = current_mem - memory_unit * math.floor((current_mem - pool_info.min_mem) / memory_unit)
+            upper_mem = current_mem + memory_unit * math.floor((pool_info.max_mem - current_mem) / memory_unit)
+            rounded_mem = lower_mem + memory_unit * math.floor((fair_mem - lower_mem) / memory_unit)
+            rounded_mems.append(min(max(lower_mem, rounded_mem), upper_mem))
+            lower_mems.append(lower_mem)
+            upper_mems.append(upper_mem)
+
+        remaining_units = int(round((sum(pool_info.current_mem for pool_info in pools_info.values()) -
+                                     sum(rounded_mems)) / memory_unit))
+        for index in np.argsort(np.array(rounded_mems) - fair_mems, kind="stable"):
+            if remaining_units <= 0:
+                break
+            if rounded_mems[index] + memory_unit <= upper_mems[index]:
+                rounded_mems[index] += memory_unit
+                remaining_units -= 1
+        for index in np.argsort(fair_mems - np.array(rounded_mems), kind="stable"):
+            if remaining_units >= 0:
+                break
+            if rounded_mems[index] - memory_unit >= lower_mems[index]:
+                rounded_mems[index] -= memory_unit
+                remaining_units += 1
+        return rounded_mems
+
+    @classmethod
+    def get_pools_allocated_mem(cls, section_schedule, pools_info):
+        """
+        Get the allocated memory of whole pool.
+
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :return: (dict) A dict object contains allocated memory of the pools whose memory is changed.
+        """
+        if not pools_info:
+            return {}
+        weights = np.maximum(np.array([pool_info.weight for pool_info in pools_info.values()], dtype=np.float64),
+                             MIN_WEIGHT)
+        min_mems = np.array([pool_info.min_mem for pool_info in pools_info.values()], dtype=np.float64)
+        max_mems = np.array([pool_info.max_mem for pool_info in pools_info.values()], dtype=np.float64)
+        demands = np.array([FairSchedule.__get_pool_demand(section_schedule, pool_info)
+                            for pool_info in pools_info.values()], dtype=np.float64)
+        total_mem = sum(pool_info.current_mem for pool_info in pools_info.values())
+        if not min_mems.sum() <= total_mem <= max_mems.sum():
+            LOGGER.warning("the total memory %s can not be allocated within min_mem and max_mem of pools.", total_mem)
+            return {}
+
+        if demands.sum() >= total_mem:
+            fair_mems = water_fill(weights, min_mems, demands, total_mem)
+        else:
+            fair_mems = water_fill(weights, demands, max_mems, total_mem)
+        LOGGER.info("pools demand: %s, fair memory: %s", dict(zip(pools_info, demands)), dict(zip(pools_info,
+                                                                                                  fair_mems)))
+
+        rounded_mems = FairSchedule.__round_mems(section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MEMORY_UNIT],
+                                                 pools_info, fair_mems)
+        pools_allocated_mem = {pool_info.pool_name: rounded_mem for pool_info, rounded_mem in
+                               zip(pools_info.values(), rounded_mems) if rounded_mem != pool_info.current_mem}
+        LOGGER.info("pools allocated memory: %s", pools_allocated_mem)
+        return pools_allocated_mem
@@ -2,18 +2,40 @@ from datetime import datetime
 from email.mime.text import MIMEText
 from email.header import Header
 from tornado.template import Template
+import functools
 import smtplib
 import math
 import logging
 import traceback
 import os
+import random
 import time
 import pandas as pd
 
 from scheduler.constants import ClouderaManagerSectOpts, EmailSectOpts,\
-    ReportColumn, ScheduleSectOpts, QUERY_DATA_SAVE_PATH_PREFIX
-from scheduler.settings import REPORT_TEMPLATE_PATH, LOG_FILE_PATH
+    ReportColumn, ScheduleSectOpts, DEFAULT_FETCH_DETAILS_CONCURRENCY, DEFAULT_QUERY_HISTORY_RETENTION_DAYS, \
+    DEFAULT_FETCH_QUERIES_PAGE_SIZE, DEFAULT_FETCH_QUERIES_SLICES, \
+    DEFAULT_ENABLE_QUERY_DETAILS_CACHE, DEFAULT_QUERY_DETAILS_CACHE_TTL_HOURS, DEFAULT_QUERY_DETAILS_CACHE_MAX_SIZE, \
+    DEFAULT_ENABLE_INCREMENTAL_FETCH_QUERIES, DEFAULT_ENABLE_POOL_STAT_PARTIALS, DEFAULT_POOL_STAT_PARTIAL_MINUTES, \
+    DEFAULT_ENABLE_DEMAND_FORECAST, DEFAULT_DEMAND_FORECAST_ALPHA, DEFAULT_DEMAND_FORECAST_TREND_ALPHA, \
+    DEFAULT_ENABLE_ALLOCATION_DAMPING, DEFAULT_DAMPING_MIN_CHANGE_MEM, DEFAULT_DAMPING_MIN_CHANGE_RATIO, \
+    DEFAULT_DAMPING_COOLDOWN_MINUTES, DEFAULT_DAMPING_EMA_ALPHA, DEFAULT_DAMPING_OSCILLATION_MINUTES, \
+    DEFAULT_CONTEXT_CACHE_TTL_SECONDS, DEFAULT_ENABLE_QUEUE_MONITOR, DEFAULT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS, \
+    DEFAULT_QUEUE_MONITOR_MIN_SPACING_MINUTES, DEFAULT_ENABLE_CYCLE_PROFILING, DEFAULT_PROFILE_EVERY_N_CYCLES, \
+    DEFAULT_PROFILE_RETENTION_COUNT, DEFAULT_PROFILE_TOP_ALLOCATIONS, DEFAULT_PROFILE_TRACE_BETWEEN_CYCLES
+from scheduler.settings import REPORT_TEMPLATE_PATH, QUERY_DETAILS_CACHE_PATH, QUERY_WINDOW_PATH, \
+    QUERY_HISTORY_PATH, DEMAND_FORECAST_PATH, LOG_FILE_PATH
 from scheduler.base_schedule import ScheduleInterface
+from scheduler.metrics import REGISTRY, CALL_SECONDS
+from scheduler.query_details_cache import QueryDetailsCache
+from scheduler.query_window import QueryWindow
+from scheduler.query_history import QueryHistory
+from scheduler.pool_stat_partials import PoolStatPartials
+from scheduler.demand_forecast import DemandForecast
+from scheduler.allocation_damper import AllocationDamper
+from scheduler.ttl_cache import TtlCache
+from scheduler.queue_monitor import QueueMonitor
+from scheduler.cycle_profiler import CycleProfiler
 
 LOGGER = logging.getLogger(__name__)
 
@@ -116,15 +138,21 @@ def send_monitor_report(section_email, text):
     send_email(section_email, message)
 
 
-def retry(func, max_try_times=2):
+def retry(func, max_try_times=2, backoff_seconds=0, backoff_max_seconds=0, retry_exceptions=(Exception,),
+          on_retry=None):
     """
     Retry the http request. Exception will be raised when execute times exceed the max try times.
 
     By default, the max try times is 2, it means execute a normal http request and retry one time
-    when normal http request failed.
+    when normal http request failed. If backoff_seconds is set, sleep a jittered exponential backoff
+    time between retries, which is random in [0, min(backoff_max_seconds, backoff_seconds * 2 ^ n)).
 
     :param func: (str) The retry function name.
     :param max_try_times: (int) The max try times. By default, it's value is 2.
+    :param backoff_seconds: (float) The base seconds of exponential backoff. By default, it's value is 0.
+    :param backoff_max_seconds: (float) The max seconds of backoff. By default, it's value is 0.
+    :param retry_exceptions: (tuple) The exceptions to be retried, other exceptions are raised directly.
+    :param on_retry: (function) The function called with the arguments of func before every retry.
     :return: Reference the result of function to be executed.
     """
     def wrapper(*args, **kwargs):
@@ -134,8 +162,13 @@ def retry(func, max_try_times=2):
         for i in range(max_try_times):
             try:
                 return func(*args, **kwargs)
-            except Exception:
+            except retry_exceptions:
                 LOGGER.info("try %d times to call fun:%s fail", i + 1, func)
+                if i + 1 < max_try_times:
+                    if on_retry is not None:
+                        on_retry(*args, **kwargs)
+                    if backoff_seconds > 0:
+                        time.sleep(random.uniform(0, min(backoff_max_seconds, backoff_seconds * math.pow(2, i))))
         else:
             raise Exception("call fun:{} failed, caused by: {}".format(func, traceback.format_exc()))
     return wrapper
@@ -143,25 +176,32 @@ def retry(func, max_try_times=2):
 
 def spend_time(func):
     """
-    Execute function and record the spent time into the log file.
+    Execute function and record the spent time into the log file and the metric scheduler_call_seconds.
 
     :param func: (str) The function name.
     :return: Reference the result of function to be executed.
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        api_start_time = datetime.now()
-
-        response = func(*args, **kwargs)
-
-        api_end_time = datetime.now()
-        spent_time = api_end_time - api_start_time
-        LOGGER.debug("call api %s spent %ds", func.__name__, spent_time.seconds)
-        return response
+        api_start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            spent_seconds = time.perf_counter() - api_start_time
+            REGISTRY.observe(CALL_SECONDS, spent_seconds, function=func.__name__)
+            LOGGER.debug("call api %s spent %.3fs", func.__name__, spent_seconds)
     return wrapper
 
 
 UNIT_LIST = ["PB", "TB", "GB", "MB", "KB", "B"]
 
+TRANSPORT_OPTIONS = {ClouderaManagerSectOpts.OPT_HTTP_POOL_SIZE: "pool_size",
+                     ClouderaManagerSectOpts.OPT_HTTP_CONNECT_TIMEOUT_SECONDS: "connect_timeout_seconds",
+                     ClouderaManagerSectOpts.OPT_HTTP_READ_TIMEOUT_SECONDS: "read_timeout_seconds",
+                     ClouderaManagerSectOpts.OPT_HTTP_MAX_RETRIES: "max_retries",
+                     ClouderaManagerSectOpts.OPT_HTTP_BACKOFF_SECONDS: "backoff_seconds",
+                     ClouderaManagerSectOpts.OPT_HTTP_BACKOFF_MAX_SECONDS: "backoff_max_seconds"}
+
 
 def convert_mem_unit(mem_value, from_unit="MB", to_unit="GB"):
     """
@@ -188,7 +228,8 @@ def get_cloudera_manager_config(scheduler_config):
     Get the configuration of cloudera manager.
 
     :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
-    :return: (tuple) A tuple object contains whole the configuration of cloudera manager.
+    :return: (tuple) A tuple object contains whole the configuration of cloudera manager, the last one
+        is the options of http transport.
     """
     section_cloudera_manager = scheduler_config.get(ClouderaManagerSectOpts.SECT_CLOUDERA_MANAGER)
     server_url = section_cloudera_manager[ClouderaManagerSectOpts.OPT_SERVER_URL]
@@ -196,8 +237,10 @@ def get_cloudera_manager_config(scheduler_config):
     cluster_name = section_cloudera_manager[ClouderaManagerSectOpts.OPT_CLUSTER_NAME]
     username = section_cloudera_manager[ClouderaManagerSectOpts.OPT_USERNAME]
     password = section_cloudera_manager[ClouderaManagerSectOpts.OPT_PASSWORD]
+    transport_options = {TRANSPORT_OPTIONS[option]: value for option, value in section_cloudera_manager.items()
+                         if option in TRANSPORT_OPTIONS}
 
-    return server_url, api_version, cluster_name, username, password
+    return server_url, api_version, cluster_name, username, password, transport_options
 
 
 def clean_expired_files(clean_directory, file_name_prefix="", expired_days=1):
@@ -222,29 +265,220 @@ def clean_expired_files(clean_directory, file_name_prefix="", expired_days=1):
             os.remove(os.path.join(clean_directory + "/" + file))
 
 
-def get_queries_info(cloudera_manager, section_schedule, start_time, end_time):
+def create_query_details_cache(section_schedule):
+    """
+    Create a object of query details cache.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (QueryDetailsCache or None) A QueryDetailsCache object if user has set the configuration item
+        [schedule.enable_query_details_cache] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_QUERY_DETAILS_CACHE, DEFAULT_ENABLE_QUERY_DETAILS_CACHE):
+        return None
+
+    ttl_hours = section_schedule.get(ScheduleSectOpts.OPT_QUERY_DETAILS_CACHE_TTL_HOURS,
+                                     DEFAULT_QUERY_DETAILS_CACHE_TTL_HOURS)
+    max_size = section_schedule.get(ScheduleSectOpts.OPT_QUERY_DETAILS_CACHE_MAX_SIZE,
+                                    DEFAULT_QUERY_DETAILS_CACHE_MAX_SIZE)
+    return QueryDetailsCache(QUERY_DETAILS_CACHE_PATH, ttl_hours, max_size)
+
+
+def create_query_window(section_schedule):
+    """
+    Create a object of query window for incremental fetching.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (QueryWindow or None) A QueryWindow object if user has set the configuration item
+        [schedule.enable_incremental_fetch_queries] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_INCREMENTAL_FETCH_QUERIES,
+                                DEFAULT_ENABLE_INCREMENTAL_FETCH_QUERIES):
+        return None
+    return QueryWindow(QUERY_WINDOW_PATH)
+
+
+def create_pool_stat_partials(section_schedule):
+    """
+    Create a object of the cached partial statistics of pools.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (PoolStatPartials or None) A PoolStatPartials object if user has set the configuration item
+        [schedule.enable_pool_stat_partials] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_POOL_STAT_PARTIALS, DEFAULT_ENABLE_POOL_STAT_PARTIALS):
+        return None
+    return PoolStatPartials(section_schedule.get(ScheduleSectOpts.OPT_POOL_STAT_PARTIAL_MINUTES,
+                                                 DEFAULT_POOL_STAT_PARTIAL_MINUTES))
+
+
+def create_demand_forecast(section_schedule, path=DEMAND_FORECAST_PATH):
+    """
+    Create a object of demand forecast.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :param path: (str) The path of file to persist the forecast, None means never persisted.
+    :return: (DemandForecast or None) A DemandForecast object if user has set the configuration item
+        [schedule.enable_demand_forecast] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_DEMAND_FORECAST, DEFAULT_ENABLE_DEMAND_FORECAST):
+        return None
+    return DemandForecast(path, section_schedule.get(ScheduleSectOpts.OPT_DEMAND_FORECAST_ALPHA,
+                                                     DEFAULT_DEMAND_FORECAST_ALPHA),
+                          section_schedule.get(ScheduleSectOpts.OPT_DEMAND_FORECAST_TREND_ALPHA,
+                                               DEFAULT_DEMAND_FORECAST_TREND_ALPHA))
+
+
+def create_allocation_damper(section_schedule):
+    """
+    Create a object of allocation damper.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (AllocationDamper or None) A AllocationDamper object if user has set the configuration item
+        [schedule.enable_allocation_damping] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_ALLOCATION_DAMPING, DEFAULT_ENABLE_ALLOCATION_DAMPING):
+        return None
+    return AllocationDamper(
+        section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MEMORY_UNIT],
+        section_schedule.get(ScheduleSectOpts.OPT_DAMPING_MIN_CHANGE_MEM, DEFAULT_DAMPING_MIN_CHANGE_MEM),
+        section_schedule.get(ScheduleSectOpts.OPT_DAMPING_MIN_CHANGE_RATIO, DEFAULT_DAMPING_MIN_CHANGE_RATIO),
+        section_schedule.get(ScheduleSectOpts.OPT_DAMPING_COOLDOWN_MINUTES, DEFAULT_DAMPING_COOLDOWN_MINUTES),
+        section_schedule.get(ScheduleSectOpts.OPT_DAMPING_EMA_ALPHA, DEFAULT_DAMPING_EMA_ALPHA),
+        section_schedule.get(ScheduleSectOpts.OPT_DAMPING_OSCILLATION_MINUTES, DEFAULT_DAMPING_OSCILLATION_MINUTES))
+
+
+def create_context_cache(section_schedule):
+    """
+    Create a object of cache shared by the contexts of scheduling cycles.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (TtlCache or None) A TtlCache object if user has set the configuration item
+        [schedule.context_cache_ttl_seconds] to a positive value, otherwise, a None object.
+    """
+    ttl_seconds = section_schedule.get(ScheduleSectOpts.OPT_CONTEXT_CACHE_TTL_SECONDS,
+                                       DEFAULT_CONTEXT_CACHE_TTL_SECONDS)
+    if not ttl_seconds:
+        return None
+    return TtlCache(ttl_seconds)
+
+
+def create_queue_monitor(section_schedule):
+    """
+    Create a object of queue monitor.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (QueueMonitor or None) A QueueMonitor object if user has set the configuration item
+        [schedule.enable_queue_monitor] to "true", otherwise, a None object.
+    """
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_QUEUE_MONITOR, DEFAULT_ENABLE_QUEUE_MONITOR):
+        return None
+    return QueueMonitor(
+        section_schedule.get(ScheduleSectOpts.OPT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS,
+                             DEFAULT_QUEUE_MONITOR_WAIT_THRESHOLD_SECONDS),
+        section_schedule.get(ScheduleSectOpts.OPT_QUEUE_MONITOR_MIN_SPACING_MINUTES,
+                             DEFAULT_QUEUE_MONITOR_MIN_SPACING_MINUTES))
+
+
+def create_cycle_profiler(section_schedule, enabled=False, path=LOG_FILE_PATH):
+    """
+    Create a object of cycle profiler.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :param enabled: (bool) Whether the profiling is enabled regardless of the configuration.
+    :param path: (str) The directory of the dumped profiles.
+    :return: (CycleProfiler or None) A CycleProfiler object if user has set the configuration item
+        [schedule.enable_cycle_profiling] to "true" or enabled is True, otherwise, a None object.
+    """
+    if not enabled and not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_CYCLE_PROFILING,
+                                                DEFAULT_ENABLE_CYCLE_PROFILING):
+        return None
+    return CycleProfiler(
+        path,
+        section_schedule.get(ScheduleSectOpts.OPT_PROFILE_EVERY_N_CYCLES, DEFAULT_PROFILE_EVERY_N_CYCLES),
+        section_schedule.get(ScheduleSectOpts.OPT_PROFILE_RETENTION_COUNT, DEFAULT_PROFILE_RETENTION_COUNT),
+        section_schedule.get(ScheduleSectOpts.OPT_PROFILE_TOP_ALLOCATIONS, DEFAULT_PROFILE_TOP_ALLOCATIONS),
+        section_schedule.get(ScheduleSectOpts.OPT_PROFILE_TRACE_BETWEEN_CYCLES, DEFAULT_PROFILE_TRACE_BETWEEN_CYCLES))
+
+
+def create_query_history(section_schedule):
+    """
+    Create a object of query history.
+
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :return: (QueryHistory or None) A QueryHistory object if user has set the configuration item
+        [schedule.enable_fetch_queries_file] to "true", otherwise, a None object.
+    """
+    if not section_schedule[ScheduleSectOpts.OPT_ENABLE_FETCH_QUERIES_FILE]:
+        return None
+    return QueryHistory(QUERY_HISTORY_PATH, section_schedule.get(ScheduleSectOpts.OPT_QUERY_HISTORY_RETENTION_DAYS,
+                                                                 DEFAULT_QUERY_HISTORY_RETENTION_DAYS))
+
+
+def fetch_queries_info(cloudera_manager, section_schedule, start_time, end_time):
     """
-    Get total query information.
+    Fetch the query information between start_time and end_time.
 
     If user has set the configuration item [schedule.enable_fetch_queries_file] to "true", the
-    fetched query information will be save to local file with name format: data-xxx.txt.
+    fetched query information will be written to the local query history partitioned by hour, and the
+    partitions older than [schedule.query_history_retention_days] will be deleted.
+
+    If user has set the configuration item [schedule.enable_query_details_cache] to "true", the
+    parsed query details of completed queries will be cached to local and reused in later fetches.
 
     :param cloudera_manager: (ClouderManager) The cloudera manager object.
     :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
     :param start_time: (datetime) The start time to fetching query information.
     :param end_time: (datetime) The end time to fetching query information.
-    :return: (DataFrame) A DataFrame object of total fetched query information.
+    :return: (DataFrame) A DataFrame object of fetched query information, None if there is no query.
     """
-    query_data_save_enable = section_schedule[ScheduleSectOpts.OPT_ENABLE_FETCH_QUERIES_FILE]
     filter_str = section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_FILTER]
-    queries_info = cloudera_manager.fetch_impala_query_info(start_time, end_time, filter_str)
-
-    if queries_info is None:
-        LOGGER.info("queries info between: %s ~ %s size is 0", str(start_time), str(end_time))
-    elif query_data_save_enable:
-        LOGGER.info("queries info between: %s ~ %s size is %d", str(start_time), str(end_time), queries_info.shape[0])
-        query_data_save_path = "%s/%s%s.csv" % (LOG_FILE_PATH, QUERY_DATA_SAVE_PATH_PREFIX, end_time)
-        queries_info.to_csv(path_or_buf=query_data_save_path, encoding="utf-8", index=False)
+    details_concurrency = section_schedule.get(ScheduleSectOpts.OPT_FETCH_DETAILS_CONCURRENCY,
+                                               DEFAULT_FETCH_DETAILS_CONCURRENCY)
+    page_size = section_schedule.get(ScheduleSectOpts.OPT_FETCH_QUERIES_PAGE_SIZE, DEFAULT_FETCH_QUERIES_PAGE_SIZE)
+    slices = section_schedule.get(ScheduleSectOpts.OPT_FETCH_QUERIES_SLICES, DEFAULT_FETCH_QUERIES_SLICES)
+    details_cache = create_query_details_cache(section_schedule)
+    try:
+        queries_info = cloudera_manager.fetch_impala_query_info(start_time, end_time, filter_str,
+                                                                details_concurrency, details_cache, page_size, slices)
+    finally:
+        if details_cache is not None:
+            details_cache.evict()
+            details_cache.close()
+
+    query_history = create_query_history(section_schedule)
+    if query_history is not None:
+        query_history.write(queries_info)
+        query_history.evict()
+    return queries_info
+
+
+def get_queries_info(cloudera_manager, section_schedule, start_time, end_time, query_window=None):
+    """
+    Get total query information, see fetch_queries_info.
+
+    If query_window is given, only the queries newer than its high-water mark are fetched, and the
+    query information is read from the window.
+
+    :param cloudera_manager: (ClouderManager) The cloudera manager object.
+    :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+    :param start_time: (datetime) The start time to fetching query information.
+    :param end_time: (datetime) The end time to fetching query information.
+    :param query_window: (QueryWindow) The window of recent queries for incremental fetching.
+    :return: (DataFrame) A DataFrame object of total fetched query information.
+    """
+    fetch_start_time = start_time if query_window is None else query_window.get_fetch_start_time(start_time)
+    queries_info = fetch_queries_info(cloudera_manager, section_schedule, fetch_start_time, end_time)
+
+    if query_window is not None:
+        LOGGER.info("incremental queries info between: %s ~ %s size is %d", str(fetch_start_time), str(end_time),
+                    0 if queries_info is None else queries_info.shape[0])
+        query_window.update(queries_info)
+        query_window.evict(start_time)
+        query_window.save()
+        queries_info = query_window.get_queries_info(end_time)
+
+    LOGGER.info("queries info between: %s ~ %s size is %d", str(start_time), str(end_time),
+                0 if queries_info is None else queries_info.shape[0])
     return queries_info
 
 
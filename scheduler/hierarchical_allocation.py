@@ -0,0 +1,184 @@
+import copy
+import heapq
+import logging
+import numpy as np
+
+from scheduler.constants import ScheduleSectOpts
+from scheduler.base_schedule import PoolInfo, PoolStat, get_pool_demand_mems
+from scheduler.impala_pool_config import ROOT_PARENT_POOL_NAME, DOT_DELIMITER
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_parent_pool_name(pool_name):
+    """
+    Get the parent pool name of pool.
+
+    :param pool_name: (str) The full pool name, such as "root.team.pool".
+    :return: (str) The parent pool name, "" if the pool is a top pool.
+    """
+    return pool_name.rsplit(DOT_DELIMITER, 1)[0] if DOT_DELIMITER in pool_name else ROOT_PARENT_POOL_NAME
+
+
+def get_pools_children(pool_names):
+    """
+    Get the children of parent pools in the tree of pools.
+
+    :param pool_names: (list) The leaf pool names.
+    :return: (dict) A dict object mapping parent pool name to the list of child pool names, the top pools
+        are the children of "".
+    """
+    pools_children = {}
+    for pool_name in pool_names:
+        while pool_name != ROOT_PARENT_POOL_NAME:
+            parent_pool_name = get_parent_pool_name(pool_name)
+            children = pools_children.setdefault(parent_pool_name, [])
+            if pool_name in children:
+                break
+            children.append(pool_name)
+            pool_name = parent_pool_name
+    return pools_children
+
+
+class HierarchicalAllocation(object):
+    """
+    The HierarchicalAllocation class that provides methods for allocating the memory of pools with respect to
+    the parent pools.
+
+    The strategy first rebalances the memory between the siblings under a parent pool, bottom-up, so the
+    total memory of the parent pool is unchanged. Then the parent pool is rolled up into one pool for its
+    own siblings, with the summed memory, min_mem and max_mem capped by the memory of parent pool, and the
+    unmet demand or surplus left by its children, so only the net deltas are propagated upward. The deltas
+    allocated to a parent pool are distributed down to its children by their unmet demand or surplus in
+    memory units. The memory that can not be distributed within min_mem and max_mem of the children stays
+    with the siblings of the parent pool, so the memory of a parent pool is always the sum of its children.
+    """
+
+    def __init__(self, schedule, section_schedule, impala_pool_config):
+        """
+        Create a HierarchicalAllocation object.
+
+        :param schedule: (AbstractSchedule) The schedule strategy.
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param impala_pool_config: (ImpalaScheduledAllocations) The configuration of impala pool.
+        """
+        self.__schedule = schedule
+        self.__section_schedule = section_schedule
+        self.__memory_unit = section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MEMORY_UNIT]
+        self.__impala_pool_config = impala_pool_config
+        self.__pools_info = {}
+        self.__pools_demand = {}
+        self.__pools_children = {}
+
+    def __get_rolled_pool_info(self, pool_name):
+        """
+        Roll up the children of parent pool into one pool.
+
+        :param pool_name: (str) The parent pool name.
+        :return: (PoolInfo) The information of rolled up pool.
+        """
+        children_info = [self.__pools_info[child_name] for child_name in self.__pools_children[pool_name]]
+        current_mem = sum(child_info.current_mem for child_info in children_info)
+        demand = sum(self.__pools_demand[child_name] for child_name in self.__pools_children[pool_name])
+        min_mem = sum(child_info.min_mem for child_info in children_info)
+        max_mem = sum(child_info.max_mem for child_info in children_info)
+
+        weight = sum(child_info.weight for child_info in children_info)
+        impala_pool = self.__impala_pool_config.get_parent_pool(pool_name)
+        if impala_pool is not None:
+            if impala_pool.get_pool_mem():
+                max_mem = max(min(max_mem, impala_pool.get_pool_mem()), current_mem)
+            weight = impala_pool.get_pool_weight() or weight
+
+        wait_mem = max(0, demand - current_mem)
+        pool_stat = PoolStat(pool_name,
+                             sum(child_info.pool_stat.query_total for child_info in children_info),
+                             sum(child_info.pool_stat.wait_query_total for child_info in children_info),
+                             sum(child_info.pool_stat.run_secs for child_info in children_info),
+                             sum(child_info.pool_stat.wait_secs for child_info in children_info) if wait_mem else 0,
+                             min(demand, current_mem), wait_mem)
+        self.__pools_demand[pool_name] = demand
+        return PoolInfo(pool_name, current_mem, weight, min_mem, max_mem, pool_stat)
+
+    def __distribute(self, pool_name, delta):
+        """
+        Distribute the delta of parent pool down to its children in memory units, the children with the most
+        unmet demand take the memory first, and the children with the most surplus give the memory first.
+
+        :param pool_name: (str) The parent pool name.
+        :param delta: (float) The delta of the memory of parent pool.
+        :return: (float) The delta that can not be distributed to the children.
+        """
+        sign = 1 if delta > 0 else -1
+        heap = []
+        for child_name in self.__pools_children[pool_name]:
+            child_info = self.__pools_info[child_name]
+            heap.append((-sign * (self.__pools_demand[child_name] - child_info.current_mem), child_name))
+        heapq.heapify(heap)
+
+        units = int(round(abs(delta) / self.__memory_unit))
+        distributed_units = 0
+        while distributed_units < units and heap:
+            key, child_name = heapq.heappop(heap)
+            child_info = self.__pools_info[child_name]
+            if not child_info.min_mem <= child_info.current_mem + sign * self.__memory_unit <= child_info.max_mem:
+                continue
+            # a parent child that can not distribute the unit to its own children is full
+            if self.__apply(child_name, sign * self.__memory_unit) == 0:
+                continue
+            heapq.heappush(heap, (key + self.__memory_unit, child_name))
+            distributed_units += 1
+        return delta - sign * distributed_units * self.__memory_unit
+
+    def __apply(self, pool_name, delta):
+        """
+        Apply the delta to the memory of pool, and distribute it to the children if the pool is a parent pool,
+        only the delta distributed to the children is applied to a parent pool.
+
+        :param pool_name: (str) The pool name.
+        :param delta: (float) The delta of the memory of pool.
+        :return: (float) The applied delta.
+        """
+        if delta == 0:
+            return 0
+        if pool_name in self.__pools_children:
+            delta -= self.__distribute(pool_name, delta)
+        self.__pools_info[pool_name].current_mem += delta
+        return delta
+
+    def __get_depth(self, pool_name):
+        return 0 if pool_name == ROOT_PARENT_POOL_NAME else pool_name.count(DOT_DELIMITER) + 1
+
+    def get_pools_allocated_mem(self, pools_info):
+        """
+        Get the allocated memory of whole pool with respect to the parent pools.
+
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :return: (dict) A dict object contains allocated memory of the pools whose memory is changed.
+        """
+        self.__pools_info = {pool_name: copy.copy(pool_info) for pool_name, pool_info in pools_info.items()}
+        self.__pools_demand = {pool_name: float(np.mean(get_pool_demand_mems(pool_info)))
+                               for pool_name, pool_info in pools_info.items()}
+        self.__pools_children = get_pools_children(list(pools_info))
+
+        for parent_pool_name in sorted(self.__pools_children, key=self.__get_depth, reverse=True):
+            children_info = {child_name: self.__pools_info[child_name]
+                             for child_name in self.__pools_children[parent_pool_name]}
+            if len(children_info) > 1:
+                children_allocated_mem = self.__schedule.get_pools_allocated_mem(self.__section_schedule,
+                                                                                 children_info)
+                LOGGER.info("children of pool %s allocated memory: %s", parent_pool_name, children_allocated_mem)
+                undistributed_mem = 0
+                for child_name, allocated_mem in children_allocated_mem.items():
+                    delta = allocated_mem - children_info[child_name].current_mem
+                    undistributed_mem += delta - self.__apply(child_name, delta)
+                # the memory that a parent child can not take or give is moved back to its siblings
+                if undistributed_mem and self.__distribute(parent_pool_name, undistributed_mem):
+                    LOGGER.warning("the memory of children of pool %s can not be allocated within min_mem and "
+                                   "max_mem of their children, skip the allocation.", parent_pool_name)
+                    return {}
+            if parent_pool_name != ROOT_PARENT_POOL_NAME:
+                self.__pools_info[parent_pool_name] = self.__get_rolled_pool_info(parent_pool_name)
+
+        return {pool_name: self.__pools_info[pool_name].current_mem for pool_name, pool_info in pools_info.items()
+                if self.__pools_info[pool_name].current_mem != pool_info.current_mem}
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from scheduler.constants import DEFAULT_HTTP_POOL_SIZE, DEFAULT_HTTP_CONNECT_TIMEOUT_SECONDS, \
+    DEFAULT_HTTP_READ_TIMEOUT_SECONDS, DEFAULT_HTTP_MAX_RETRIES, DEFAULT_HTTP_BACKOFF_SECONDS, \
+    DEFAULT_HTTP_BACKOFF_MAX_SECONDS, HttpEndpoint
+from scheduler.global_utils import retry
+from scheduler.metrics import REGISTRY, HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES, HTTP_RETRIES
+
+HTTP_STATUS_UNAUTHORIZED = 401
+HTTP_STATUS_SERVER_ERROR = 500
+# the requests of these methods do not change the server, so they are retried safely
+RETRIED_HTTP_METHODS = ("GET", "HEAD", "OPTIONS")
+
+LOGGER = logging.getLogger(__name__)
+
+_TRANSPORTS = {}
+_TRANSPORTS_LOCK = threading.Lock()
+
+
+class HttpServerError(IOError):
+    """
+    The HttpServerError class represents the server error(5xx) of http response, which is retried.
+    """
+    pass
+
+
+class HttpTransport(object):
+    """
+    The HttpTransport class that provides a single authenticated http session with a sized connection pool,
+    keep-alive connections, per-endpoint timeouts and jittered exponential backoff retries on server errors
+    and connection errors. Only the requests of read-only methods are retried by default, because a request
+    that changes the server may have been applied before the error, such as the update of impala
+    configuration, which would overwrite a concurrent edit if it is sent again.
+    """
+
+    def __init__(self, server_url, username, password, pool_size=DEFAULT_HTTP_POOL_SIZE,
+                 connect_timeout_seconds=DEFAULT_HTTP_CONNECT_TIMEOUT_SECONDS, read_timeout_seconds=None,
+                 max_retries=DEFAULT_HTTP_MAX_RETRIES, backoff_seconds=DEFAULT_HTTP_BACKOFF_SECONDS,
+                 backoff_max_seconds=DEFAULT_HTTP_BACKOFF_MAX_SECONDS):
+        """
+        Create a HttpTransport object and authenticate the session.
+
+        :param server_url: (str) The Server url.
+        :param username: (str) The username for login cloudera manager.
+        :param password: (str) The password for login cloudera manager.
+        :param pool_size: (int) The max number of connections kept alive in pool.
+        :param connect_timeout_seconds: (float) The timeout of connecting to server.
+        :param read_timeout_seconds: (dict) The timeout of reading response, mapping endpoint to seconds,
+            which overrides the default timeouts.
+        :param max_retries: (int) The max retry times when request failed.
+        :param backoff_seconds: (float) The base seconds of exponential backoff between retries.
+        :param backoff_max_seconds: (float) The max seconds of backoff between retries.
+        """
+        self.__auth_url = "%s/api/version" % server_url
+        self.__auth = (username, password)
+        self.__connect_timeout_seconds = connect_timeout_seconds
+        self.__read_timeout_seconds = dict(DEFAULT_HTTP_READ_TIMEOUT_SECONDS, **(read_timeout_seconds or {}))
+        self.__retry_request = retry(self.__request, max_retries + 1, backoff_seconds, backoff_max_seconds,
+                                     (requests.ConnectionError, requests.Timeout, HttpServerError),
+                                     lambda method, url, endpoint, **kwargs: REGISTRY.inc(HTTP_RETRIES,
+                                                                                          endpoint=endpoint))
+
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.__authenticate()
+
+    def __get_timeout(self, endpoint):
+        """
+        Get the connect and read timeout of endpoint.
+
+        :param endpoint: (str) The endpoint name.
+        :return: (tuple) A tuple object that contains the connect timeout and read timeout.
+        """
+        read_timeout_seconds = self.__read_timeout_seconds.get(endpoint,
+                                                               self.__read_timeout_seconds[HttpEndpoint.DEFAULT])
+        return self.__connect_timeout_seconds, read_timeout_seconds
+
+    def __authenticate(self):
+        """
+        Authenticate the session, the session cookie is reused by later requests.
+        """
+        self.__session.get(self.__auth_url, auth=self.__auth, timeout=self.__get_timeout(HttpEndpoint.DEFAULT))
+
+    def __send(self, method, url, endpoint, **kwargs):
+        """
+        Send a http request once, and record the latency and the received bytes of endpoint.
+
+        :param method: (str) The http method.
+        :param url: (str) The request url.
+        :param endpoint: (str) The endpoint name, used to choose the timeout.
+        :return: (Response) A Response object of the request.
+        """
+        with REGISTRY.time(HTTP_REQUEST_SECONDS, endpoint=endpoint, method=method):
+            response = self.__session.request(method, url, timeout=self.__get_timeout(endpoint), **kwargs)
+        REGISTRY.inc(HTTP_RESPONSE_BYTES, len(response.content or b""), endpoint=endpoint)
+        return response
+
+    def __request(self, method, url, endpoint, **kwargs):
+        """
+        Send a http request. The session is authenticated again once the response is unauthorized.
+
+        :param method: (str) The http method.
+        :param url: (str) The request url.
+        :param endpoint: (str) The endpoint name, used to choose the timeout.
+        :return: (Response) A Response object of the request.
+        """
+        response = self.__send(method, url, endpoint, **kwargs)
+        if response.status_code == HTTP_STATUS_UNAUTHORIZED:
+            LOGGER.info("session is unauthorized, authenticate again")
+            self.__authenticate()
+            response = self.__send(method, url, endpoint, **kwargs)
+        if response.status_code >= HTTP_STATUS_SERVER_ERROR:
+            raise HttpServerError("error status_code: %d, url: %s" % (response.status_code, url))
+        return response
+
+    def request(self, method, url, endpoint=HttpEndpoint.DEFAULT, retried=None, **kwargs):
+        """
+        Send a http request, retry with jittered exponential backoff on server errors and connection errors.
+
+        :param method: (str) The http method.
+        :param url: (str) The request url.
+        :param endpoint: (str) The endpoint name, used to choose the timeout.
+        :param retried: (bool) Whether the request is retried, None means only the requests of read-only
+            methods are retried.
+        :return: (Response) A Response object of the request.
+        """
+        if retried is None:
+            retried = method.upper() in RETRIED_HTTP_METHODS
+        if not retried:
+            return self.__request(method, url, endpoint, **kwargs)
+        return self.__retry_request(method, url, endpoint, **kwargs)
+
+    def close(self):
+        """
+        Close the session.
+        """
+        self.__session.close()
+
+
+def get_http_transport(server_url, username, password, **transport_options):
+    """
+    Get the shared http transport of cloudera manager server, it is created once and reused for the
+    lifetime of the process, so the transport options must be the same as the ones it is created with.
+
+    :param server_url: (str) The Server url.
+    :param username: (str) The username for login cloudera manager.
+    :param password: (str) The password for login cloudera manager.
+    :param transport_options: (dict) The options of HttpTransport.
+    :return: (HttpTransport) A shared HttpTransport object.
+    """
+    key = (server_url, username, password)
+    with _TRANSPORTS_LOCK:
+        if key not in _TRANSPORTS:
+            _TRANSPORTS[key] = (HttpTransport(server_url, username, password, **transport_options), transport_options)
+        transport, options = _TRANSPORTS[key]
+        if options != transport_options:
+            LOGGER.error("transport options %s differ from the options %s of shared http transport of %s.",
+                         transport_options, options, server_url)
+            raise ValueError("transport options {} differ from the options {} of shared http transport of {}."
+                             .format(transport_options, options, server_url))
+        return transport
+
+
+def close_http_transports():
+    """
+    Close and remove the whole shared http transports.
+    """
+    with _TRANSPORTS_LOCK:
+        for transport, _ in _TRANSPORTS.values():
+            transport.close()
+        _TRANSPORTS.clear()
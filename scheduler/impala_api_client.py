@@ -1,4 +1,5 @@
-import requests
+from scheduler.constants import HttpEndpoint
+from scheduler.http_transport import get_http_transport
 
 
 class ImpalaApiResource(object):
@@ -6,25 +7,21 @@ class ImpalaApiResource(object):
     The ImpalaApiResource class that provides methods for get and update the resources from cloudera manager.
     """
 
-    def __init__(self, server_url, api_version, cluster_name, username, password):
+    def __init__(self, server_url, api_version, cluster_name, username, password, transport_options=None):
         """
-        Creates a ImpalaApiResource object that provides methods to get and update resources.
+        Creates a ImpalaApiResource object that provides methods to get and update resources. The http
+        transport, which holds the authenticated session, is shared by the whole ImpalaApiResource objects
+        of the same server.
 
         :param server_url: (str) The Server url.
         :param api_version: (str) The api version.
         :param cluster_name: (str) The cluster name.
         :param username: (str) The username for login cloudera manager.
         :param password: (str) The password for login cloudera manager.
+        :param transport_options: (dict) The options of http transport.
         """
         self.__base_path = "%s/api/%s/clusters/%s" % (server_url, api_version, cluster_name)
-        self.__session = requests.Session()
-        self.__session.get(self.__base_path, auth=(username, password))
-
-    def __del__(self):
-        """
-        Delete the session.
-        """
-        self.__session.close()
+        self.__transport = get_http_transport(server_url, username, password, **(transport_options or {}))
 
     @classmethod
     def __check_status_code(cls, status_code):
@@ -37,7 +34,7 @@ class ImpalaApiResource(object):
         if status_code >= 400:
             raise IOError("error status_code: %d" % status_code)
 
-    def get_impala_queries(self, start_time, end_time, filter_str=""):
+    def get_impala_queries(self, start_time, end_time, filter_str="", limit=100):
         """
         Get the filtered impala queries between end_time and start_time.
 
@@ -46,12 +43,13 @@ class ImpalaApiResource(object):
         :param start_time: (datetime) The start time to fetching query information.
         :param end_time: (datetime) The end time to fetching query information.
         :param filter_str: (str) The filter string to fetch query information.
+        :param limit: (int) The max number of queries to return.
         :return: (json) A json object of the response.
         """
         path = "%s/services/impala/impalaQueries" % self.__base_path
         params = {"filter": filter_str, "to": end_time.isoformat(),
-                  "from": start_time.isoformat(), "limit": 100, "offset": 0}
-        response = self.__session.get(path, params=params)
+                  "from": start_time.isoformat(), "limit": limit, "offset": 0}
+        response = self.__transport.request("GET", path, HttpEndpoint.IMPALA_QUERIES, params=params)
         ImpalaApiResource.__check_status_code(response.status_code)
         return response.json()
 
@@ -63,7 +61,7 @@ class ImpalaApiResource(object):
         :return: (json) A json object of the response.
         """
         path = "%s/services/impala/impalaQueries/%s" % (self.__base_path, query_id)
-        response = self.__session.get(path)
+        response = self.__transport.request("GET", path, HttpEndpoint.QUERY_DETAILS)
         ImpalaApiResource.__check_status_code(response.status_code)
         return response.json()
 
@@ -75,7 +73,8 @@ class ImpalaApiResource(object):
         :return: (json) A json object of the response.
         """
         path = "%s/services/impala/config" % self.__base_path
-        response = self.__session.get(path, params=view and dict(view=view) or None)
+        response = self.__transport.request("GET", path, HttpEndpoint.IMPALA_CONFIG,
+                                            params=view and dict(view=view) or None)
         ImpalaApiResource.__check_status_code(response.status_code)
         return response.json()
 
@@ -87,7 +86,8 @@ class ImpalaApiResource(object):
         :return: (json) A json object of the response.
         """
         path = "%s/services/impala/config" % self.__base_path
-        response = self.__session.put(path, data=impala_config, headers={"Content-Type": "application/json"})
+        response = self.__transport.request("PUT", path, HttpEndpoint.IMPALA_CONFIG, data=impala_config,
+                                            headers={"Content-Type": "application/json"})
         ImpalaApiResource.__check_status_code(response.status_code)
         return response.json()
 
@@ -98,7 +98,7 @@ class ImpalaApiResource(object):
         :return: (json) A json object of the response.
         """
         path = "%s/commands/poolsRefresh" % self.__base_path
-        response = self.__session.post(path)
+        response = self.__transport.request("POST", path, HttpEndpoint.POOLS_REFRESH)
         self.__check_status_code(response.status_code)
         return response.json()
 
@@ -109,6 +109,6 @@ class ImpalaApiResource(object):
         :return: (json) A json object of the response.
         """
         path = "%s/services/impala/roles" % self.__base_path
-        response = self.__session.get(path)
+        response = self.__transport.request("GET", path, HttpEndpoint.ROLES)
         self.__check_status_code(response.status_code)
         return response.json()
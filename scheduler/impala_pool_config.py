@@ -13,7 +13,6 @@ WEIGHT = "weight"
 IMPALA_POOL_TIMEOUT = "impalaQueueTimeout"
 
 ROOT_PARENT_POOL_NAME = ""
-LEAF_SUB_POOL_NAME = ""
 DOT_DELIMITER = "."
 
 LOGGER = logging.getLogger(__name__)
@@ -31,21 +30,33 @@ class ImpalaPool(object):
         self.__pool_name = pool_name
         self.__pool = pool
 
-        self.__schedulable_properties_list = self.__pool[SCHEDULABLE_PROPERTIES_LIST][0]
-
     def __repr__(self):
         return str(self.__pool)
 
     def __str__(self):
         return self.__repr__()
 
+    def __get_schedulable_properties(self, attached=False):
+        """
+        Get the schedulable properties of current pool in place. The parent pools may have no schedulable
+        properties, which are attached to the pool configuration only when they are updated.
+
+        :param attached: (bool) Whether the schedulable properties are attached if they do not exist.
+        :return: (dict) A dict object of schedulable properties, a detached empty one if they do not exist.
+        """
+        if not self.__pool.get(SCHEDULABLE_PROPERTIES_LIST):
+            if not attached:
+                return {}
+            self.__pool[SCHEDULABLE_PROPERTIES_LIST] = [{}]
+        return self.__pool[SCHEDULABLE_PROPERTIES_LIST][0]
+
     def get_pool_mem(self):
         """
         Get the memory item of current pool. unit: MB
 
-        :return: (float) A float value represent impala pool memory.
+        :return: (float) A float value represent impala pool memory, None if it is not set.
         """
-        return self.__schedulable_properties_list[IMPALA_MAX_MEMORY]
+        return self.__get_schedulable_properties().get(IMPALA_MAX_MEMORY)
 
     def update_pool_mem(self, memory):
         """
@@ -53,15 +64,15 @@ class ImpalaPool(object):
 
         :param memory: (float) The memory value to be updated.
         """
-        self.__schedulable_properties_list[IMPALA_MAX_MEMORY] = memory
+        self.__get_schedulable_properties(True)[IMPALA_MAX_MEMORY] = memory
 
     def get_pool_weight(self):
         """
         Get the weight item of current pool.
 
-        :return: (float) A float value represent impala pool weight.
+        :return: (float) A float value represent impala pool weight, None if it is not set.
         """
-        return self.__schedulable_properties_list[WEIGHT]
+        return self.__get_schedulable_properties().get(WEIGHT)
 
 
 class ImpalaScheduledAllocations(object):
@@ -103,68 +114,60 @@ class ImpalaScheduledAllocations(object):
         impala_config_dict = {item[NAME]: item for item in primary_impala_config[ITEMS]}
         self.__allocations_value = json.loads(impala_config_dict[IMPALA_SCHEDULED_ALLOCATIONS][VALUE])
 
+        # the ImpalaPool objects refer to the pool configuration in place, so the index stays valid
+        # when pools are updated
+        self.__pools = {}
+        self.__parent_pools = {}
+        self.__index_pools(self.__allocations_value[POOLS], ROOT_PARENT_POOL_NAME)
+
     def __str__(self):
         value = json.dumps(self.__allocations_value)
         formatted_impala_scheduled_allocations = {ITEMS: [{NAME: IMPALA_SCHEDULED_ALLOCATIONS, VALUE: value}]}
         return json.dumps(formatted_impala_scheduled_allocations)
 
-    def __get_pool_names(self, pools, parent_pool_name, pool_names):
+    def __index_pools(self, pools, parent_pool_name):
         """
-        Get the whole pool names and store in list pool_names.
+        Index the whole leaf pools by the full pool name and store in dict self.__pools, and the parent pools
+        in dict self.__parent_pools.
 
         :param pools: (dict) The whole impala pool configuration.
         :param parent_pool_name: (str) The parent pool name.
-        :param pool_names: (list) The pool name list.
         """
         for pool in pools:
             current_pool_name = parent_pool_name + DOT_DELIMITER + pool[NAME] if parent_pool_name else pool[NAME]
-            self.__get_pool_names(pool[POOLS], current_pool_name, pool_names) if pool[POOLS] \
-                else pool_names.append(current_pool_name)
+            if pool[POOLS]:
+                self.__parent_pools[current_pool_name] = ImpalaPool(current_pool_name, pool)
+                self.__index_pools(pool[POOLS], current_pool_name)
+            else:
+                self.__pools[current_pool_name] = ImpalaPool(current_pool_name, pool)
 
     def get_pool_names(self):
         """
-        Get the whole pool names. Returns pool name list. Actually called private method
-        __get_pool_names(pools, parent_pool_name, pool_names).
+        Get the whole pool names.
 
         :return: (list) A list object contains whole impala pool name.
         """
-        pool_names = []
-        self.__get_pool_names(self.__allocations_value[POOLS], ROOT_PARENT_POOL_NAME, pool_names)
-        return pool_names
+        return list(self.__pools)
 
-    def __get_pool(self, pools, pool_name):
+    def get_pool(self, pool_name):
         """
-        Get the configuration of current pool from pools by pool name. If the pool with
-        pool_name was found in pools, returns ImpalaPool; otherwise, returns None.
+        Get the configuration of current pool by pool name.
 
-        :param pools: (dict) The whole impala pool configuration.
-        :param pool_name: (str) The impala pool name to be found.
+        :param pool_name: The impala pool name to be found.
         :return: (ImpalaPool or None) A ImpalaPool object if the pool named with pool_name exists.
             otherwise, a None object.
         """
-        for pool in pools:
-            if DOT_DELIMITER in pool_name:
-                parent_pool_name, sub_pool_name = pool_name.split(DOT_DELIMITER, 1)
-            else:
-                parent_pool_name, sub_pool_name = [pool_name, LEAF_SUB_POOL_NAME]
-
-            if parent_pool_name == pool[NAME]:
-                if pool[POOLS]:
-                    sub_pool = self.__get_pool(pool[POOLS], sub_pool_name)
-                    return sub_pool if sub_pool else None
-                else:
-                    return ImpalaPool(pool_name, pool)
+        return self.__pools.get(pool_name)
 
-    def get_pool(self, pool_name):
+    def get_parent_pool(self, pool_name):
         """
-        Get the configuration of current pool by pool name. Actually called private method
-        __get_pool(pools, pool_name).
+        Get the configuration of parent pool by pool name.
 
-        :param pool_name: The impala pool name to be found.
-        :return: (ImpalaPool or None) A ImpalaPool object if the pool named with pool_name exists.
+        :param pool_name: The impala parent pool name to be found, such as "root".
+        :return: (ImpalaPool or None) A ImpalaPool object if the parent pool named with pool_name exists.
             otherwise, a None object.
         """
-        return self.__get_pool(self.__allocations_value[POOLS], pool_name)
+        return self.__parent_pools.get(pool_name)
 
     def get_pools(self):
         """
@@ -172,7 +175,22 @@ class ImpalaScheduledAllocations(object):
 
         :return:(dict) A dict object contains the whole ImpalaPool.
         """
-        return {pool_name: self.get_pool(pool_name) for pool_name in self.get_pool_names()}
+        return dict(self.__pools)
+
+    def get_pools_mem_diff(self, pools_allocated_mem):
+        """
+        Get the diff between the allocated memory and the current memory of pools.
+
+        :param pools_allocated_mem: (dict) The allocated memory of the pool participating in the scheduling.
+        :return: (dict) A dict object mapping pool name to the tuple of current memory and allocated memory,
+            only the pools whose memory is effectively changed.
+        """
+        pools_mem_diff = {}
+        for pool_name, allocated_mem in pools_allocated_mem.items():
+            current_mem = self.get_pool(pool_name).get_pool_mem()
+            if current_mem != allocated_mem:
+                pools_mem_diff[pool_name] = (current_mem, allocated_mem)
+        return pools_mem_diff
 
     def update_pools(self, pools_allocated_mem):
         """
@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import logging
+import threading
+import time
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PHASE_SECONDS = "scheduler_phase_seconds"
+CALL_SECONDS = "scheduler_call_seconds"
+HTTP_REQUEST_SECONDS = "scheduler_http_request_seconds"
+HTTP_RESPONSE_BYTES = "scheduler_http_response_bytes_total"
+HTTP_RETRIES = "scheduler_http_retries_total"
+CYCLES = "scheduler_cycles_total"
+QUERIES_PROCESSED = "scheduler_queries_processed_total"
+CYCLE_QUERIES = "scheduler_cycle_queries"
+POOLS_MOVED = "scheduler_pools_moved_total"
+CYCLE_POOLS_MOVED = "scheduler_cycle_pools_moved"
+
+LOGGER = logging.getLogger(__name__)
+
+
+def format_labels(labels):
+    """
+    Format the labels in Prometheus text format.
+
+    :param labels: (tuple) The sorted tuples of label name and value.
+    :return: (str) The formatted labels, such as '{phase="fetch"}', "" if there is no label.
+    """
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                             for name, value in labels)
+
+
+def format_value(value):
+    """
+    Format the value in Prometheus text format.
+
+    :param value: (float) The value.
+    :return: (str) The formatted value.
+    """
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class MetricsRegistry(object):
+    """
+    The MetricsRegistry class that provides methods for recording the counters, gauges and histograms of
+    scheduler with labels, and rendering them in Prometheus text format. It is thread-safe.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics = {}
+
+    def register(self, name, metric_type, help_text, buckets=DEFAULT_BUCKETS):
+        """
+        Register a metric, registering the same name again does nothing.
+
+        :param name: (str) The metric name.
+        :param metric_type: (str) The metric type, "counter", "gauge" or "histogram".
+        :param help_text: (str) The help text of metric.
+        :param buckets: (tuple) The sorted upper bounds of histogram buckets.
+        """
+        with self.__lock:
+            self.__metrics.setdefault(name, (metric_type, help_text, tuple(buckets), {}))
+
+    def __get_series(self, name, labels):
+        metric_type, _, buckets, series = self.__metrics[name]
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = [[0] * (len(buckets) + 1), 0, 0] if metric_type == HISTOGRAM else [0]
+        return series[key]
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increase the counter.
+
+        :param name: (str) The metric name.
+        :param value: (float) The value to be added.
+        :param labels: (dict) The labels of series.
+        """
+        with self.__lock:
+            self.__get_series(name, labels)[0] += value
+
+    def set(self, name, value, **labels):
+        """
+        Set the gauge.
+
+        :param name: (str) The metric name.
+        :param value: (float) The value.
+        :param labels: (dict) The labels of series.
+        """
+        with self.__lock:
+            self.__get_series(name, labels)[0] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Observe a value of histogram.
+
+        :param name: (str) The metric name.
+        :param value: (float) The observed value.
+        :param labels: (dict) The labels of series.
+        """
+        with self.__lock:
+            bucket_counts, _, _ = series = self.__get_series(name, labels)
+            bucket_counts[bisect.bisect_left(self.__metrics[name][2], value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def get(self, name, **labels):
+        """
+        Get the value of counter or gauge, or the count of histogram.
+
+        :param name: (str) The metric name.
+        :param labels: (dict) The labels of series.
+        :return: (float) The value, 0 if the series is not recorded.
+        """
+        with self.__lock:
+            series = self.__metrics[name][3].get(tuple(sorted(labels.items())))
+            if series is None:
+                return 0
+            return series[2] if self.__metrics[name][0] == HISTOGRAM else series[0]
+
+    @contextmanager
+    def time(self, name, **labels):
+        """
+        Observe the seconds spent in the context to histogram.
+
+        :param name: (str) The metric name.
+        :param labels: (dict) The labels of series.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        """
+        Render the whole metrics in Prometheus text format.
+
+        :return: (str) The metrics text.
+        """
+        lines = []
+        with self.__lock:
+            for name, (metric_type, help_text, buckets, series) in sorted(self.__metrics.items()):
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s %s" % (name, metric_type))
+                for labels, values in sorted(series.items()):
+                    if metric_type != HISTOGRAM:
+                        lines.append("%s%s %s" % (name, format_labels(labels), format_value(values[0])))
+                        continue
+                    cumulative_count = 0
+                    for upper_bound, count in zip(buckets + (float("inf"),), values[0]):
+                        cumulative_count += count
+                        lines.append("%s_bucket%s %d" % (name, format_labels(labels + (("le", format_value(
+                            upper_bound)),)), cumulative_count))
+                    lines.append("%s_sum%s %s" % (name, format_labels(labels), format_value(values[1])))
+                    lines.append("%s_count%s %d" % (name, format_labels(labels), values[2]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.register(PHASE_SECONDS, HISTOGRAM, "Seconds spent in the phases of scheduling cycle.")
+REGISTRY.register(CALL_SECONDS, HISTOGRAM, "Seconds spent in the calls of cloudera manager.")
+REGISTRY.register(HTTP_REQUEST_SECONDS, HISTOGRAM, "Seconds of http requests to cloudera manager by endpoint.")
+REGISTRY.register(HTTP_RESPONSE_BYTES, COUNTER, "Bytes received from cloudera manager by endpoint.")
+REGISTRY.register(HTTP_RETRIES, COUNTER, "Retries of http requests to cloudera manager by endpoint.")
+REGISTRY.register(CYCLES, COUNTER, "Scheduling cycles.")
+REGISTRY.register(QUERIES_PROCESSED, COUNTER, "Queries processed by the scheduling cycles.")
+REGISTRY.register(CYCLE_QUERIES, GAUGE, "Queries processed by the last scheduling cycle.")
+REGISTRY.register(POOLS_MOVED, COUNTER, "Pools whose memory is moved by the scheduling cycles.")
+REGISTRY.register(CYCLE_POOLS_MOVED, GAUGE, "Pools whose memory is moved by the last scheduling cycle.")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    The MetricsHandler class that serves the metrics of registry in Prometheus text format.
+    """
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOGGER.debug("metrics request: " + format, *args)
+
+
+def start_metrics_server(host, port):
+    """
+    Start the http server of metrics in a background daemon thread.
+
+    :param host: (str) The host to bind, such as "127.0.0.1".
+    :param port: (int) The port to bind, 0 means any free port.
+    :return: (ThreadingHTTPServer) The started server, its server_address holds the bound port.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    LOGGER.info("metrics server started at http://%s:%d%s", host, server.server_address[1], METRICS_PATH)
+    return server
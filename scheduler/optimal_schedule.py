@@ -0,0 +1,98 @@
+import logging
+import math
+import numpy as np
+
+from scheduler.constants import ScheduleSectOpts
+from scheduler.base_schedule import AbstractSchedule, get_pool_demand_mems
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OptimalSchedule(AbstractSchedule):
+    """
+    The OptimalSchedule class that provides methods for calculating the statistic data of fetched
+    query information and allocating the impala pool memory optimally.
+
+    The allocation minimizes the sum of weight-scaled expected queued memory over whole pools, subject to the
+    min_mem and max_mem of pools, the conserved total memory and the granularity of schedule_memory_unit. The
+    expected queued memory of a pool is the mean of max(0, demand - allocated memory) over the demand samples,
+    which is convex in the allocated memory, so the marginal gain of every memory unit is non-increasing and
+    taking the memory units with the largest gains is exactly optimal. The memory units that the pools have now
+    are preferred among equal gains, so memory is never moved without gain.
+    """
+
+    @classmethod
+    def __get_expected_queued_mems(cls, demands, mems):
+        """
+        Get the expected queued memory, the mean of max(0, demand - mem) over the demand samples.
+
+        :param demands: (ndarray) The sorted memory demand samples.
+        :param mems: (ndarray) The allocated memory.
+        :return: (ndarray) The expected queued memory of each allocated memory.
+        """
+        suffix_sums = np.concatenate([np.cumsum(demands[::-1])[::-1], [0]])
+        indexes = np.searchsorted(demands, mems, side="right")
+        return (suffix_sums[indexes] - (demands.shape[0] - indexes) * mems) / demands.shape[0]
+
+    @classmethod
+    def __get_pools_units(cls, section_schedule, pools_info):
+        """
+        Get the memory units that each pool can be allocated, with the weight-scaled marginal gain of each unit.
+
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :return: (tuple) A tuple object that contains the lower bound memory of pools, and the pool index,
+            the gain, whether the pool has the unit now and the memory below the unit of every unit.
+        """
+        memory_unit = section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MEMORY_UNIT]
+        lower_mems, unit_pools, unit_gains, unit_currents, unit_mems = [], [], [], [], []
+        for pool_index, pool_info in enumerate(pools_info.values()):
+            current_mem = pool_info.current_mem
+            lower_mem = current_mem - memory_unit * math.floor((current_mem - pool_info.min_mem) / memory_unit)
+            upper_mem = current_mem + memory_unit * math.floor((pool_info.max_mem - current_mem) / memory_unit)
+            demands = np.sort(get_pool_demand_mems(pool_info))
+            # the units above both the current memory and the peak demand have no gain and are never needed
+            useful_mem = max(current_mem, lower_mem + memory_unit * math.ceil((demands[-1] - lower_mem) / memory_unit))
+            unit_number = max(0, int(round((min(upper_mem, useful_mem) - lower_mem) / memory_unit)))
+
+            mems = lower_mem + memory_unit * np.arange(unit_number + 1, dtype=np.float64)
+            queued_mems = cls.__get_expected_queued_mems(demands, mems)
+            lower_mems.append(lower_mem)
+            unit_pools.append(np.full(unit_number, pool_index))
+            unit_gains.append(pool_info.weight * (queued_mems[:-1] - queued_mems[1:]))
+            unit_currents.append(mems[1:] <= current_mem)
+            unit_mems.append(mems[:-1])
+        return lower_mems, np.concatenate(unit_pools), np.concatenate(unit_gains), np.concatenate(unit_currents), \
+            np.concatenate(unit_mems)
+
+    @classmethod
+    def get_pools_allocated_mem(cls, section_schedule, pools_info):
+        """
+        Get the allocated memory of whole pool.
+
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param pools_info: (dict) The information of pools that participate in the scheduling.
+        :return: (dict) A dict object contains allocated memory of the pools whose memory is changed.
+        """
+        if not pools_info:
+            return {}
+        memory_unit = section_schedule[ScheduleSectOpts.OPT_SCHEDULE_MEMORY_UNIT]
+        lower_mems, unit_pools, unit_gains, unit_currents, unit_mems = \
+            OptimalSchedule.__get_pools_units(section_schedule, pools_info)
+        total_mem = sum(pool_info.current_mem for pool_info in pools_info.values())
+        budget_units = int(round((total_mem - sum(lower_mems)) / memory_unit))
+        if budget_units < 0 or budget_units > unit_pools.shape[0]:
+            LOGGER.warning("the total memory %s can not be allocated within min_mem and max_mem of pools.", total_mem)
+            return {}
+
+        # take the units by largest gain, then the units that the pools have now, then the lowest units
+        order = np.lexsort((unit_mems, ~unit_currents, -unit_gains))
+        allocated_units = np.bincount(unit_pools[order[:budget_units]], minlength=len(pools_info))
+
+        pools_allocated_mem = {}
+        for pool_info, lower_mem, units in zip(pools_info.values(), lower_mems, allocated_units):
+            allocated_mem = lower_mem + memory_unit * int(units)
+            if allocated_mem != pool_info.current_mem:
+                pools_allocated_mem[pool_info.pool_name] = allocated_mem
+        LOGGER.info("pools allocated memory: %s", pools_allocated_mem)
+        return pools_allocated_mem
@@ -0,0 +1,144 @@
+import logging
+import time
+import numpy as np
+
+from scheduler.base_schedule import PoolStat, PoolStatPartial, calculate_intervals_stat_partials, \
+    get_queries_intervals, get_milli_secs
+from scheduler.constants import FormativeQueryInfoColumn, COMPLETED_QUERY_STATES
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PoolStatPartials(object):
+    """
+    The PoolStatPartials class that provides methods for the statistics of pools built by merging the
+    partial statistics of fixed time slices.
+
+    The partial statistics of a time slice are cached once the time slice is finished, which means it has
+    ended and every query started before its end has completed, so later statistic windows that cover the
+    time slice only calculate the unfinished time slices and the ragged edges of window. The intervals of
+    queries are got once for all these time slices, and sorted by start, so a time slice only takes the
+    queries started in it or within the longest query before it.
+    """
+
+    def __init__(self, partial_minutes):
+        """
+        Create a PoolStatPartials object.
+
+        :param partial_minutes: (int) The minutes of time slice.
+        """
+        self.__partial_milli_secs = partial_minutes * 60 * 1000
+        self.__partials = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __get_finished_milli_sec(self, queries_info, end_milli_sec):
+        """
+        Get the milliseconds before which all time slices are finished.
+
+        :param queries_info: (DataFrame) The query information.
+        :param end_milli_sec: (int) The end milliseconds of statistic window.
+        :return: (int) The milliseconds before which all time slices are finished.
+        """
+        if FormativeQueryInfoColumn.QUERY_STATE not in queries_info:
+            return 0
+        uncompleted = ~queries_info[FormativeQueryInfoColumn.QUERY_STATE].isin(COMPLETED_QUERY_STATES)
+        if not uncompleted.any():
+            return end_milli_sec
+        start_milli_secs = get_milli_secs(queries_info.loc[uncompleted, FormativeQueryInfoColumn.START_TIME])
+        return min(end_milli_sec, int(start_milli_secs.min()))
+
+    @classmethod
+    def __get_sorted_intervals(cls, queries_info):
+        """
+        Get the intervals of queries sorted by start, and the longest milliseconds from the start of query
+        to the end of its wait or run.
+
+        :param queries_info: (DataFrame) The query information.
+        :return: (tuple) A tuple object that contains the sorted intervals of queries and the longest
+            milliseconds.
+        """
+        pool_codes, pool_names, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems = \
+            get_queries_intervals(queries_info)
+        order = np.argsort(start_milli_secs, kind="stable")
+        queries_intervals = (pool_codes[order], pool_names, start_milli_secs[order], queued_milli_secs[order],
+                             end_milli_secs[order], used_mems[order])
+        extents = np.maximum(end_milli_secs, start_milli_secs + queued_milli_secs) - start_milli_secs
+        longest_milli_secs = int(np.nan_to_num(extents).max()) if extents.shape[0] else 0
+        return queries_intervals, longest_milli_secs
+
+    @classmethod
+    def __get_slice_intervals(cls, sorted_intervals, slice_start, slice_end):
+        """
+        Get the intervals of queries that may be queued or running in time slice.
+
+        :param sorted_intervals: (tuple) The sorted intervals of queries and the longest milliseconds.
+        :param slice_start: (int) The start milliseconds of time slice.
+        :param slice_end: (int) The end milliseconds of time slice.
+        :return: (tuple) The intervals of queries started in [slice_start - longest milliseconds, slice_end).
+        """
+        (pool_codes, pool_names, start_milli_secs, queued_milli_secs, end_milli_secs, used_mems), \
+            longest_milli_secs = sorted_intervals
+        first, last = np.searchsorted(start_milli_secs, [slice_start - longest_milli_secs, slice_end], side="left")
+        return (pool_codes[first:last], pool_names, start_milli_secs[first:last], queued_milli_secs[first:last],
+                end_milli_secs[first:last], used_mems[first:last])
+
+    def __get_slices(self, start_milli_sec, end_milli_sec):
+        """
+        Split the statistic window into time slices aligned to the slice length, the first and the last
+        time slices may be shorter.
+
+        :param start_milli_sec: (int) The start milliseconds of statistic window.
+        :param end_milli_sec: (int) The end milliseconds of statistic window.
+        :return: (list) A list object of tuples that contains the start and end milliseconds of time slice.
+        """
+        bounds = list(range(start_milli_sec - start_milli_sec % self.__partial_milli_secs + self.__partial_milli_secs,
+                            end_milli_sec, self.__partial_milli_secs))
+        bounds = [start_milli_sec] + bounds + [end_milli_sec]
+        return [(slice_start, slice_end) for slice_start, slice_end in zip(bounds[:-1], bounds[1:])
+                if slice_end > slice_start]
+
+    def get_pools_stat(self, queries_info, start_time, end_time):
+        """
+        Get the statistics of pools by merging the partial statistics of time slices.
+
+        :param queries_info: (DataFrame) The query information.
+        :param start_time: (datetime) The start time of statistic window.
+        :param end_time: (datetime) The end time of statistic window.
+        :return: (dict) A dict object mapping pool name to a PoolStat object.
+        """
+        if queries_info is None:
+            return None
+        start_milli_sec = int(time.mktime(start_time.timetuple()) * 1000)
+        end_milli_sec = int(time.mktime(end_time.timetuple()) * 1000)
+        finished_milli_sec = self.__get_finished_milli_sec(queries_info, end_milli_sec)
+
+        pools_partial, sorted_intervals = {}, None
+        for slice_start, slice_end in self.__get_slices(start_milli_sec, end_milli_sec):
+            is_full_slice = slice_end - slice_start == self.__partial_milli_secs
+            if is_full_slice and slice_start in self.__partials:
+                self.hits += 1
+                pools_slice_partial = self.__partials[slice_start]
+            else:
+                self.misses += 1
+                if sorted_intervals is None:
+                    sorted_intervals = PoolStatPartials.__get_sorted_intervals(queries_info)
+                pools_slice_partial = calculate_intervals_stat_partials(
+                    PoolStatPartials.__get_slice_intervals(sorted_intervals, slice_start, slice_end),
+                    slice_start, slice_end)
+                if is_full_slice and slice_end <= finished_milli_sec:
+                    self.__partials[slice_start] = pools_slice_partial
+
+            # pools without queries in some time slices are merged with empty partial statistics
+            for pool_name in set(pools_partial) | set(pools_slice_partial):
+                pool_partial = pools_partial.get(pool_name, PoolStatPartial(pool_name, start_milli_sec, slice_start))
+                slice_partial = pools_slice_partial.get(pool_name, PoolStatPartial(pool_name, slice_start, slice_end))
+                pools_partial[pool_name] = pool_partial.merge(slice_partial)
+
+        for slice_start in [key for key in self.__partials if key < start_milli_sec]:
+            del self.__partials[slice_start]
+
+        pools_stat = {pool_name: PoolStat.from_partial(pools_partial[pool_name])
+                      for pool_name in sorted(pools_partial)}
+        LOGGER.info("pools stat info: %s, cached slices hits: %d, misses: %d", pools_stat, self.hits, self.misses)
+        return pools_stat
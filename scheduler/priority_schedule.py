@@ -37,8 +37,12 @@ class PrioritySchedule(AbstractSchedule):
             if pool_stat.wait_secs >= busy_threshold and pool_stat.wait_mem_avg > 0:
                 wait_mem = min(pool_stat.wait_mem_avg, pool_info.max_mem - pool_info.current_mem)
                 moved_mem = memory_unit * math.ceil(wait_mem / memory_unit)
+            elif pool_stat.forecast_mem is not None and pool_stat.forecast_mem > pool_info.current_mem:
+                forecast_wait_mem = min(pool_stat.forecast_mem, pool_info.max_mem) - pool_info.current_mem
+                moved_mem = memory_unit * math.ceil(forecast_wait_mem / memory_unit)
 
-            free_mem = (pool_info.current_mem - max(pool_stat.used_mem_avg, pool_info.min_mem)) * free_memory_ratio
+            free_mem = (pool_info.current_mem - max(pool_stat.used_mem_avg, pool_info.min_mem,
+                                                    pool_stat.forecast_mem or 0)) * free_memory_ratio
             free_mem_unit = memory_unit * math.floor(free_mem / memory_unit)
             if pool_stat.wait_secs == 0 and free_mem_unit > 0:
                 moved_mem = -free_mem_unit
@@ -0,0 +1,95 @@
+import logging
+import sqlite3
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = "CREATE TABLE IF NOT EXISTS query_details (" \
+                   "query_id TEXT PRIMARY KEY, mem_limit REAL, max_host INTEGER, " \
+                   "created_at REAL, accessed_at REAL)"
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS query_details_accessed_at ON query_details (accessed_at)"
+SELECT_SQL = "SELECT mem_limit, max_host, created_at FROM query_details WHERE query_id = ?"
+TOUCH_SQL = "UPDATE query_details SET accessed_at = ? WHERE query_id = ?"
+INSERT_SQL = "INSERT OR REPLACE INTO query_details VALUES (?, ?, ?, ?, ?)"
+DELETE_EXPIRED_SQL = "DELETE FROM query_details WHERE created_at < ?"
+COUNT_SQL = "SELECT COUNT(*) FROM query_details"
+DELETE_LEAST_RECENTLY_USED_SQL = "DELETE FROM query_details WHERE query_id IN " \
+                                 "(SELECT query_id FROM query_details ORDER BY accessed_at LIMIT ?)"
+
+
+class QueryDetailsCache(object):
+    """
+    The QueryDetailsCache class that provides methods for caching the parsed query details (mem limit and
+    max hosts) of completed queries in a local sqlite database, keyed by query_id.
+
+    Completed queries are immutable, so a cached entry is valid until it expires after ttl_hours. When the
+    number of entries exceeds max_size, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl_hours, max_size):
+        """
+        Create a QueryDetailsCache object.
+
+        :param path: (str) The path of sqlite database file.
+        :param ttl_hours: (float) The hours that a cached entry is valid.
+        :param max_size: (int) The max number of cached entries.
+        """
+        self.__ttl_secs = ttl_hours * 3600
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__hits, self.__misses = 0, 0
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute(CREATE_TABLE_SQL)
+        self.__connection.execute(CREATE_INDEX_SQL)
+        self.__connection.commit()
+
+    def get(self, query_id):
+        """
+        Get the cached query details by query_id.
+
+        :param query_id: (str) The query id.
+        :return: (tuple or None) A tuple object that contains mem limit and max hosts if the query_id is
+            cached and not expired, otherwise, a None object.
+        """
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute(SELECT_SQL, (query_id,)).fetchone()
+            if row is None or row[2] < now - self.__ttl_secs:
+                self.__misses += 1
+                return None
+            self.__connection.execute(TOUCH_SQL, (now, query_id))
+            self.__hits += 1
+        return row[0], row[1]
+
+    def put(self, query_id, mem_limit, max_host):
+        """
+        Cache the query details of a completed query.
+
+        :param query_id: (str) The query id.
+        :param mem_limit: (float) The mem limit of query, unit: MB.
+        :param max_host: (int) The max hosts of query.
+        """
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute(INSERT_SQL, (query_id, mem_limit, max_host, now, now))
+
+    def evict(self):
+        """
+        Evict the expired entries, and then the least recently used entries exceed max_size.
+        """
+        with self.__lock:
+            self.__connection.execute(DELETE_EXPIRED_SQL, (time.time() - self.__ttl_secs,))
+            size = self.__connection.execute(COUNT_SQL).fetchone()[0]
+            if size > self.__max_size:
+                self.__connection.execute(DELETE_LEAST_RECENTLY_USED_SQL, (size - self.__max_size,))
+            self.__connection.commit()
+
+    def close(self):
+        """
+        Commit the cached entries and close the database.
+        """
+        LOGGER.info("query details cache hits: %d, misses: %d", self.__hits, self.__misses)
+        with self.__lock:
+            self.__connection.commit()
+            self.__connection.close()
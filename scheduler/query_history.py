@@ -0,0 +1,163 @@
+import logging
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from scheduler.constants import FormativeQueryInfoColumn, QUERY_INFO_COLUMNS
+
+PARTITION_NAME_FORMAT = "%Y%m%d%H"
+PARTITION_FILE_SUFFIX = ".npz"
+PARTITION_TEMP_FILE_SUFFIX = ".tmp.npz"
+CATEGORIES_SUFFIX = "_categories"
+
+CATEGORICAL_COLUMNS = [FormativeQueryInfoColumn.POOL,
+                       FormativeQueryInfoColumn.QUERY_STATE]
+NUMERIC_COLUMNS = [FormativeQueryInfoColumn.DURATION_MILLIS,
+                   FormativeQueryInfoColumn.ADMISSION_WAIT,
+                   FormativeQueryInfoColumn.MEM_LIMIT,
+                   FormativeQueryInfoColumn.MAX_HOST]
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryHistory(object):
+    """
+    The QueryHistory class that provides methods for the on-disk history of query information.
+
+    The history is partitioned by the hour of start time, one compressed numpy file per partition. The
+    start times are stored as int64 milliseconds, the pool names and query states are stored as category
+    codes, and the queries are deduplicated by query id when written, so the history of weeks can be read
+    by time range and pool without fetching from cloudera manager.
+    """
+
+    def __init__(self, path, retention_days):
+        """
+        Create a QueryHistory object.
+
+        :param path: (str) The directory of history partitions.
+        :param retention_days: (int) The days of history to be retained.
+        """
+        self.__path = path
+        self.__retention_days = retention_days
+        os.makedirs(self.__path, exist_ok=True)
+
+    def __get_partition_path(self, partition_time):
+        return os.path.join(self.__path, partition_time.strftime(PARTITION_NAME_FORMAT) + PARTITION_FILE_SUFFIX)
+
+    def __get_partition_times(self):
+        """
+        Get the start time of whole partitions.
+
+        :return: (list) A sorted list object of datetime.
+        """
+        partition_times = []
+        for file in os.listdir(self.__path):
+            if not file.endswith(PARTITION_FILE_SUFFIX) or file.endswith(PARTITION_TEMP_FILE_SUFFIX):
+                continue
+            try:
+                partition_times.append(datetime.strptime(file[:-len(PARTITION_FILE_SUFFIX)], PARTITION_NAME_FORMAT))
+            except ValueError:
+                LOGGER.warning("skip unknown file %s in query history.", file)
+        return sorted(partition_times)
+
+    def __read_partition(self, partition_time):
+        """
+        Read the query information of partition.
+
+        :param partition_time: (datetime) The start time of partition.
+        :return: (DataFrame) A DataFrame object of query information, None if the partition does not exist.
+        """
+        partition_path = self.__get_partition_path(partition_time)
+        if not os.path.exists(partition_path):
+            return None
+
+        with np.load(partition_path, allow_pickle=False) as partition:
+            columns = {FormativeQueryInfoColumn.QUERY_ID: partition[FormativeQueryInfoColumn.QUERY_ID],
+                       FormativeQueryInfoColumn.START_TIME:
+                           partition[FormativeQueryInfoColumn.START_TIME].astype("datetime64[ms]")}
+            for column in CATEGORICAL_COLUMNS:
+                columns[column] = pd.Categorical.from_codes(partition[column], partition[column + CATEGORIES_SUFFIX]) \
+                    .astype(object)
+            for column in NUMERIC_COLUMNS:
+                columns[column] = partition[column]
+        return pd.DataFrame(data=columns, columns=QUERY_INFO_COLUMNS)
+
+    def __write_partition(self, partition_time, queries_info):
+        """
+        Write the query information of partition, the file is replaced atomically.
+
+        :param partition_time: (datetime) The start time of partition.
+        :param queries_info: (DataFrame) The query information of partition.
+        """
+        arrays = {FormativeQueryInfoColumn.QUERY_ID: queries_info[FormativeQueryInfoColumn.QUERY_ID]
+                  .to_numpy().astype(str),
+                  FormativeQueryInfoColumn.START_TIME: queries_info[FormativeQueryInfoColumn.START_TIME]
+                  .to_numpy().astype("datetime64[ms]").astype(np.int64)}
+        for column in CATEGORICAL_COLUMNS:
+            categorical = pd.Categorical(queries_info[column])
+            arrays[column] = categorical.codes
+            arrays[column + CATEGORIES_SUFFIX] = categorical.categories.to_numpy().astype(str)
+        for column in NUMERIC_COLUMNS:
+            arrays[column] = pd.to_numeric(queries_info[column]).to_numpy()
+
+        partition_path = self.__get_partition_path(partition_time)
+        temp_partition_path = partition_path[:-len(PARTITION_FILE_SUFFIX)] + PARTITION_TEMP_FILE_SUFFIX
+        np.savez_compressed(temp_partition_path, **arrays)
+        os.replace(temp_partition_path, partition_path)
+
+    def write(self, queries_info):
+        """
+        Write the query information to history. Queries written again replace the old ones.
+
+        :param queries_info: (DataFrame) The query information.
+        """
+        if queries_info is None or queries_info.shape[0] == 0:
+            return
+
+        start_times = pd.to_datetime(queries_info[FormativeQueryInfoColumn.START_TIME])
+        queries_info = queries_info.assign(**{FormativeQueryInfoColumn.START_TIME: start_times})
+        for partition_time, partition_queries_info in queries_info.groupby(start_times.dt.floor("h")):
+            partition_time = partition_time.to_pydatetime()
+            old_queries_info = self.__read_partition(partition_time)
+            if old_queries_info is not None:
+                partition_queries_info = pd.concat([old_queries_info, partition_queries_info], ignore_index=True)
+            partition_queries_info = partition_queries_info.drop_duplicates([FormativeQueryInfoColumn.QUERY_ID],
+                                                                            keep="last")
+            self.__write_partition(partition_time, partition_queries_info)
+        LOGGER.info("query history written, size: %d", queries_info.shape[0])
+
+    def read(self, start_time, end_time, pool_names=None):
+        """
+        Read the query information started in [start_time, end_time] from history.
+
+        :param start_time: (datetime) The start time of query information.
+        :param end_time: (datetime) The end time of query information.
+        :param pool_names: (list) The pool names to be read, None means whole pools.
+        :return: (DataFrame) A DataFrame object of query information, None if there is no query.
+        """
+        first_partition_time = start_time.replace(minute=0, second=0, microsecond=0)
+        partitions = []
+        for partition_time in self.__get_partition_times():
+            if not first_partition_time <= partition_time <= end_time:
+                continue
+            queries_info = self.__read_partition(partition_time)
+            selected = (queries_info[FormativeQueryInfoColumn.START_TIME] >= start_time) & \
+                (queries_info[FormativeQueryInfoColumn.START_TIME] <= end_time)
+            if pool_names is not None:
+                selected &= queries_info[FormativeQueryInfoColumn.POOL].isin(pool_names)
+            if selected.any():
+                partitions.append(queries_info[selected])
+        return pd.concat(partitions, ignore_index=True) if partitions else None
+
+    def evict(self, now=None):
+        """
+        Delete the partitions which are older than the retention days.
+
+        :param now: (datetime) The current time, None means datetime.now().
+        """
+        expired_time = (now or datetime.now()) - timedelta(days=self.__retention_days)
+        for partition_time in self.__get_partition_times():
+            if partition_time + timedelta(hours=1) <= expired_time:
+                os.remove(self.__get_partition_path(partition_time))
+                LOGGER.info("query history partition %s expired.", partition_time)
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+import traceback
+
+from scheduler.cloudera_manager import ClouderaManager
+from scheduler.constants import ScheduleSectOpts, DEFAULT_ENABLE_QUERY_INGESTER, \
+    DEFAULT_QUERY_INGEST_INTERVAL_SECONDS, DEFAULT_QUERY_INGEST_WINDOW_MAX_SIZE
+from scheduler.global_utils import fetch_queries_info, get_cloudera_manager_config
+from scheduler.query_window import QueryWindow
+from scheduler.settings import QUERY_WINDOW_PATH
+
+MAX_STALE_INTERVALS = 2
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryIngester(object):
+    """
+    The QueryIngester class that provides methods for ingesting the query information in a background thread,
+    so the scheduling reads a snapshot of recent queries instantly and the slowness of cloudera manager does not
+    delay the scheduling.
+
+    Every ingestion fetches the queries newer than the high-water mark of a bounded query window, the window
+    keeps the queries of last [schedule.fetch_queries_timedelta_minutes] minutes. The fetching runs without
+    the lock, only the update of window and the reading of snapshot are exclusive.
+    """
+
+    def __init__(self, cloudera_manager, section_schedule, query_window, interval_seconds, max_size=None):
+        """
+        Create a QueryIngester object.
+
+        :param cloudera_manager: (ClouderaManager) The cloudera manager object used by the ingester.
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param query_window: (QueryWindow) The window of recent queries.
+        :param interval_seconds: (float) The seconds between the ingestions.
+        :param max_size: (int) The max number of queries in window, None means no limit.
+        """
+        self.__cloudera_manager = cloudera_manager
+        self.__section_schedule = section_schedule
+        self.__query_window = query_window
+        self.__interval_seconds = interval_seconds
+        self.__max_size = max_size
+        self.__window_timedelta = timedelta(
+            minutes=section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_TIMEDELTA_MINUTES])
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__ingested_event = threading.Event()
+        self.__thread = None
+        self.ingested_time = None
+
+    def ingest(self, now=None):
+        """
+        Fetch the new queries and add them to the window.
+
+        :param now: (datetime) The end time of fetching, by default, datetime.now().
+        """
+        end_time = now or datetime.now()
+        start_time = end_time - self.__window_timedelta
+        with self.__lock:
+            fetch_start_time = self.__query_window.get_fetch_start_time(start_time)
+
+        queries_info = fetch_queries_info(self.__cloudera_manager, self.__section_schedule, fetch_start_time,
+                                          end_time)
+
+        with self.__lock:
+            self.__query_window.update(queries_info)
+            self.__query_window.evict(start_time, self.__max_size)
+            self.__query_window.save()
+            self.ingested_time = end_time
+        self.__ingested_event.set()
+        LOGGER.info("ingested queries info between: %s ~ %s size is %d", str(fetch_start_time), str(end_time),
+                    0 if queries_info is None else queries_info.shape[0])
+
+    def is_stale(self, now=None):
+        """
+        Check whether the snapshot is stale, which means the last ingestion is older than
+        MAX_STALE_INTERVALS intervals, such as the ingestions keep failing.
+
+        :param now: (datetime) The current time, by default, datetime.now().
+        :return: (bool) True if the snapshot is stale.
+        """
+        return self.ingested_time is not None and (now or datetime.now()) - self.ingested_time > timedelta(
+            seconds=MAX_STALE_INTERVALS * self.__interval_seconds)
+
+    def get_queries_info(self, end_time):
+        """
+        Get the snapshot of query information in window which started before end_time.
+
+        :param end_time: (datetime) The end time of the window.
+        :return: (DataFrame) A DataFrame object of query information, None if there is no query.
+        """
+        with self.__lock:
+            return self.__query_window.get_queries_info(end_time)
+
+    def __run(self):
+        """
+        Ingest the queries every interval until the ingester is stopped, the failure of an ingestion is logged
+        and the ingestion is retried in the next interval.
+        """
+        while not self.__stop_event.is_set():
+            try:
+                self.ingest()
+            except Exception:
+                LOGGER.error("fail to ingest queries info.\n %s" % traceback.format_exc())
+            self.__stop_event.wait(self.__interval_seconds)
+
+    def start(self, timeout=None):
+        """
+        Start the ingestion in a background daemon thread, and wait for the first ingestion.
+
+        :param timeout: (float) The max seconds to wait for the first ingestion, by default, the interval.
+        :return: (bool) True if the first ingestion is done within the timeout.
+        """
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="query-ingester", daemon=True)
+        self.__thread.start()
+        return self.__ingested_event.wait(self.__interval_seconds if timeout is None else timeout)
+
+    def stop(self):
+        """
+        Stop the ingestion and wait for the running ingestion.
+        """
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+
+def create_query_ingester(scheduler_config):
+    """
+    Create a object of query ingester, it is created here rather than in global_utils, because the ingester
+    holds its own cloudera manager client.
+
+    :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+    :return: (QueryIngester or None) A QueryIngester object if user has set the configuration item
+        [schedule.enable_query_ingester] to "true", otherwise, a None object.
+    """
+    section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+    if not section_schedule.get(ScheduleSectOpts.OPT_ENABLE_QUERY_INGESTER, DEFAULT_ENABLE_QUERY_INGESTER):
+        return None
+    return QueryIngester(ClouderaManager(*get_cloudera_manager_config(scheduler_config)), section_schedule,
+                         QueryWindow(QUERY_WINDOW_PATH),
+                         section_schedule.get(ScheduleSectOpts.OPT_QUERY_INGEST_INTERVAL_SECONDS,
+                                              DEFAULT_QUERY_INGEST_INTERVAL_SECONDS),
+                         section_schedule.get(ScheduleSectOpts.OPT_QUERY_INGEST_WINDOW_MAX_SIZE,
+                                              DEFAULT_QUERY_INGEST_WINDOW_MAX_SIZE))
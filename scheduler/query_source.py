@@ -0,0 +1,213 @@
+from abc import ABCMeta, abstractmethod
+from datetime import datetime, timedelta
+import copy
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+from scheduler.constants import FormativeQueryInfoColumn, IMPALA_SCHEDULED_ALLOCATIONS
+from scheduler.global_utils import get_queries_info
+
+ITEMS = "items"
+NAME = "name"
+VALUE = "value"
+RUNNING_QUERY_STATE = "RUNNING"
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QuerySourceInterface(metaclass=ABCMeta):
+    """
+    The QuerySourceInterface abstract base class that provides methods for the clock, the query information
+    and the impala configuration that the scheduling runs against.
+    """
+
+    @abstractmethod
+    def now(self):
+        """
+        Get the current time of source.
+
+        :return: (datetime) The current time.
+        """
+        pass
+
+    @abstractmethod
+    def get_queries_info(self, section_schedule, start_time, end_time):
+        """
+        Get the query information between start_time and end_time.
+
+        :param section_schedule: (dict) The schedule section of configuration in ../conf/scheduler.yml.
+        :param start_time: (datetime) The start time to fetching query information.
+        :param end_time: (datetime) The end time to fetching query information.
+        :return: (DataFrame) A DataFrame object of query information, None if there is no query.
+        """
+        pass
+
+    @abstractmethod
+    def get_impala_config(self):
+        """
+        Get the impala configuration.
+
+        :return: (dict) A dict object of impala cluster configuration.
+        """
+        pass
+
+    @abstractmethod
+    def update_impala_config(self, impala_config):
+        """
+        Update the impala configuration.
+
+        :param impala_config: (str) The impala configuration item in json format.
+        """
+        pass
+
+    @abstractmethod
+    def refresh_pools(self):
+        """
+        Refresh the impala resource pools.
+        """
+        pass
+
+
+class ClouderaManagerSource(QuerySourceInterface):
+    """
+    The ClouderaManagerSource class that runs the scheduling against the live cloudera manager.
+    """
+
+    def __init__(self, cloudera_manager, query_window=None):
+        """
+        Create a ClouderaManagerSource object.
+
+        :param cloudera_manager: (ClouderaManager) The cloudera manager object.
+        :param query_window: (QueryWindow) The window of recent queries for incremental fetching.
+        """
+        self.__cloudera_manager = cloudera_manager
+        self.__query_window = query_window
+
+    def now(self):
+        return datetime.now()
+
+    def get_queries_info(self, section_schedule, start_time, end_time):
+        return get_queries_info(self.__cloudera_manager, section_schedule, start_time, end_time, self.__query_window)
+
+    def get_impala_config(self):
+        return self.__cloudera_manager.get_impala_config()
+
+    def update_impala_config(self, impala_config):
+        self.__cloudera_manager.update_impala_config(impala_config)
+
+    def refresh_pools(self):
+        self.__cloudera_manager.refresh_pools()
+
+
+class IngestedSource(ClouderaManagerSource):
+    """
+    The IngestedSource class that runs the scheduling against the live cloudera manager, but reads the query
+    information from the snapshot of query ingester. The current time is the end time of last ingestion, so
+    the statistics cover exactly the ingested queries.
+    """
+
+    def __init__(self, cloudera_manager, query_ingester):
+        """
+        Create a IngestedSource object.
+
+        :param cloudera_manager: (ClouderaManager) The cloudera manager object.
+        :param query_ingester: (QueryIngester) The query ingester.
+        """
+        super().__init__(cloudera_manager)
+        self.__query_ingester = query_ingester
+
+    def now(self):
+        return self.__query_ingester.ingested_time or datetime.now()
+
+    def get_queries_info(self, section_schedule, start_time, end_time):
+        return self.__query_ingester.get_queries_info(end_time)
+
+
+class ReplaySource(QuerySourceInterface):
+    """
+    The ReplaySource class that replays the scheduling against the query history and a saved impala
+    configuration with a virtual clock, so no cloudera manager is touched.
+
+    The queries are seen as they were at the virtual time, the queries that have not ended are in
+    running state and their admission wait and duration are cut at the virtual time. The updated
+    impala configuration is kept and returned by later cycles, and every refresh is recorded.
+    """
+
+    def __init__(self, query_history, impala_config, start_time, step_minutes):
+        """
+        Create a ReplaySource object.
+
+        :param query_history: (QueryHistory) The query history to be replayed.
+        :param impala_config: (dict) The impala configuration in the format of `scheduler_utils.py backup`.
+        :param start_time: (datetime) The start time of virtual clock.
+        :param step_minutes: (int) The minutes that virtual clock moves forward every step.
+        """
+        self.__query_history = query_history
+        self.__impala_config = copy.deepcopy(impala_config)
+        self.__now = start_time
+        self.__step = timedelta(minutes=step_minutes)
+        self.refreshes = []
+
+    def now(self):
+        return self.__now
+
+    def step(self):
+        """
+        Move the virtual clock forward by step minutes.
+
+        :return: (datetime) The current time after step.
+        """
+        self.__now += self.__step
+        return self.__now
+
+    def get_queries_info(self, section_schedule, start_time, end_time):
+        end_time = min(end_time, self.__now)
+        queries_info = self.__query_history.read(start_time, end_time)
+        if queries_info is None:
+            return None
+        return get_queries_info_at(queries_info, self.__now)
+
+    def get_impala_config(self):
+        return copy.deepcopy(self.__impala_config)
+
+    def update_impala_config(self, impala_config):
+        updated_items = {item[NAME]: item[VALUE] for item in json.loads(impala_config)[ITEMS]}
+        for item in self.__impala_config[ITEMS]:
+            if item[NAME] in updated_items:
+                item[VALUE] = updated_items[item[NAME]]
+
+    def refresh_pools(self):
+        items = {item[NAME]: item[VALUE] for item in self.__impala_config[ITEMS]}
+        self.refreshes.append((self.__now, items.get(IMPALA_SCHEDULED_ALLOCATIONS)))
+        LOGGER.info("pools refreshed at virtual time %s", self.__now)
+
+
+def get_queries_info_at(queries_info, now):
+    """
+    Get the query information as it was seen at the given time. The queries that have not ended are in
+    running state, and their admission wait and duration are cut at the given time.
+
+    :param queries_info: (DataFrame) The query information.
+    :param now: (datetime) The time when the query information is seen.
+    :return: (DataFrame) A DataFrame object of query information.
+    """
+    elapsed_milli_secs = ((pd.Timestamp(now) - queries_info[FormativeQueryInfoColumn.START_TIME])
+                          .dt.total_seconds() * 1000).to_numpy().astype(np.int64)
+    queued_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT]).fillna(0) \
+        .to_numpy().astype(np.int64)
+    duration_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.DURATION_MILLIS]).fillna(0).to_numpy()
+    running = queued_milli_secs + duration_milli_secs > elapsed_milli_secs
+    if not running.any():
+        return queries_info
+
+    queries_info = queries_info.copy()
+    cut_queued_milli_secs = np.minimum(queued_milli_secs, elapsed_milli_secs)
+    queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT] = np.where(running, cut_queued_milli_secs,
+                                                                     queued_milli_secs)
+    queries_info[FormativeQueryInfoColumn.DURATION_MILLIS] = np.where(
+        running, np.minimum(duration_milli_secs, elapsed_milli_secs - cut_queued_milli_secs), duration_milli_secs)
+    queries_info[FormativeQueryInfoColumn.QUERY_STATE] = np.where(
+        running, RUNNING_QUERY_STATE, queries_info[FormativeQueryInfoColumn.QUERY_STATE].to_numpy())
+    return queries_info
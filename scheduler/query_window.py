@@ -0,0 +1,143 @@
+import logging
+import os
+import pandas as pd
+
+from scheduler.constants import FormativeQueryInfoColumn, COMPLETED_QUERY_STATES
+
+WATERMARK_TIME = "watermark_time"
+WATERMARK_QUERY_IDS = "watermark_query_ids"
+QUERIES_INFO = "queries_info"
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryWindow(object):
+    """
+    The QueryWindow class that provides methods for incremental fetching of query information. It keeps a
+    sliding window of recent queries in memory and a high-water mark, which is the last seen start time and
+    the completed query ids at that instant, so only queries newer than the high-water mark need to be fetched.
+
+    Queries that have not completed when fetched are fetched again in the next fetching, until they are
+    completed. The window and the high-water mark are persisted to local file after every update, so
+    they survive the restart of scheduler.
+    """
+
+    def __init__(self, path):
+        """
+        Create a QueryWindow object and load the persisted window if exists.
+
+        :param path: (str) The path of file to persist the window.
+        """
+        self.__path = path
+        self.__queries_info = None
+        self.__watermark_time = None
+        self.__watermark_query_ids = set()
+
+        if os.path.exists(self.__path):
+            try:
+                state = pd.read_pickle(self.__path)
+                self.__queries_info = state[QUERIES_INFO]
+                self.__watermark_time = state[WATERMARK_TIME]
+                self.__watermark_query_ids = set(state[WATERMARK_QUERY_IDS])
+            except Exception as e:
+                LOGGER.warning("fail to load query window from %s, caused by: %s", self.__path, e)
+
+    @property
+    def watermark_time(self):
+        return self.__watermark_time
+
+    @property
+    def size(self):
+        return 0 if self.__queries_info is None else self.__queries_info.shape[0]
+
+    def get_fetch_start_time(self, start_time):
+        """
+        Get the start time of next incremental fetching, which is the high-water mark or the earliest start
+        time of the uncompleted queries in window, but not earlier than start_time.
+
+        :param start_time: (datetime) The start time of the window.
+        :return: (datetime) The start time to fetching query information.
+        """
+        if self.__watermark_time is None or self.size == 0:
+            return start_time
+
+        fetch_start_time = self.__watermark_time
+        uncompleted = ~self.__queries_info[FormativeQueryInfoColumn.QUERY_STATE].isin(COMPLETED_QUERY_STATES)
+        if uncompleted.any():
+            fetch_start_time = min(fetch_start_time,
+                                   self.__queries_info.loc[uncompleted, FormativeQueryInfoColumn.START_TIME].min())
+        return max(start_time, fetch_start_time)
+
+    def update(self, fetched_queries_info):
+        """
+        Add the fetched query information to window and move the high-water mark forward. Queries fetched
+        again replace the old ones.
+
+        :param fetched_queries_info: (DataFrame) The fetched query information.
+        """
+        if fetched_queries_info is None or fetched_queries_info.shape[0] == 0:
+            return
+
+        start_times = fetched_queries_info[FormativeQueryInfoColumn.START_TIME]
+        completed = fetched_queries_info[FormativeQueryInfoColumn.QUERY_STATE].isin(COMPLETED_QUERY_STATES)
+        seen = (start_times == self.__watermark_time) & \
+            fetched_queries_info[FormativeQueryInfoColumn.QUERY_ID].isin(self.__watermark_query_ids)
+        new_queries_info = fetched_queries_info[~seen]
+
+        max_start_time = start_times.max()
+        max_start_query_ids = set(fetched_queries_info.loc[(start_times == max_start_time) & completed,
+                                                           FormativeQueryInfoColumn.QUERY_ID])
+        if self.__watermark_time is None or max_start_time > self.__watermark_time:
+            self.__watermark_time = max_start_time
+            self.__watermark_query_ids = max_start_query_ids
+        elif max_start_time == self.__watermark_time:
+            self.__watermark_query_ids |= max_start_query_ids
+
+        if self.__queries_info is not None:
+            new_queries_info = pd.concat([self.__queries_info, new_queries_info], ignore_index=True)
+        self.__queries_info = new_queries_info.drop_duplicates([FormativeQueryInfoColumn.QUERY_ID], keep="last")
+        LOGGER.info("query window updated, size: %d, watermark: %s", self.size, self.__watermark_time)
+
+    def evict(self, start_time, max_size=None):
+        """
+        Evict the queries that have been ended before start_time, and the earliest started queries if the
+        window is larger than max_size.
+
+        :param start_time: (datetime) The start time of the window.
+        :param max_size: (int) The max number of queries in window, None means no limit.
+        """
+        if self.__queries_info is None:
+            return
+
+        queries_info = self.__queries_info
+        queued_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.ADMISSION_WAIT], errors="coerce")
+        duration_milli_secs = pd.to_numeric(queries_info[FormativeQueryInfoColumn.DURATION_MILLIS], errors="coerce")
+        run_milli_secs = queued_milli_secs.fillna(0) + duration_milli_secs.fillna(0)
+        end_times = queries_info[FormativeQueryInfoColumn.START_TIME] + pd.to_timedelta(run_milli_secs, unit="ms")
+        queries_info = queries_info[end_times >= start_time]
+        if max_size is not None and queries_info.shape[0] > max_size:
+            LOGGER.warning("query window exceeds %d queries, the earliest started queries are evicted.", max_size)
+            queries_info = queries_info.sort_values(FormativeQueryInfoColumn.START_TIME, kind="stable") \
+                .iloc[-max_size:]
+        self.__queries_info = queries_info.reset_index(drop=True)
+
+    def get_queries_info(self, end_time):
+        """
+        Get the query information in window which started before end_time.
+
+        :param end_time: (datetime) The end time of the window.
+        :return: (DataFrame) A DataFrame object of query information in window, None if window is empty.
+        """
+        if self.size == 0:
+            return None
+        queries_info = self.__queries_info[self.__queries_info[FormativeQueryInfoColumn.START_TIME] <= end_time]
+        return queries_info.reset_index(drop=True) if queries_info.shape[0] else None
+
+    def save(self):
+        """
+        Persist the window and the high-water mark to local file.
+        """
+        state = {QUERIES_INFO: self.__queries_info,
+                 WATERMARK_TIME: self.__watermark_time,
+                 WATERMARK_QUERY_IDS: list(self.__watermark_query_ids)}
+        pd.to_pickle(state, self.__path)
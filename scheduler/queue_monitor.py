@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueueMonitor(object):
+    """
+    The QueueMonitor class that provides methods for triggering an out-of-band scheduling cycle when the
+    admission wait of a pool spikes, between the regular scheduling cycles.
+
+    The scheduling cycles, regular or out-of-band, run exclusively. An out-of-band cycle is skipped if a cycle
+    is running, or if the last cycle started less than the minimum spacing ago.
+    """
+
+    def __init__(self, wait_threshold_seconds, min_spacing_minutes):
+        """
+        Create a QueueMonitor object.
+
+        :param wait_threshold_seconds: (float) The total admission wait seconds of a pool in the monitor window,
+            which triggers the scheduling.
+        :param min_spacing_minutes: (float) The minimum minutes between the start of last cycle and an
+            out-of-band cycle.
+        """
+        self.__wait_threshold_seconds = wait_threshold_seconds
+        self.__min_spacing = timedelta(minutes=min_spacing_minutes)
+        self.__lock = threading.Lock()
+        self.__last_cycle_time = None
+
+    def is_due(self, now):
+        """
+        Whether an out-of-band cycle is allowed by the minimum spacing.
+
+        :param now: (datetime) The current time.
+        :return: (bool) True if the last cycle started at least the minimum spacing ago.
+        """
+        return self.__last_cycle_time is None or now - self.__last_cycle_time >= self.__min_spacing
+
+    def get_spiking_pools(self, pools_wait_secs, pool_names):
+        """
+        Get the pools whose admission wait crosses the threshold.
+
+        :param pools_wait_secs: (dict) A dict object mapping pool name to the total admission wait seconds.
+        :param pool_names: (list) The names of pools that participate in the scheduling.
+        :return: (list) The names of spiking pools.
+        """
+        return [pool_name for pool_name in pool_names
+                if pools_wait_secs.get(pool_name, 0) >= self.__wait_threshold_seconds]
+
+    def run_cycle(self, job, args, out_of_band=False, now=None):
+        """
+        Run the scheduling cycle exclusively. The regular cycle waits for the running cycle, while the
+        out-of-band cycle is skipped if a cycle is running or it is not due.
+
+        :param job: (function) The scheduling job.
+        :param args: (list) The arguments of scheduling job.
+        :param out_of_band: (bool) Whether the cycle is triggered by the queue monitor.
+        :param now: (datetime) The current time, by default, datetime.now().
+        :return: (bool) True if the cycle is run.
+        """
+        if not self.__lock.acquire(blocking=not out_of_band):
+            LOGGER.info("skip out-of-band scheduling, because of a running scheduling.")
+            return False
+        try:
+            now = now or datetime.now()
+            if out_of_band and not self.is_due(now):
+                return False
+            self.__last_cycle_time = now
+            job(*args)
+            return True
+        finally:
+            self.__lock.release()
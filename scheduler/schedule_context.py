@@ -0,0 +1,81 @@
+import logging
+
+from scheduler.cloudera_manager import ClouderaManager
+from scheduler.global_utils import get_cloudera_manager_config
+from scheduler.impala_pool_config import ImpalaScheduledAllocations
+
+ROLES_KEY = "roles"
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ScheduleContext(object):
+    """
+    The ScheduleContext class that holds the state shared by the checks, the scheduling and the update of impala
+    configuration in one scheduling cycle: one cloudera manager client, one snapshot of impala configuration and
+    one parsed ImpalaScheduledAllocations, all created on first use, so cloudera manager is called as few times
+    as possible in a cycle.
+    """
+
+    def __init__(self, scheduler_config, cache=None):
+        """
+        Create a ScheduleContext object.
+
+        :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+        :param cache: (TtlCache) The cache of rarely changing data across the cycles, None means no caching.
+        """
+        self.__scheduler_config = scheduler_config
+        self.__cache = cache
+        self.__cloudera_manager = None
+        self.__impala_config = None
+        self.__impala_scheduled_allocations = None
+
+    def get_cloudera_manager(self):
+        """
+        Get the cloudera manager client of cycle.
+
+        :return: (ClouderaManager) The cloudera manager object.
+        """
+        if self.__cloudera_manager is None:
+            self.__cloudera_manager = ClouderaManager(*get_cloudera_manager_config(self.__scheduler_config))
+        return self.__cloudera_manager
+
+    def get_impala_config(self):
+        """
+        Get the snapshot of impala configuration of cycle.
+
+        :return: (dict) A dict object of impala cluster configuration.
+        """
+        if self.__impala_config is None:
+            self.__impala_config = self.get_cloudera_manager().get_impala_config()
+        return self.__impala_config
+
+    def get_impala_scheduled_allocations(self):
+        """
+        Get the parsed impala scheduled allocations of the snapshot of impala configuration.
+
+        :return: (ImpalaScheduledAllocations) The configuration of impala pool.
+        """
+        if self.__impala_scheduled_allocations is None:
+            self.__impala_scheduled_allocations = ImpalaScheduledAllocations(self.get_impala_config())
+        return self.__impala_scheduled_allocations
+
+    def get_roles(self):
+        """
+        Get the whole roles in impala cluster, which are cached if the cache is set.
+
+        :return: (dict) A dict object of the roles.
+        """
+        return self.get_cached(ROLES_KEY, self.get_cloudera_manager().get_roles)
+
+    def get_cached(self, key, loader):
+        """
+        Get the value by key from the cache, the value is loaded every time if the cache is not set.
+
+        :param key: (str) The key of cached entry.
+        :param loader: (function) The function without arguments that loads the value.
+        :return: (object) The cached value.
+        """
+        if self.__cache is None:
+            return loader()
+        return self.__cache.get(key, loader)
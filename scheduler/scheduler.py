@@ -1,12 +1,19 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
+import copy
 import logging
 
-from scheduler.cloudera_manager import ClouderaManager
-from scheduler.constants import ScheduleSectOpts, ReportSectOpts, EmailSectOpts
-from scheduler.global_utils import get_cloudera_manager_config, get_queries_info, create_schedule, send_schedule_report
-from scheduler.base_schedule import get_pools_info
+from scheduler.constants import ScheduleSectOpts, ReportSectOpts, EmailSectOpts, DEFAULT_ENABLE_POOL_DEMAND, \
+    DEFAULT_POOL_DEMAND_RESOLUTION_SECONDS, DEFAULT_ENABLE_HIERARCHICAL_ALLOCATION
+from scheduler.global_utils import create_schedule, send_schedule_report, \
+    create_pool_stat_partials, create_demand_forecast, create_allocation_damper
+from scheduler.base_schedule import get_pools_info, set_pools_demand
+from scheduler.hierarchical_allocation import HierarchicalAllocation
 from scheduler.impala_pool_config import ImpalaScheduledAllocations
 from scheduler.check import check_pools_allocated_mem
+from scheduler.query_source import ClouderaManagerSource, IngestedSource
+from scheduler.schedule_context import ScheduleContext
+from scheduler.metrics import REGISTRY, PHASE_SECONDS, CYCLES, QUERIES_PROCESSED, CYCLE_QUERIES, POOLS_MOVED, \
+    CYCLE_POOLS_MOVED
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,52 +25,178 @@ class Scheduler(object):
     """
 
     @classmethod
-    def execute_schedule(cls, scheduler_config):
+    def execute_schedule(cls, scheduler_config, query_window=None, pool_stat_partials=None, query_source=None,
+                         demand_forecast=None, allocation_damper=None, context=None, query_ingester=None):
         """
         Executes impala pool memory scheduling according the configuration and the statistics
         of fetched query information.
 
         Execution Steps:
-        1. Fetch the query information between end_time and start_time.
-        2. Generate the statistic data of fetched query information.
-        3. Allocate the impala pool memory based on generated statistic data.
-        4. Update the allocated results to impala, actually update to cloudera manager.
+        1. Fetch the query information between end_time and start_time, or read it from the snapshot of
+           query ingester if user has set the configuration item [schedule.enable_query_ingester] to "true".
+        2. Generate the statistic data of fetched query information, and the concurrent memory demand
+           timeline of pools if user has set the configuration item [schedule.enable_pool_demand] to "true".
+        3. Update the demand forecast by the statistic data and forecast the memory demand of pools in the
+           next interval if user has set the configuration item [schedule.enable_demand_forecast] to "true".
+        4. Allocate the impala pool memory based on generated statistic data, with respect to the parent
+           pools if user has set the configuration item [schedule.enable_hierarchical_allocation] to "true",
+           and damp the allocated memory if user has set the configuration item
+           [schedule.enable_allocation_damping] to "true".
+        5. Update the allocated results to impala, actually update to cloudera manager, only if the memory of
+           pools is effectively changed and the impala configuration is not changed during the scheduling.
 
         If user has set the configuration section [email], [report] and the configuration item
         [report.enable_schedule_report] is "true", the email of scheduling report will be send
         to [email.receivers] when schedule does happen.
 
         :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+        :param query_window: (QueryWindow) The window of recent queries for incremental fetching.
+        :param pool_stat_partials: (PoolStatPartials) The cached partial statistics of pools, which replaces
+            the statistics of schedule if set.
+        :param query_source: (QuerySourceInterface) The source of clock, query information and impala
+            configuration. By default, the live cloudera manager is used.
+        :param demand_forecast: (DemandForecast) The demand forecast of pools.
+        :param allocation_damper: (AllocationDamper) The damper of the allocated memory of pools.
+        :param context: (ScheduleContext) The context of scheduling cycle against the live cloudera manager,
+            whose client and impala configuration are shared with the checks. It is ignored if query_source
+            is set.
+        :param query_ingester: (QueryIngester) The background query ingester, whose snapshot of query
+            information is read instead of fetching. It is ignored if query_source is set.
         """
-        cloudera_manager = ClouderaManager(*get_cloudera_manager_config(scheduler_config))
-        impala_config = cloudera_manager.get_impala_config()
-        impala_scheduled_allocations = ImpalaScheduledAllocations(impala_config)
-
-        end_time = datetime.now()
+        if query_source is None:
+            if context is None:
+                context = ScheduleContext(scheduler_config)
+            if query_ingester is None:
+                query_source = ClouderaManagerSource(context.get_cloudera_manager(), query_window)
+            else:
+                query_source = IngestedSource(context.get_cloudera_manager(), query_ingester)
+            impala_scheduled_allocations = context.get_impala_scheduled_allocations()
+        else:
+            impala_scheduled_allocations = ImpalaScheduledAllocations(query_source.get_impala_config())
+
+        end_time = query_source.now()
         section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
         fetch_queries_timedelta_minutes = section_schedule[ScheduleSectOpts.OPT_FETCH_QUERIES_TIMEDELTA_MINUTES]
         start_time = end_time - timedelta(minutes=fetch_queries_timedelta_minutes)
 
         schedule = create_schedule(section_schedule)
-        queries_info = get_queries_info(cloudera_manager, section_schedule, start_time, end_time)
-        pools_statistics = schedule.get_pools_stat(queries_info, start_time, end_time)
-
-        pools_info = get_pools_info(impala_scheduled_allocations, scheduler_config, pools_statistics)
+        with REGISTRY.time(PHASE_SECONDS, phase="fetch"):
+            queries_info = query_source.get_queries_info(section_schedule, start_time, end_time)
+        query_number = 0 if queries_info is None else queries_info.shape[0]
+        REGISTRY.inc(CYCLES)
+        REGISTRY.inc(QUERIES_PROCESSED, query_number)
+        REGISTRY.set(CYCLE_QUERIES, query_number)
+
+        with REGISTRY.time(PHASE_SECONDS, phase="stats"):
+            if pool_stat_partials is None:
+                pools_statistics = schedule.get_pools_stat(queries_info, start_time, end_time)
+            else:
+                pools_statistics = pool_stat_partials.get_pools_stat(queries_info, start_time, end_time)
+            if section_schedule.get(ScheduleSectOpts.OPT_ENABLE_POOL_DEMAND, DEFAULT_ENABLE_POOL_DEMAND):
+                set_pools_demand(pools_statistics, queries_info, start_time, end_time,
+                                 section_schedule.get(ScheduleSectOpts.OPT_POOL_DEMAND_RESOLUTION_SECONDS,
+                                                      DEFAULT_POOL_DEMAND_RESOLUTION_SECONDS))
+
+            pools_info = get_pools_info(impala_scheduled_allocations, scheduler_config, pools_statistics)
+            if demand_forecast is not None:
+                demand_forecast.update(pools_info, end_time)
+                demand_forecast.set_pools_forecast(pools_info, end_time, end_time + timedelta(
+                    minutes=section_schedule[ScheduleSectOpts.OPT_SCHEDULE_INTERVAL_MINUTES]))
+                demand_forecast.save()
         LOGGER.info("pools information: %s", pools_info)
 
-        pools_allocated_mem = schedule.get_pools_allocated_mem(section_schedule, pools_info)
-        LOGGER.info("pools allocate memory: %s", pools_allocated_mem)
-
-        check_pools_allocated_mem(section_schedule, pools_allocated_mem, pools_info)
-
+        with REGISTRY.time(PHASE_SECONDS, phase="allocate"):
+            if section_schedule.get(ScheduleSectOpts.OPT_ENABLE_HIERARCHICAL_ALLOCATION,
+                                    DEFAULT_ENABLE_HIERARCHICAL_ALLOCATION):
+                pools_allocated_mem = HierarchicalAllocation(schedule, section_schedule,
+                                                             impala_scheduled_allocations) \
+                    .get_pools_allocated_mem(pools_info)
+            else:
+                pools_allocated_mem = schedule.get_pools_allocated_mem(section_schedule, pools_info)
+            LOGGER.info("pools allocate memory: %s", pools_allocated_mem)
+            if allocation_damper is not None:
+                pools_allocated_mem = allocation_damper.damp(pools_info, pools_allocated_mem, end_time)
+
+        with REGISTRY.time(PHASE_SECONDS, phase="check"):
+            check_pools_allocated_mem(section_schedule, pools_allocated_mem, pools_info)
+
+        pools_allocated_mem = cls.__apply_pools_allocated_mem(query_source, impala_scheduled_allocations,
+                                                              pools_allocated_mem)
+        if pools_allocated_mem is None:
+            pools_allocated_mem = {}
+        elif allocation_damper is not None:
+            allocation_damper.commit(pools_allocated_mem)
+        REGISTRY.inc(POOLS_MOVED, len(pools_allocated_mem))
+        REGISTRY.set(CYCLE_POOLS_MOVED, len(pools_allocated_mem))
         if not pools_allocated_mem:
             return
 
-        impala_scheduled_allocations.update_pools(pools_allocated_mem)
-        cloudera_manager.update_impala_config(str(impala_scheduled_allocations))
-        cloudera_manager.refresh_pools()
-
         section_report = scheduler_config[ReportSectOpts.SECT_REPORT]
         if section_report[ReportSectOpts.OPT_ENABLE_SCHEDULE_REPORT]:
             section_email = scheduler_config[EmailSectOpts.SECT_EMAIL]
             send_schedule_report(section_email, pools_info, pools_allocated_mem, start_time, end_time)
+
+    @classmethod
+    def __apply_pools_allocated_mem(cls, query_source, impala_scheduled_allocations, pools_allocated_mem):
+        """
+        Apply the allocated memory of pools by the diff against the impala configuration fetched in the
+        scheduling. The update and the refresh of pools are skipped if nothing is effectively changed, and
+        the impala configuration is fetched again and verified before the update, so a concurrent edit in
+        cloudera manager is not overwritten.
+
+        :param query_source: (QuerySourceInterface) The source of impala configuration.
+        :param impala_scheduled_allocations: (ImpalaScheduledAllocations) The impala configuration fetched in
+            the scheduling.
+        :param pools_allocated_mem: (dict) The allocated memory of pools.
+        :return: (dict) A dict object contains the applied memory of the pools whose memory is changed, None if
+            the update is skipped because of a concurrent edit.
+        """
+        pools_mem_diff = impala_scheduled_allocations.get_pools_mem_diff(pools_allocated_mem)
+        if not pools_mem_diff:
+            LOGGER.info("memory of pools is not changed, skip updating impala config.")
+            return {}
+        for pool_name, (current_mem, allocated_mem) in pools_mem_diff.items():
+            LOGGER.info("pool %s memory: %s -> %s (%+g)", pool_name, current_mem, allocated_mem,
+                        allocated_mem - current_mem)
+
+        with REGISTRY.time(PHASE_SECONDS, phase="apply"):
+            live_impala_scheduled_allocations = ImpalaScheduledAllocations(query_source.get_impala_config())
+            if str(live_impala_scheduled_allocations) != str(impala_scheduled_allocations):
+                LOGGER.warning("impala config is changed during the scheduling, skip updating impala config.")
+                return None
+
+            applied_pools_mem = {pool_name: allocated_mem
+                                 for pool_name, (_, allocated_mem) in pools_mem_diff.items()}
+            live_impala_scheduled_allocations.update_pools(applied_pools_mem)
+            query_source.update_impala_config(str(live_impala_scheduled_allocations))
+        with REGISTRY.time(PHASE_SECONDS, phase="refresh"):
+            query_source.refresh_pools()
+        return applied_pools_mem
+
+    @classmethod
+    def replay_schedule(cls, scheduler_config, replay_source, end_time):
+        """
+        Replay the scheduling against the replay source from its virtual time to end_time, the virtual
+        clock moves forward by [schedule.schedule_interval_minutes] minutes after every scheduling. The
+        scheduling report is never sent in replay.
+
+        :param scheduler_config: (dict) The scheduler configuration in ../conf/scheduler.yml.
+        :param replay_source: (ReplaySource) The replay source.
+        :param end_time: (datetime) The end time of replay.
+        :return: (int) The number of replayed scheduling.
+        """
+        scheduler_config = copy.deepcopy(scheduler_config)
+        scheduler_config.setdefault(ReportSectOpts.SECT_REPORT, {})[ReportSectOpts.OPT_ENABLE_SCHEDULE_REPORT] = False
+        section_schedule = scheduler_config[ScheduleSectOpts.SECT_SCHEDULE]
+        pool_stat_partials = create_pool_stat_partials(section_schedule)
+        demand_forecast = create_demand_forecast(section_schedule, path=None)
+        allocation_damper = create_allocation_damper(section_schedule)
+
+        schedule_times = 0
+        while replay_source.now() <= end_time:
+            cls.execute_schedule(scheduler_config, pool_stat_partials=pool_stat_partials, query_source=replay_source,
+                                 demand_forecast=demand_forecast, allocation_damper=allocation_damper)
+            schedule_times += 1
+            replay_source.step()
+        LOGGER.info("replay %d scheduling, pools refreshed %d times", schedule_times, len(replay_source.refreshes))
+        return schedule_times
@@ -8,5 +8,9 @@ SCHEDULER_CONFIG_PATH = "%s/conf/scheduler.yml" % scheduler_home
 LOGGING_CONFIG_PATH = "%s/conf/logging.yml" % scheduler_home
 LOG_FILE_PATH = "%s/logs" % scheduler_home
 PID_FILE_PATH = "%s/logs/.daemon.pid" % scheduler_home
+QUERY_DETAILS_CACHE_PATH = "%s/logs/.query_details_cache.db" % scheduler_home
+QUERY_WINDOW_PATH = "%s/logs/.query_window.pkl" % scheduler_home
+QUERY_HISTORY_PATH = "%s/logs/query_history" % scheduler_home
+DEMAND_FORECAST_PATH = "%s/logs/.demand_forecast.pkl" % scheduler_home
 IMPALA_CONFIG_BACKUP_PATH = "%s/resources/impala_config_backup.json" % scheduler_home
 REPORT_TEMPLATE_PATH = "%s/resources/schedule_report_templet.html" % scheduler_home
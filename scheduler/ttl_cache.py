@@ -0,0 +1,37 @@
+import logging
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TtlCache(object):
+    """
+    The TtlCache class that provides methods for caching the rarely changing data across the scheduling cycles,
+    such as the roles of impala cluster and the results of static checks, every entry expires after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds):
+        """
+        Create a TtlCache object.
+
+        :param ttl_seconds: (float) The seconds that a cached entry is valid.
+        """
+        self.__ttl_seconds = ttl_seconds
+        self.__entries = {}
+
+    def get(self, key, loader):
+        """
+        Get the cached value by key, the value is loaded and cached if it is not cached or expired. The value
+        is not cached if the loader raises an exception.
+
+        :param key: (str) The key of cached entry.
+        :param loader: (function) The function without arguments that loads the value.
+        :return: (object) The cached value.
+        """
+        now = time.time()
+        entry = self.__entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = loader()
+        self.__entries[key] = (now + self.__ttl_seconds, value)
+        return value
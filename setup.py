@@ -30,9 +30,9 @@ setup(
         "Operating System :: OS Independent",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
         "Topic :: Software Development :: Impala :: Python Modules",
     ],
     install_requires=[
@@ -40,8 +40,8 @@ setup(
         "certifi",
         "chardet",
         "idna",
-        "numpy",
-        "pandas",
+        "numpy>=1.22",
+        "pandas>=1.4",
         "python-dateutil",
         "pytz",
         "PyYAML",
@@ -51,7 +51,7 @@ setup(
         "tzlocal",
         "urllib3",
     ],
-    python_requires=">=3",
+    python_requires=">=3.8",
     tests_require=[
 
     ],
@@ -0,0 +1,121 @@
+import unittest
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from scheduler.admission_simulator import simulate_admission, simulate_pool_admission, AdmissionSimulation
+from scheduler.constants import FormativeQueryInfoColumn
+
+TRACE_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+def get_trace_queries_info(rows):
+    start_secs, duration_milli_secs, pools, mem_limits = zip(*rows)
+    return pd.DataFrame({
+        FormativeQueryInfoColumn.QUERY_ID: ["%03d" % i for i in range(len(pools))],
+        FormativeQueryInfoColumn.START_TIME: [TRACE_START_TIME + timedelta(seconds=s) for s in start_secs],
+        FormativeQueryInfoColumn.DURATION_MILLIS: duration_milli_secs,
+        FormativeQueryInfoColumn.POOL: pools,
+        FormativeQueryInfoColumn.QUERY_STATE: "FINISHED",
+        FormativeQueryInfoColumn.MEM_LIMIT: mem_limits,
+        FormativeQueryInfoColumn.MAX_HOST: 1})
+
+
+class TestAdmissionSimulatorMethods(unittest.TestCase):
+
+    def test_simulate_admission(self):
+        queries_info = get_trace_queries_info([
+            [0, 10000, "root.test_pool1", 60],
+            [1, 10000, "root.test_pool1", 60],
+            [2, 10000, "root.test_pool1", 10],
+            [3, 10000, "root.test_pool1", 200],
+            [0, 10000, "root.test_pool2", 200]])
+        simulated_queries_info, pools_stat = simulate_admission(queries_info, {"root.test_pool1": 100})
+
+        self.assertEqual(simulated_queries_info["admission_wait"].tolist(), [0, 9000, 8000, 0, 0])
+        self.assertEqual(simulated_queries_info["query_state"].tolist(),
+                         ["FINISHED", "FINISHED", "FINISHED", "REJECTED", "FINISHED"])
+        self.assertEqual(simulated_queries_info["duration_millis"].tolist(), [10000, 10000, 10000, 0, 10000])
+        pool_stat = pools_stat["root.test_pool1"]
+        self.assertEqual(pool_stat.query_total, 4)
+        self.assertEqual(pool_stat.wait_query_total, 2)
+        self.assertEqual(pool_stat.rejected_query_total, 1)
+        self.assertEqual(pool_stat.wait_secs, 17.0)
+        self.assertEqual(pool_stat.wait_secs_max, 9.0)
+        self.assertEqual(pools_stat["root.test_pool2"].wait_secs, 0)
+
+    def test_simulate_admission_with_queue_timeout(self):
+        queries_info = get_trace_queries_info([
+            [0, 10000, "root.test_pool1", 60],
+            [1, 10000, "root.test_pool1", 60],
+            [2, 10000, "root.test_pool1", 10]])
+        simulated_queries_info, pools_stat = simulate_admission(queries_info, {"root.test_pool1": 100}, 5000)
+
+        self.assertEqual(simulated_queries_info["admission_wait"].tolist(), [0, 5000, 4000])
+        self.assertEqual(simulated_queries_info["query_state"].tolist(), ["FINISHED", "REJECTED", "FINISHED"])
+        self.assertEqual(pools_stat["root.test_pool1"].rejected_query_total, 1)
+
+    def test_simulate_pool_admission_with_shrunk_pool(self):
+        # the pool shrinks to 50 after the second query is queued, which can never be admitted
+        wait_milli_secs, rejected = simulate_pool_admission(
+            np.array([0, 10, 20]), np.array([100, 100, 100]), np.array([60, 60, 30]), 100, None, [(15, 50)])
+        self.assertEqual(wait_milli_secs.tolist(), [0, 5, 80])
+        self.assertEqual(rejected.tolist(), [False, True, False])
+
+    def test_simulate_pool_admission_with_zero_duration(self):
+        # the query without running milliseconds is queued, though the peak of running queries fits the pool
+        wait_milli_secs, rejected = simulate_pool_admission(
+            np.array([0, 10]), np.array([100, 0]), np.array([60, 60]), 100)
+        self.assertEqual(wait_milli_secs.tolist(), [0, 90])
+        self.assertEqual(rejected.tolist(), [False, False])
+
+    def test_admission_simulation_same_as_simulate_admission(self):
+        random = np.random.RandomState(7)
+        query_number = 2000
+        queries_info = get_trace_queries_info(zip(
+            np.sort(random.randint(0, 3600, query_number)).tolist(),
+            (random.randint(0, 12, query_number) * 5000).tolist(),
+            random.choice(["root.test_pool1", "root.test_pool2"], query_number),
+            random.randint(1, 100, query_number).tolist()))
+        pools_mem = {"root.test_pool1": 1000, "root.test_pool2": 500}
+        pools_mem_changes = {pool_name: [] for pool_name in pools_mem}
+        admission_simulation = AdmissionSimulation(queries_info, pools_mem, 60000)
+        for minutes in range(0, 70, 5):
+            cycle_time = TRACE_START_TIME + timedelta(minutes=minutes)
+            admission_simulation.simulate(cycle_time, pools_mem_changes)
+            simulated_queries_info = admission_simulation.get_queries_info(TRACE_START_TIME, cycle_time)
+            expected_queries_info, _ = simulate_admission(queries_info[queries_info["start_time"] <= cycle_time],
+                                                          pools_mem, 60000, pools_mem_changes)
+            self.assertEqual(simulated_queries_info["query_id"].tolist(), expected_queries_info["query_id"].tolist())
+            self.assertEqual(simulated_queries_info["admission_wait"].tolist(),
+                             expected_queries_info["admission_wait"].tolist())
+            self.assertEqual(simulated_queries_info["query_state"].tolist(),
+                             expected_queries_info["query_state"].tolist())
+            for pool_name in pools_mem:
+                pools_mem_changes[pool_name].append((cycle_time, random.randint(100, 1500)))
+
+    def test_simulate_admission_of_one_day(self):
+        random = np.random.RandomState(7)
+        query_number = 100000
+        queries_info = get_trace_queries_info(zip(
+            np.sort(random.randint(0, 86400, query_number)).tolist(),
+            random.randint(1000, 60000, query_number).tolist(),
+            ["root.test_pool1"] * query_number, random.randint(1, 100, query_number).tolist()))
+        begin = time.time()
+        simulated_queries_info, pools_stat = simulate_admission(queries_info, {"root.test_pool1": 1000})
+        self.assertLess(time.time() - begin, 10)
+
+        # a query is admitted after all earlier queries, and the admitted memory never exceeds the pool
+        admit_milli_secs = (simulated_queries_info["start_time"] - TRACE_START_TIME).dt.total_seconds() * 1000 + \
+            simulated_queries_info["admission_wait"]
+        self.assertTrue((np.diff(admit_milli_secs.to_numpy()) >= 0).all())
+        events = sorted([(admit, 1, mem) for admit, mem in zip(admit_milli_secs, queries_info["mem_limit"])] +
+                        [(admit + duration, 0, -mem) for admit, duration, mem in
+                         zip(admit_milli_secs, queries_info["duration_millis"], queries_info["mem_limit"])])
+        self.assertLessEqual(np.cumsum([event[2] for event in events]).max(), 1000)
+        self.assertGreater(pools_stat["root.test_pool1"].wait_query_total, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+from datetime import datetime, timedelta
+
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.allocation_damper import AllocationDamper
+from tests.utils import get_test_pools_info
+
+DAMP_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+def apply_pools_allocated_mem(allocation_damper, pools_info, pools_allocated_mem):
+    for pool_name, allocated_mem in pools_allocated_mem.items():
+        pools_info[pool_name].current_mem = allocated_mem
+    allocation_damper.commit(pools_allocated_mem)
+
+
+class TestAllocationDamperMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.pools_info = get_test_pools_info({})
+
+    def test_damp_nothing(self):
+        allocation_damper = AllocationDamper(10)
+        pools_allocated_mem = {"root.test_pool1": 1100, "root.test_pool2": 900}
+
+        self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME), pools_allocated_mem)
+
+    def test_damp_min_change(self):
+        allocation_damper = AllocationDamper(10, min_change_mem=50)
+        pools_allocated_mem = {"root.test_pool1": 1100, "root.test_pool2": 970, "root.test_pool3": 930}
+
+        # the change of root.test_pool2 is suppressed, root.test_pool1 gets less to conserve total memory
+        self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME),
+                         {"root.test_pool1": 1070, "root.test_pool3": 930})
+
+    def test_damp_ema(self):
+        allocation_damper = AllocationDamper(10, ema_alpha=0.5)
+        pools_allocated_mem = {"root.test_pool1": 1400, "root.test_pool2": 600}
+
+        damped_pools_allocated_mem = allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME)
+        self.assertEqual(damped_pools_allocated_mem, {"root.test_pool1": 1200, "root.test_pool2": 800})
+        apply_pools_allocated_mem(allocation_damper, self.pools_info, damped_pools_allocated_mem)
+        self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME + timedelta(hours=1)),
+                         {"root.test_pool1": 1300, "root.test_pool2": 700})
+
+    def test_damp_oscillation(self):
+        allocation_damper = AllocationDamper(10, oscillation_minutes=120)
+        pools_allocated_mem = {"root.test_pool1": 1100, "root.test_pool2": 900}
+        reversed_pools_allocated_mem = {"root.test_pool1": 1000, "root.test_pool2": 1000}
+
+        apply_pools_allocated_mem(allocation_damper, self.pools_info,
+                                  allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME))
+        for minutes in [30, 60, 90]:
+            time = DAMP_TIME + timedelta(minutes=minutes)
+            self.assertEqual(allocation_damper.damp(self.pools_info, reversed_pools_allocated_mem, time), {})
+            self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem, time), {})
+        self.assertEqual(allocation_damper.damp(self.pools_info, reversed_pools_allocated_mem,
+                                                DAMP_TIME + timedelta(minutes=120)), reversed_pools_allocated_mem)
+        self.assertEqual(allocation_damper.saved_pushes, 3)
+        self.assertEqual(allocation_damper.planned_pushes, 5)
+
+    def test_damp_cooldown(self):
+        allocation_damper = AllocationDamper(10, cooldown_minutes=60)
+
+        apply_pools_allocated_mem(allocation_damper, self.pools_info, allocation_damper.damp(
+            self.pools_info, {"root.test_pool1": 1100, "root.test_pool2": 900}, DAMP_TIME))
+        # root.test_pool1 is in cooldown, so root.test_pool3 has nobody to give its memory to
+        self.assertEqual(allocation_damper.damp(self.pools_info, {"root.test_pool1": 1200, "root.test_pool3": 900},
+                                                DAMP_TIME + timedelta(minutes=30)), {})
+        self.assertEqual(allocation_damper.damp(self.pools_info, {"root.test_pool1": 1200, "root.test_pool3": 900},
+                                                DAMP_TIME + timedelta(minutes=60)),
+                         {"root.test_pool1": 1200, "root.test_pool3": 900})
+
+    def test_uncommitted_damp(self):
+        allocation_damper = AllocationDamper(10, cooldown_minutes=60, ema_alpha=0.5)
+        pools_allocated_mem = {"root.test_pool1": 1400, "root.test_pool2": 600}
+
+        # the damped memory is not applied, so neither the cooldown nor the moving average moves
+        self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem, DAMP_TIME),
+                         {"root.test_pool1": 1200, "root.test_pool2": 800})
+        self.assertEqual(allocation_damper.damp(self.pools_info, pools_allocated_mem,
+                                                DAMP_TIME + timedelta(minutes=30)),
+                         {"root.test_pool1": 1200, "root.test_pool2": 800})
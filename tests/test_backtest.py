@@ -0,0 +1,56 @@
+import unittest
+import os
+import json
+import pandas as pd
+from datetime import datetime, timedelta
+
+from scheduler.constants import SCHEDULER_HOME, FormativeQueryInfoColumn
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.backtest import backtest_strategy, backtest_strategies, STATIC_STRATEGY
+from tests.utils import get_scheduler_config
+
+BACKTEST_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+PRIORITY_STRATEGY = "scheduler.priority_schedule.PrioritySchedule"
+
+
+def get_trace_queries_info():
+    # root.test_pool1 is crowded with a query every 30 seconds, root.test_pool2 is idle with one query
+    return pd.DataFrame({
+        FormativeQueryInfoColumn.START_TIME: [BACKTEST_START_TIME + timedelta(seconds=30 * i) for i in range(240)] +
+                                             [BACKTEST_START_TIME],
+        FormativeQueryInfoColumn.DURATION_MILLIS: [120000] * 240 + [60000],
+        FormativeQueryInfoColumn.POOL: ["root.test_pool1"] * 240 + ["root.test_pool2"],
+        FormativeQueryInfoColumn.QUERY_STATE: "FINISHED",
+        FormativeQueryInfoColumn.MEM_LIMIT: [200] * 240 + [100],
+        FormativeQueryInfoColumn.MAX_HOST: 3})
+
+
+class TestBacktestMethods(unittest.TestCase):
+
+    def setUp(self):
+        with open("./resources/impala_config_test.json", "r") as f:
+            self.impala_config = json.load(f)
+        self.scheduler_config = get_scheduler_config()
+        self.queries_info = get_trace_queries_info()
+
+    def test_backtest_strategy(self):
+        end_time = BACKTEST_START_TIME + timedelta(hours=2)
+        static_result = backtest_strategy(self.scheduler_config, STATIC_STRATEGY, self.queries_info,
+                                          self.impala_config, BACKTEST_START_TIME, end_time)
+        priority_result = backtest_strategy(self.scheduler_config, PRIORITY_STRATEGY, self.queries_info,
+                                            self.impala_config, BACKTEST_START_TIME, end_time)
+
+        self.assertEqual(static_result["query_total"], 241)
+        self.assertEqual(static_result["pushes"], 0)
+        self.assertGreater(priority_result["pushes"], 0)
+        self.assertLess(priority_result["wait_secs"], static_result["wait_secs"])
+        self.assertGreater(static_result["mem_utilization"], 0)
+
+    def test_backtest_strategies(self):
+        comparison = backtest_strategies(self.scheduler_config, [STATIC_STRATEGY, PRIORITY_STRATEGY],
+                                         self.queries_info, self.impala_config, BACKTEST_START_TIME,
+                                         BACKTEST_START_TIME + timedelta(hours=1), max_workers=2)
+
+        self.assertEqual(comparison["strategy"].tolist(), [STATIC_STRATEGY, PRIORITY_STRATEGY])
+        self.assertEqual(comparison.shape[1], 8)
@@ -1,7 +1,58 @@
 import unittest
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from scheduler.base_schedule import PoolStat, AbstractSchedule
+from scheduler.base_schedule import PoolStat, AbstractSchedule, calculate_pools_demand
+from scheduler.constants import FormativeQueryInfoColumn
+
+
+def get_union_milli_secs(intervals):
+    union_milli_secs, cursor = 0, 0
+    for start, end in sorted(intervals):
+        if end > max(start, cursor):
+            union_milli_secs += end - max(start, cursor)
+            cursor = end
+    return union_milli_secs
+
+
+def get_pools_stat_by_rows(queries_info, start_time, end_time):
+    stat_start_milli_sec = int(time.mktime(start_time.timetuple()) * 1000)
+    stat_end_milli_sec = int(time.mktime(end_time.timetuple()) * 1000)
+    pools_stat = {}
+    for pool_name, pool_group in queries_info.groupby(FormativeQueryInfoColumn.POOL):
+        query_total, wait_query_total, wait_mem_total, used_mem_total = 0, 0, 0, 0
+        wait_intervals, run_intervals = [], []
+        for _, row in pool_group.iterrows():
+            start_milli_sec = int(time.mktime(row[FormativeQueryInfoColumn.START_TIME].timetuple()) * 1000)
+            queued_milli_secs = int(row[FormativeQueryInfoColumn.ADMISSION_WAIT])
+            used_mem = row[FormativeQueryInfoColumn.MEM_LIMIT] * row[FormativeQueryInfoColumn.MAX_HOST]
+            end_milli_sec = start_milli_sec + row[FormativeQueryInfoColumn.DURATION_MILLIS] + queued_milli_secs
+            # only the queries queued or running in the window are counted
+            if start_milli_sec >= stat_end_milli_sec or (start_milli_sec < stat_start_milli_sec and max(
+                    end_milli_sec, start_milli_sec + queued_milli_secs) <= stat_start_milli_sec):
+                continue
+            query_total += 1
+            wait_query_total += 1 if queued_milli_secs > 0 else 0
+
+            wait_start = max(start_milli_sec, stat_start_milli_sec)
+            wait_end = min(start_milli_sec + queued_milli_secs, stat_end_milli_sec)
+            if wait_end > wait_start:
+                wait_mem_total += used_mem * (wait_end - wait_start)
+                wait_intervals.append((wait_start, wait_end))
+
+            run_start = max(start_milli_sec + queued_milli_secs, stat_start_milli_sec)
+            run_end = min(end_milli_sec, stat_end_milli_sec)
+            if run_end > run_start:
+                used_mem_total += used_mem * (run_end - run_start)
+                run_intervals.append((run_start, run_end))
+
+        wait_milli_secs, run_milli_secs = get_union_milli_secs(wait_intervals), get_union_milli_secs(run_intervals)
+        pools_stat[pool_name] = PoolStat(
+            pool_name, query_total, wait_query_total, run_milli_secs / 1000, wait_milli_secs / 1000,
+            int(0 if run_milli_secs == 0 else used_mem_total / run_milli_secs),
+            int(0 if wait_milli_secs == 0 else wait_mem_total / wait_milli_secs))
+    return pools_stat
 
 
 class TestAbstractScheduleMethods(unittest.TestCase):
@@ -23,6 +74,81 @@ class TestAbstractScheduleMethods(unittest.TestCase):
         self.assertEqual(pool_stat.used_mem_avg, 23333)
         self.assertEqual(pool_stat.wait_mem_avg, 17500)
 
+    def test_get_pools_stat_of_nested_queries(self):
+        """
+        test the run seconds are the union of running intervals, the second query starts later but runs
+        within the wait of the first one
+        """
+        stat_start = datetime(2018, 2, 24, 11, 0, 0)
+        df = pd.DataFrame({
+            FormativeQueryInfoColumn.QUERY_ID: ["query_1", "query_2"],
+            FormativeQueryInfoColumn.START_TIME: [stat_start + timedelta(seconds=1), stat_start + timedelta(seconds=2)],
+            FormativeQueryInfoColumn.DURATION_MILLIS: [10000, 1000],
+            FormativeQueryInfoColumn.POOL: ["root.a", "root.a"],
+            FormativeQueryInfoColumn.ADMISSION_WAIT: ["5000", "0"],
+            FormativeQueryInfoColumn.MEM_LIMIT: [10, 10],
+            FormativeQueryInfoColumn.MAX_HOST: [1, 1]})
+        pools_stat = self.abstract_schedule.get_pools_stat(df, stat_start, stat_start + timedelta(minutes=10))
+
+        self.assertEqual(vars(pools_stat["root.a"]), vars(PoolStat("root.a", 2, 1, 11.0, 5.0, 10, 10)))
+        self.assertEqual(vars(get_pools_stat_by_rows(df, stat_start, stat_start + timedelta(minutes=10))["root.a"]),
+                         vars(PoolStat("root.a", 2, 1, 11.0, 5.0, 10, 10)))
+
+    def test_get_pools_stat_same_as_rows(self):
+        stat_start = datetime(2018, 2, 24, 11, 0, 0)
+        stat_end = stat_start + timedelta(minutes=10)
+        random = np.random.RandomState(7)
+        query_number = 2000
+        df = pd.DataFrame({
+            FormativeQueryInfoColumn.QUERY_ID: ["query_%d" % i for i in range(query_number)],
+            FormativeQueryInfoColumn.START_TIME: [stat_start + timedelta(milliseconds=int(ms)) for ms in
+                                                  random.randint(-120000, 660000, query_number)],
+            FormativeQueryInfoColumn.DURATION_MILLIS: random.randint(0, 60000, query_number),
+            FormativeQueryInfoColumn.POOL: random.choice(["root.a", "root.b", "root.c"], query_number),
+            FormativeQueryInfoColumn.ADMISSION_WAIT:
+                (random.randint(0, 20000, query_number) * random.randint(0, 2, query_number)).astype(str),
+            FormativeQueryInfoColumn.MEM_LIMIT: random.randint(0, 4096, query_number),
+            FormativeQueryInfoColumn.MAX_HOST: random.randint(0, 10, query_number)})
+
+        pools_stat = self.abstract_schedule.get_pools_stat(df, stat_start, stat_end)
+        expected_pools_stat = get_pools_stat_by_rows(df, stat_start, stat_end)
+        self.assertEqual(list(pools_stat.keys()), list(expected_pools_stat.keys()))
+        for pool_name, expected_pool_stat in expected_pools_stat.items():
+            self.assertEqual(vars(pools_stat[pool_name]), vars(expected_pool_stat))
+
+    def test_calculate_pools_demand(self):
+        stat_start = datetime(2018, 2, 24, 11, 0, 0)
+        start_milli_sec = int(time.mktime(stat_start.timetuple()) * 1000)
+        end_milli_sec = start_milli_sec + 600000
+        random = np.random.RandomState(11)
+        query_number = 300
+        df = pd.DataFrame({
+            FormativeQueryInfoColumn.START_TIME: [stat_start + timedelta(seconds=int(s)) for s in
+                                                  random.randint(-60, 600, query_number)],
+            FormativeQueryInfoColumn.DURATION_MILLIS: random.randint(0, 60, query_number) * 1000,
+            FormativeQueryInfoColumn.POOL: random.choice(["root.a", "root.b"], query_number),
+            FormativeQueryInfoColumn.ADMISSION_WAIT: (random.randint(0, 20, query_number) * 1000).astype(str),
+            FormativeQueryInfoColumn.MEM_LIMIT: random.randint(1, 4096, query_number),
+            FormativeQueryInfoColumn.MAX_HOST: random.randint(1, 10, query_number)})
+        pools_demand = calculate_pools_demand(df, start_milli_sec, end_milli_sec, 1000)
+
+        starts = np.array([int(time.mktime(t.timetuple()) * 1000) for t in df[FormativeQueryInfoColumn.START_TIME]])
+        queued = df[FormativeQueryInfoColumn.ADMISSION_WAIT].astype(int).to_numpy()
+        ends = starts + queued + df[FormativeQueryInfoColumn.DURATION_MILLIS].to_numpy()
+        mems = (df[FormativeQueryInfoColumn.MEM_LIMIT] * df[FormativeQueryInfoColumn.MAX_HOST]).to_numpy()
+        for pool_name, pool_demand in pools_demand.items():
+            in_pool = (df[FormativeQueryInfoColumn.POOL] == pool_name).to_numpy()
+            used_mems = [mems[in_pool & (starts + queued <= t) & (t < ends)].sum()
+                         for t in pool_demand.sample_milli_secs]
+            wait_mems = [mems[in_pool & (starts <= t) & (t < starts + queued)].sum()
+                         for t in pool_demand.sample_milli_secs]
+            self.assertEqual(pool_demand.used_mems.tolist(), used_mems)
+            self.assertEqual(pool_demand.wait_mems.tolist(), wait_mems)
+            # every interval starts at a whole second, so the peak is sampled
+            self.assertEqual(pool_demand.used_mem_peak, max(used_mems))
+            self.assertEqual(pool_demand.wait_mem_peak, max(wait_mems))
+            self.assertEqual(pool_demand.used_mem_p95, int(np.percentile(used_mems, 95, method="higher")))
+
 
 if __name__ == "__main__":
     unittest.main()
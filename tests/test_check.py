@@ -0,0 +1,56 @@
+import unittest
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.check import check_schedule_options
+from tests.utils import get_scheduler_config
+
+
+class TestCheckMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler_config = get_scheduler_config()
+        self.section_schedule = self.scheduler_config["schedule"]
+
+    def assert_options_allowed(self, option, allowed_values, not_allowed_values):
+        for value in allowed_values:
+            self.section_schedule[option] = value
+            check_schedule_options(self.scheduler_config)
+        for value in not_allowed_values:
+            self.section_schedule[option] = value
+            with self.assertRaises(ValueError, msg="%s: %s" % (option, value)):
+                check_schedule_options(self.scheduler_config)
+        del self.section_schedule[option]
+
+    def test_check_demand_forecast_options(self):
+        for option in ["demand_forecast_alpha", "demand_forecast_trend_alpha"]:
+            self.assert_options_allowed(option, [0.3, 1], [0, -0.1, 1.1, "0.3", True])
+
+    def test_check_damping_options(self):
+        self.assert_options_allowed("damping_ema_alpha", [0.5, 1], [0, 1.5])
+        self.assert_options_allowed("damping_min_change_ratio", [0, 0.05, 1], [-0.05, 1.5, None])
+        for option in ["damping_min_change_mem", "damping_cooldown_minutes", "damping_oscillation_minutes"]:
+            self.assert_options_allowed(option, [0, 60, 0.5], [-1, "60"])
+
+    def test_check_queue_monitor_options(self):
+        for option in ["queue_monitor_interval_seconds", "queue_monitor_window_minutes"]:
+            self.assert_options_allowed(option, [60, 0.5], [0, -60, "60"])
+        for option in ["queue_monitor_wait_threshold_seconds", "queue_monitor_min_spacing_minutes"]:
+            self.assert_options_allowed(option, [0, 300], [-1, "300"])
+
+    def test_check_query_ingester_options(self):
+        self.assert_options_allowed("query_ingest_interval_seconds", [60, 0.5], [0, -60, "60"])
+        self.assert_options_allowed("query_ingest_window_max_size", [1000000], [0, 1.5])
+
+    def test_check_metrics_port(self):
+        self.assert_options_allowed("metrics_port", [9108, 65535], [0, 65536, "9108"])
+
+    def test_check_profile_options(self):
+        for option in ["profile_every_n_cycles", "profile_retention_count", "profile_top_allocations"]:
+            self.assert_options_allowed(option, [1, 10], [0, -1, 1.5, "10"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+import tempfile
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.cloudera_manager import ClouderaManager
+from scheduler.constants import FormativeQueryInfoColumn
+from scheduler.query_details_cache import QueryDetailsCache
+
+QUERY_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+def get_test_queries(query_number):
+    return [{"queryId": "query_%03d" % i,
+             "startTime": (QUERY_START_TIME + timedelta(seconds=i) - timedelta(hours=8))
+                 .strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+             "durationMillis": 1000,
+             "queryState": "FINISHED",
+             "attributes": {"pool": "root.test_pool1", "admission_wait": "0"}}
+            for i in range(query_number)]
+
+
+def get_test_query_details(query_id):
+    if query_id == "query_003":
+        raise IOError("error status_code: 500")
+    index = int(query_id.split("_")[1])
+    return {"details": "MEM_LIMIT=%d hosts=%d hosts=1" % ((index + 1) * 1024 * 1024, index + 2)}
+
+
+def get_test_impala_queries(queries):
+    def get_impala_queries(start_time, end_time, filter_str, page_size):
+        page = [query for query in queries
+                if start_time <= QUERY_START_TIME + timedelta(seconds=int(query["queryId"][-3:])) <= end_time]
+        return {"queries": sorted(page, key=lambda query: query["startTime"], reverse=True)[:page_size]}
+    return get_impala_queries
+
+
+class TestClouderaManagerMethods(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("scheduler.cloudera_manager.ImpalaApiResource")
+        self.api = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.api.get_query_details.side_effect = get_test_query_details
+        self.cloudera_manager = ClouderaManager("server_url", "v17", "cluster", "username", "password")
+
+    def test_fetch_page_impala_query_info_concurrently(self):
+        self.api.get_impala_queries.return_value = {"queries": get_test_queries(20)}
+        serial_data = self.cloudera_manager.fetch_page_impala_query_info(
+            QUERY_START_TIME, QUERY_START_TIME + timedelta(minutes=5), details_concurrency=1)
+        concurrent_data = self.cloudera_manager.fetch_page_impala_query_info(
+            QUERY_START_TIME, QUERY_START_TIME + timedelta(minutes=5), details_concurrency=8)
+
+        self.assertTrue(serial_data.equals(concurrent_data))
+        self.assertEqual(concurrent_data[FormativeQueryInfoColumn.MEM_LIMIT].tolist()[:3], [1, 2, 3])
+        self.assertEqual(concurrent_data[FormativeQueryInfoColumn.MAX_HOST].tolist()[:3], [2, 3, 4])
+        self.assertEqual(concurrent_data.loc[3, FormativeQueryInfoColumn.MEM_LIMIT], 0)
+        self.assertEqual(concurrent_data.loc[3, FormativeQueryInfoColumn.MAX_HOST], 0)
+
+    def test_fetch_impala_query_info(self):
+        queries = get_test_queries(5)
+        self.api.get_impala_queries.side_effect = \
+            lambda start_time, end_time, filter_str, page_size: \
+            {"queries": queries if end_time > QUERY_START_TIME else []}
+        data = self.cloudera_manager.fetch_impala_query_info(
+            QUERY_START_TIME - timedelta(minutes=5), QUERY_START_TIME + timedelta(minutes=5), "", 4)
+
+        self.assertEqual(data.shape[0], 5)
+        self.assertEqual(data[FormativeQueryInfoColumn.QUERY_ID].tolist(), [q["queryId"] for q in queries])
+
+    def test_fetch_impala_query_info_by_pages(self):
+        queries = get_test_queries(10)
+        pages = [queries[6:][::-1], queries[2:7][::-1], queries[:3][::-1], []]
+        self.api.get_impala_queries.side_effect = \
+            lambda start_time, end_time, filter_str, page_size: {"queries": pages.pop(0)}
+        data = self.cloudera_manager.fetch_impala_query_info(
+            QUERY_START_TIME - timedelta(minutes=5), QUERY_START_TIME + timedelta(minutes=5), "", 4, page_size=4)
+
+        self.assertEqual(data[FormativeQueryInfoColumn.QUERY_ID].tolist(),
+                         [q["queryId"] for q in queries[::-1]])
+        self.assertEqual(self.api.get_query_details.call_count, 10)
+        self.assertEqual(self.api.get_impala_queries.call_count, 4)
+        self.assertEqual(self.api.get_impala_queries.call_args_list[1][0][1],
+                         QUERY_START_TIME + timedelta(seconds=6) - timedelta(milliseconds=1))
+
+    def test_fetch_impala_query_info_by_slices(self):
+        self.api.get_impala_queries.side_effect = get_test_impala_queries(get_test_queries(200))
+        start_time, end_time = QUERY_START_TIME - timedelta(minutes=1), QUERY_START_TIME + timedelta(minutes=5)
+        serial_data = self.cloudera_manager.fetch_impala_query_info(start_time, end_time, "", page_size=7)
+        sliced_data = self.cloudera_manager.fetch_impala_query_info(start_time, end_time, "", page_size=7, slices=4)
+
+        self.assertEqual(serial_data.shape[0], 200)
+        self.assertTrue(serial_data.equals(sliced_data))
+
+    def test_fetch_page_impala_query_info_with_details_cache(self):
+        self.api.get_impala_queries.return_value = {"queries": get_test_queries(5)}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            details_cache = QueryDetailsCache(os.path.join(temp_dir, "cache.db"), 24, 100)
+            data = self.cloudera_manager.fetch_page_impala_query_info(
+                QUERY_START_TIME, QUERY_START_TIME + timedelta(minutes=5), details_cache=details_cache)
+            self.assertEqual(self.api.get_query_details.call_count, 5)
+
+            cached_data = self.cloudera_manager.fetch_page_impala_query_info(
+                QUERY_START_TIME, QUERY_START_TIME + timedelta(minutes=5), details_cache=details_cache)
+            details_cache.close()
+
+        # the failed query_003 is not cached, so it is fetched again
+        self.assertEqual(self.api.get_query_details.call_count, 6)
+        self.assertTrue(data.equals(cached_data))
+
+    def test_get_pools_admission_wait_secs(self):
+        queries = get_test_queries(4)
+        queries[1]["attributes"] = {"pool": "root.test_pool1", "admission_wait": "1500"}
+        queries[2]["attributes"] = {"pool": "root.test_pool2", "admission_wait": "2000"}
+        queries[3]["attributes"] = {"pool": "root.test_pool1", "admission_wait": "500"}
+        self.api.get_impala_queries.return_value = {"queries": queries}
+
+        self.assertEqual(self.cloudera_manager.get_pools_admission_wait_secs(
+            QUERY_START_TIME, QUERY_START_TIME + timedelta(minutes=5)),
+            {"root.test_pool1": 2.0, "root.test_pool2": 2.0})
+        self.assertEqual(self.api.get_query_details.call_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
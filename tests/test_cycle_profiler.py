@@ -0,0 +1,100 @@
+import unittest
+import pstats
+import shutil
+import tempfile
+import tracemalloc
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.cycle_profiler import CycleProfiler, PROFILE_FILE_PREFIX, MEMORY_FILE_PREFIX
+from scheduler.global_utils import create_cycle_profiler
+
+
+def scheduling_job(cycles, size=1000):
+    cycles.append(bytearray(size))
+    return len(cycles)
+
+
+class TestCycleProfilerMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def get_files(self, file_name_prefix):
+        return sorted(file for file in os.listdir(self.path) if file.startswith(file_name_prefix))
+
+    def test_sample_every_n_cycles(self):
+        cycle_profiler = CycleProfiler(self.path, every_n_cycles=3, retention_count=10, top_allocations=5,
+                                       trace_between_cycles=True)
+        self.addCleanup(cycle_profiler.close)
+        job = cycle_profiler.wrap(scheduling_job)
+        cycles = []
+        self.assertEqual([job(cycles) for _ in range(7)], [1, 2, 3, 4, 5, 6, 7])
+        # the 1st, 4th and 7th cycles are sampled
+        profile_files = self.get_files(PROFILE_FILE_PREFIX)
+        self.assertEqual([file[-11:] for file in profile_files], ["000001.prof", "000004.prof", "000007.prof"])
+        self.assertIn("scheduling_job", str(pstats.Stats(os.path.join(self.path, profile_files[0])).stats))
+
+        memory_files = self.get_files(MEMORY_FILE_PREFIX)
+        self.assertEqual(len(memory_files), 3)
+        with open(os.path.join(self.path, memory_files[0])) as f:
+            self.assertNotIn("since the last sampled cycle", f.read())
+        with open(os.path.join(self.path, memory_files[-1])) as f:
+            content = f.read()
+        self.assertIn("within the cycle", content)
+        self.assertIn("since the last sampled cycle", content)
+        self.assertTrue(tracemalloc.is_tracing())
+        cycle_profiler.close()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_stop_tracing_after_sampled_cycle(self):
+        cycle_profiler = CycleProfiler(self.path, every_n_cycles=2)
+        self.addCleanup(cycle_profiler.close)
+        job = cycle_profiler.wrap(scheduling_job)
+        cycles = []
+        for _ in range(3):
+            job(cycles)
+            self.assertFalse(tracemalloc.is_tracing())
+        memory_files = self.get_files(MEMORY_FILE_PREFIX)
+        self.assertEqual(len(memory_files), 2)
+        with open(os.path.join(self.path, memory_files[-1])) as f:
+            content = f.read()
+        self.assertIn("within the cycle", content)
+        self.assertNotIn("since the last sampled cycle", content)
+
+    def test_retention(self):
+        cycle_profiler = CycleProfiler(self.path, every_n_cycles=1, retention_count=2)
+        self.addCleanup(cycle_profiler.close)
+        with open(os.path.join(self.path, "data-20180224"), "w"):
+            pass
+        for _ in range(12):
+            cycle_profiler.run(scheduling_job, [])
+        self.assertEqual([file[-11:] for file in self.get_files(PROFILE_FILE_PREFIX)], ["000011.prof", "000012.prof"])
+        self.assertEqual(len(self.get_files(MEMORY_FILE_PREFIX)), 2)
+        self.assertEqual(self.get_files("data-"), ["data-20180224"])
+
+    def test_raise_exception(self):
+        cycle_profiler = CycleProfiler(self.path)
+        self.addCleanup(cycle_profiler.close)
+
+        def failed_job():
+            raise ValueError("schedule failed")
+        with self.assertRaises(ValueError):
+            cycle_profiler.run(failed_job)
+        self.assertEqual(len(self.get_files(PROFILE_FILE_PREFIX)), 1)
+
+    def test_every_n_cycles_not_allowed(self):
+        with self.assertRaises(ValueError):
+            CycleProfiler(self.path, every_n_cycles=0)
+
+    def test_create_cycle_profiler(self):
+        self.assertIsNone(create_cycle_profiler({}))
+        self.assertIsNotNone(create_cycle_profiler({"enable_cycle_profiling": True}, path=self.path))
+        self.assertIsNotNone(create_cycle_profiler({}, enabled=True, path=self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.demand_forecast import DemandForecast, get_hour_of_week
+from scheduler.base_schedule import PoolStat
+from scheduler.priority_schedule import PrioritySchedule
+from tests.utils import get_test_pools_info, get_test_pools_allocated_mem
+
+MONDAY = datetime(2018, 2, 19, 0, 0, 0)
+
+
+def get_rush_pools_info(time):
+    """
+    the pool(root.test_pool1) uses 1500MB in the morning rush between 9:00 and 10:00, 100MB otherwise
+    """
+    used_mem = 1500 if time.hour == 9 else 100
+    return get_test_pools_info({"root.test_pool1": PoolStat("", 10, 0, 10, 0, used_mem, 0)})
+
+
+class TestDemandForecastMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, ".demand_forecast.pkl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def observe_week(self, demand_forecast):
+        for half_hours in range(7 * 48):
+            time = MONDAY + timedelta(minutes=30 * half_hours)
+            demand_forecast.update(get_rush_pools_info(time), time)
+
+    def test_get_hour_of_week(self):
+        self.assertEqual(get_hour_of_week(MONDAY), 0)
+        self.assertEqual(get_hour_of_week(MONDAY + timedelta(days=6, hours=23, minutes=59)), 167)
+
+    def test_forecast_morning_rush(self):
+        demand_forecast = DemandForecast(self.path, 0.3, 0.1)
+        self.assertIsNone(demand_forecast.get_forecast_mem("root.test_pool1", MONDAY, MONDAY))
+        self.observe_week(demand_forecast)
+
+        time = MONDAY + timedelta(days=7, hours=8, minutes=30)
+        demand_forecast.update(get_rush_pools_info(time), time)
+        pools_info = get_rush_pools_info(time)
+        demand_forecast.set_pools_forecast(pools_info, time, time + timedelta(minutes=30))
+
+        self.assertAlmostEqual(pools_info["root.test_pool1"].pool_stat.forecast_mem, 1500, delta=50)
+        self.assertAlmostEqual(pools_info["root.test_pool2"].pool_stat.forecast_mem, 0)
+        self.assertAlmostEqual(demand_forecast.get_forecast_mem("root.test_pool1", time, time), 100, delta=50)
+
+    def test_forecast_trend(self):
+        demand_forecast = DemandForecast(None, 0.5, 0.5)
+        for minutes in range(10):
+            time = MONDAY + timedelta(minutes=minutes)
+            pools_info = get_test_pools_info({"root.test_pool1": PoolStat("", 10, 0, 10, 0, 100 * minutes, 0)})
+            demand_forecast.update(pools_info, time)
+        # the profile of the same hour is unknown for the next hour, so the rising short term is forecast
+        forecast_mem = demand_forecast.get_forecast_mem("root.test_pool1", time, time + timedelta(hours=1))
+        self.assertGreater(forecast_mem, 900)
+
+    def test_save_and_load(self):
+        demand_forecast = DemandForecast(self.path, 0.3, 0.1)
+        self.observe_week(demand_forecast)
+        demand_forecast.save()
+
+        time = MONDAY + timedelta(days=7, hours=8)
+        self.assertEqual(DemandForecast(self.path, 0.3, 0.1).get_forecast_mem("root.test_pool1", time, time),
+                         demand_forecast.get_forecast_mem("root.test_pool1", time, time))
+
+    def test_priority_schedule_ahead(self):
+        """
+        test the pool(root.test_pool1) takes memory before its forecast rush
+        """
+        pools_stat = {"root.test_pool1": PoolStat("", 10, 0, 10, 0, 100, 0, forecast_mem=1500),
+                      "root.test_pool2": PoolStat("", 10, 0, 10, 0, 100, 0, forecast_mem=100)}
+        pools_allocated_mem = get_test_pools_allocated_mem(PrioritySchedule, pools_stat)
+
+        self.assertEqual(pools_allocated_mem["root.test_pool1"], 1500)
@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.fair_schedule import FairSchedule, water_fill
+from scheduler.base_schedule import PoolStat, PoolInfo
+from tests.utils import get_test_pools_allocated_mem
+
+
+class TestFairScheduleMethods(unittest.TestCase):
+
+    def test_water_fill(self):
+        weights = np.array([1.0, 2.0, 1.0, 4.0])
+        low_mems = np.array([0.0, 0.0, 300.0, 0.0])
+        high_mems = np.array([1000.0, 1000.0, 1000.0, 200.0])
+        filled_mems = water_fill(weights, low_mems, high_mems, 1000)
+
+        # the level is 500 / 3, the third pool stays at its lowest memory, the last pool is at its highest memory
+        np.testing.assert_allclose(filled_mems, [500 / 3, 1000 / 3, 300, 200])
+        np.testing.assert_allclose(water_fill(weights, low_mems, high_mems, 300), low_mems)
+        np.testing.assert_allclose(water_fill(weights, low_mems, high_mems, 3200), high_mems)
+
+    def test_water_fill_by_level(self):
+        random = np.random.RandomState(7)
+        for _ in range(100):
+            weights = random.randint(1, 5, 10).astype(np.float64)
+            low_mems = random.randint(0, 500, 10).astype(np.float64)
+            high_mems = low_mems + random.randint(0, 1000, 10)
+            total_mem = random.uniform(low_mems.sum(), high_mems.sum())
+            filled_mems = water_fill(weights, low_mems, high_mems, total_mem)
+
+            self.assertAlmostEqual(filled_mems.sum(), total_mem, places=6)
+            self.assertTrue(np.all(filled_mems >= low_mems - 1e-9) and np.all(filled_mems <= high_mems + 1e-9))
+            # max-min fair: a pool between its bounds has the highest level of pools that can still be raised
+            levels = filled_mems / weights
+            raised = (filled_mems > low_mems + 1e-9) & (filled_mems < high_mems - 1e-9)
+            raisable = filled_mems < high_mems - 1e-9
+            if raised.any():
+                self.assertAlmostEqual(levels[raised].max(), levels[raised].min(), places=6)
+                self.assertLessEqual(levels[raisable].min(), levels[raised].min() + 1e-6)
+
+    def test_schedule_busy_pool(self):
+        """
+        test the pool(root.test_pool1) gets its demand 1100MB, the surplus is shared by weights 1 and 2
+        """
+        pools_stat = {"root.test_pool1": PoolStat("", 10, 10, 10, 10, 100, 100)}
+        pools_allocated_mem = get_test_pools_allocated_mem(FairSchedule, pools_stat)
+
+        self.assertEqual(pools_allocated_mem, {"root.test_pool1": 1100, "root.test_pool2": 630,
+                                               "root.test_pool3": 1270})
+
+    def test_schedule_oversubscribed(self):
+        """
+        test the busy pools share the total memory 3000MB by weights, none of them gets all its demand
+        """
+        pools_stat = {"root.test_pool1": PoolStat("", 10, 10, 10, 10, 1000, 1000),
+                      "root.test_pool2": PoolStat("", 10, 10, 10, 10, 1000, 1000),
+                      "root.test_pool3": PoolStat("", 10, 10, 10, 10, 1000, 500)}
+        pools_allocated_mem = get_test_pools_allocated_mem(FairSchedule, pools_stat)
+
+        self.assertEqual(pools_allocated_mem, {"root.test_pool1": 750, "root.test_pool2": 750,
+                                               "root.test_pool3": 1500})
+        pools_stat["root.test_pool3"] = PoolStat("", 10, 0, 10, 0, 200, 0)
+        pools_allocated_mem = get_test_pools_allocated_mem(FairSchedule, pools_stat)
+
+        self.assertEqual(pools_allocated_mem, {"root.test_pool1": 1400, "root.test_pool2": 1400,
+                                               "root.test_pool3": 200})
+
+    def test_schedule_current_mem_off_unit(self):
+        """
+        test the pool(root.test_pool1) whose current memory 1050MB is not a multiple of memory unit is not
+        allocated below min_mem 100MB, while its fair memory 100MB is below the lowest memory 150MB it can be
+        rounded to, and the total memory is conserved
+        """
+        pools_info = {
+            "root.test_pool1": PoolInfo("root.test_pool1", 1050, 1, 100, 3000, PoolStat("", 10, 0, 10, 0, 50, 0)),
+            "root.test_pool2": PoolInfo("root.test_pool2", 1000, 1, 100, 3000,
+                                        PoolStat("", 10, 10, 10, 5000, 1000, 1500)),
+            "root.test_pool3": PoolInfo("root.test_pool3", 1000, 1, 100, 3000,
+                                        PoolStat("", 10, 10, 10, 5000, 1000, 1500))}
+        pools_allocated_mem = FairSchedule.get_pools_allocated_mem({"schedule_memory_unit": 100}, pools_info)
+
+        self.assertEqual(pools_allocated_mem, {"root.test_pool1": 150, "root.test_pool2": 1500,
+                                               "root.test_pool3": 1400})
@@ -0,0 +1,115 @@
+import unittest
+import json
+import time
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.hierarchical_allocation import HierarchicalAllocation, get_pools_children
+from scheduler.optimal_schedule import OptimalSchedule
+from scheduler.priority_schedule import PrioritySchedule
+from scheduler.impala_pool_config import ImpalaScheduledAllocations
+from scheduler.base_schedule import PoolStat, PoolInfo, get_pools_info
+from tests.utils import get_scheduler_config
+
+
+def get_pool(name, mem=None, pools=()):
+    properties = {"weight": 1.0}
+    if mem is not None:
+        properties["impalaMaxMemory"] = mem
+    return {"name": name, "queues": list(pools), "schedulablePropertiesList": [properties]}
+
+
+def get_nested_impala_config(dept_mems, leaf_number):
+    depts = [get_pool("dept%d" % i, dept_mem, [get_pool("pool%d" % j, 1000.0) for j in range(leaf_number)])
+             for i, dept_mem in enumerate(dept_mems)]
+    value = json.dumps({"queues": [get_pool("root", None, depts)]})
+    return ImpalaScheduledAllocations({"items": [{"name": "impala_scheduled_allocations", "value": value}]})
+
+
+def get_nested_scheduler_config(dept_number, leaf_number):
+    scheduler_config = get_scheduler_config()
+    scheduler_config["pool"] = {"root.dept%d.pool%d" % (i, j): {"min_mem": 0, "max_mem": 2000}
+                                for i in range(dept_number) for j in range(leaf_number)}
+    return scheduler_config
+
+
+def get_busy_pool_stat(wait_mem):
+    return PoolStat("", 10, 10, 10, 10, 100, wait_mem)
+
+
+class MoveToDept0Schedule(object):
+    """
+    The schedule moves one memory unit from root.dept1 to root.dept0 regardless of their max_mem.
+    """
+
+    @classmethod
+    def get_pools_allocated_mem(cls, section_schedule, pools_info):
+        if "root.dept0" not in pools_info:
+            return {}
+        return {"root.dept0": pools_info["root.dept0"].current_mem + 100,
+                "root.dept1": pools_info["root.dept1"].current_mem - 100}
+
+
+class TestHierarchicalAllocationMethods(unittest.TestCase):
+
+    def get_pools_allocated_mem(self, schedule, dept_mems, pools_stat):
+        impala_pool_config = get_nested_impala_config(dept_mems, 2)
+        scheduler_config = get_nested_scheduler_config(len(dept_mems), 2)
+        pools_info = get_pools_info(impala_pool_config, scheduler_config, pools_stat)
+        return HierarchicalAllocation(schedule, scheduler_config["schedule"], impala_pool_config) \
+            .get_pools_allocated_mem(pools_info)
+
+    def test_get_pools_children(self):
+        self.assertEqual(get_pools_children(["root.a.x", "root.a.y", "root.b"]),
+                         {"root.a": ["root.a.x", "root.a.y"], "root": ["root.a", "root.b"], "": ["root"]})
+
+    def test_rebalance_siblings_first(self):
+        pools_stat = {"root.dept0.pool0": get_busy_pool_stat(300)}
+
+        self.assertEqual(self.get_pools_allocated_mem(OptimalSchedule, [None, None], pools_stat),
+                         {"root.dept0.pool0": 1300, "root.dept0.pool1": 700})
+        self.assertEqual(self.get_pools_allocated_mem(PrioritySchedule, [None, None], pools_stat),
+                         {"root.dept0.pool0": 1300, "root.dept0.pool1": 700})
+
+    def test_propagate_net_deltas(self):
+        pools_stat = {"root.dept0.pool0": get_busy_pool_stat(300), "root.dept0.pool1": get_busy_pool_stat(200)}
+
+        self.assertEqual(self.get_pools_allocated_mem(OptimalSchedule, [None, None], pools_stat),
+                         {"root.dept0.pool0": 1300, "root.dept0.pool1": 1200, "root.dept1.pool0": 750,
+                          "root.dept1.pool1": 750})
+
+    def test_parent_pool_cap(self):
+        pools_stat = {"root.dept0.pool0": get_busy_pool_stat(300), "root.dept0.pool1": get_busy_pool_stat(200)}
+
+        self.assertEqual(self.get_pools_allocated_mem(OptimalSchedule, [2000.0, None], pools_stat), {})
+        # the capped memory goes to the child with the most unmet demand first
+        self.assertEqual(self.get_pools_allocated_mem(OptimalSchedule, [2200.0, None], pools_stat),
+                         {"root.dept0.pool0": 1150, "root.dept0.pool1": 1050, "root.dept1.pool0": 900,
+                          "root.dept1.pool1": 900})
+
+    def test_children_at_max_mem(self):
+        impala_pool_config = get_nested_impala_config([None, None], 2)
+        scheduler_config = get_nested_scheduler_config(2, 2)
+        pools_info = {"root.dept%d.pool%d" % (i, j): PoolInfo("root.dept%d.pool%d" % (i, j), 1000, 1.0, 0,
+                                                              1000 if i == 0 else 2000, PoolStat())
+                      for i in range(2) for j in range(2)}
+        hierarchical_allocation = HierarchicalAllocation(MoveToDept0Schedule, scheduler_config["schedule"],
+                                                         impala_pool_config)
+
+        # the children of root.dept0 are at max_mem, so the unit is moved back to root.dept1
+        self.assertEqual(hierarchical_allocation.get_pools_allocated_mem(pools_info), {})
+
+    def test_hundreds_pools(self):
+        impala_pool_config = get_nested_impala_config([None] * 20, 20)
+        scheduler_config = get_nested_scheduler_config(20, 20)
+        pools_stat = {"root.dept%d.pool0" % i: get_busy_pool_stat(100 * i) for i in range(20)}
+        pools_info = get_pools_info(impala_pool_config, scheduler_config, pools_stat)
+
+        start = time.time()
+        pools_allocated_mem = HierarchicalAllocation(OptimalSchedule, scheduler_config["schedule"],
+                                                     impala_pool_config).get_pools_allocated_mem(pools_info)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(sum(pools_allocated_mem.values()), 1000 * len(pools_allocated_mem))
+        self.assertEqual(pools_allocated_mem["root.dept19.pool0"], 2000)
@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+import requests
+from scheduler.http_transport import HttpTransport, get_http_transport, close_http_transports
+from scheduler.metrics import REGISTRY, HTTP_RETRIES, HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES
+
+
+def get_test_response(status_code):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.content = b"{}"
+    return response
+
+
+class TestHttpTransportMethods(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("scheduler.http_transport.requests.Session")
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_retry_on_server_error(self):
+        transport = HttpTransport("server_url", "username", "password", max_retries=2, backoff_seconds=0)
+        self.session.request.side_effect = [get_test_response(503), requests.ConnectionError(),
+                                            get_test_response(200)]
+        retries = REGISTRY.get(HTTP_RETRIES, endpoint="roles")
+        requests_number = REGISTRY.get(HTTP_REQUEST_SECONDS, endpoint="roles", method="GET")
+        response_bytes = REGISTRY.get(HTTP_RESPONSE_BYTES, endpoint="roles")
+        response = transport.request("GET", "server_url/api/v17/clusters/cluster", "roles")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.request.call_count, 3)
+        self.assertEqual(REGISTRY.get(HTTP_RETRIES, endpoint="roles") - retries, 2)
+        self.assertEqual(REGISTRY.get(HTTP_REQUEST_SECONDS, endpoint="roles", method="GET") - requests_number, 3)
+        self.assertEqual(REGISTRY.get(HTTP_RESPONSE_BYTES, endpoint="roles") - response_bytes, 4)
+
+    def test_no_retry_on_client_error(self):
+        transport = HttpTransport("server_url", "username", "password", max_retries=2, backoff_seconds=0)
+        self.session.request.side_effect = [get_test_response(404), get_test_response(200)]
+        response = transport.request("GET", "server_url/api/v17/clusters/cluster")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_retry_exhausted(self):
+        transport = HttpTransport("server_url", "username", "password", max_retries=1, backoff_seconds=0)
+        self.session.request.return_value = get_test_response(500)
+        with self.assertRaises(Exception):
+            transport.request("GET", "server_url/api/v17/clusters/cluster")
+        self.assertEqual(self.session.request.call_count, 2)
+
+    def test_no_retry_on_changing_request(self):
+        transport = HttpTransport("server_url", "username", "password", max_retries=2, backoff_seconds=0)
+        self.session.request.return_value = get_test_response(503)
+        with self.assertRaises(IOError):
+            transport.request("POST", "server_url/api/v17/clusters/cluster/commands/poolsRefresh")
+        with self.assertRaises(IOError):
+            transport.request("PUT", "server_url/api/v17/clusters/cluster/services/impala/config")
+        self.assertEqual(self.session.request.call_count, 2)
+
+        self.session.request.side_effect = [get_test_response(503), get_test_response(200)]
+        response = transport.request("POST", "server_url/api/v17/clusters/cluster/commands/poolsRefresh",
+                                     retried=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.request.call_count, 4)
+
+    def test_authenticate_again_when_unauthorized(self):
+        transport = HttpTransport("server_url", "username", "password")
+        self.assertEqual(self.session.get.call_count, 1)
+        self.session.request.side_effect = [get_test_response(401), get_test_response(200)]
+        response = transport.request("GET", "server_url/api/v17/clusters/cluster")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_endpoint_timeout(self):
+        transport = HttpTransport("server_url", "username", "password", connect_timeout_seconds=5,
+                                  read_timeout_seconds={"query_details": 7})
+        self.session.request.return_value = get_test_response(200)
+        transport.request("GET", "server_url/api/v17/clusters/cluster", "query_details")
+        self.assertEqual(self.session.request.call_args[1]["timeout"], (5, 7))
+        transport.request("GET", "server_url/api/v17/clusters/cluster", "roles")
+        self.assertEqual(self.session.request.call_args[1]["timeout"], (5, 30))
+
+    def test_shared_transport(self):
+        transport = get_http_transport("server_url", "username", "password")
+        self.assertIs(transport, get_http_transport("server_url", "username", "password"))
+        close_http_transports()
+        self.assertIsNot(transport, get_http_transport("server_url", "username", "password"))
+        with self.assertRaises(ValueError):
+            get_http_transport("server_url", "username", "password", max_retries=5)
+        close_http_transports()
+
+
+if __name__ == "__main__":
+    unittest.main()
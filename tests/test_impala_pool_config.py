@@ -0,0 +1,56 @@
+import unittest
+import json
+
+from scheduler.impala_pool_config import ImpalaScheduledAllocations
+from tests.utils import get_impala_pool_config
+
+
+class TestImpalaScheduledAllocationsMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.impala_pool_config = get_impala_pool_config()
+
+    def test_get_pool(self):
+        pool_names = self.impala_pool_config.get_pool_names()
+        self.assertIn("root.test_pool1", pool_names)
+        self.assertIsNone(self.impala_pool_config.get_pool("root"))
+        self.assertIsNone(self.impala_pool_config.get_pool("root.not_exist_pool"))
+        self.assertIs(self.impala_pool_config.get_pool("root.test_pool1"),
+                      self.impala_pool_config.get_pools()["root.test_pool1"])
+
+    def test_update_pools(self):
+        pool_names = self.impala_pool_config.get_pool_names()
+        self.impala_pool_config.update_pools({pool_name: 1024.0 * (i + 1) for i, pool_name in enumerate(pool_names)})
+
+        for i, pool_name in enumerate(pool_names):
+            self.assertEqual(self.impala_pool_config.get_pool(pool_name).get_pool_mem(), 1024.0 * (i + 1))
+
+        allocations_value = json.loads(json.loads(str(self.impala_pool_config))["items"][0]["value"])
+        pool = allocations_value["queues"][0]["queues"][0]
+        self.assertEqual(pool["schedulablePropertiesList"][0]["impalaMaxMemory"],
+                         self.impala_pool_config.get_pool("root." + pool["name"]).get_pool_mem())
+
+    def test_update_parent_pool_without_properties(self):
+        value = json.dumps({"queues": [{"name": "root", "queues": [{"name": "pool", "queues": [],
+                                                                    "schedulablePropertiesList": [{}]}]}]})
+        impala_pool_config = ImpalaScheduledAllocations(
+            {"items": [{"name": "impala_scheduled_allocations", "value": value}]})
+        parent_pool = impala_pool_config.get_parent_pool("root")
+        self.assertIsNone(parent_pool.get_pool_mem())
+        self.assertEqual(json.loads(json.loads(str(impala_pool_config))["items"][0]["value"]), json.loads(value))
+
+        parent_pool.update_pool_mem(2048.0)
+        self.assertEqual(parent_pool.get_pool_mem(), 2048.0)
+        allocations_value = json.loads(json.loads(str(impala_pool_config))["items"][0]["value"])
+        self.assertEqual(allocations_value["queues"][0]["schedulablePropertiesList"], [{"impalaMaxMemory": 2048.0}])
+
+    def test_get_pools_mem_diff(self):
+        pool_mem = self.impala_pool_config.get_pool("root.test_pool1").get_pool_mem()
+        self.assertEqual(self.impala_pool_config.get_pools_mem_diff({"root.test_pool1": pool_mem}), {})
+        self.assertEqual(self.impala_pool_config.get_pools_mem_diff({"root.test_pool1": pool_mem,
+                                                                     "root.test_pool2": pool_mem + 100}),
+                         {"root.test_pool2": (pool_mem, pool_mem + 100)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from urllib.request import urlopen
+
+from scheduler.metrics import MetricsRegistry, MetricsHandler, REGISTRY, CALL_SECONDS, COUNTER, GAUGE, HISTOGRAM, \
+    start_metrics_server
+from scheduler.global_utils import spend_time
+
+
+class TestMetricsMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.register("test_total", COUNTER, "Test counter.")
+        self.registry.register("test_gauge", GAUGE, "Test gauge.")
+        self.registry.register("test_seconds", HISTOGRAM, "Test histogram.", buckets=(0.1, 1))
+
+    def test_render(self):
+        self.registry.inc("test_total", 2, endpoint="roles")
+        self.registry.inc("test_total", endpoint="roles")
+        self.registry.set("test_gauge", 5)
+        for value in [0.05, 0.1, 0.5, 3]:
+            self.registry.observe("test_seconds", value, phase="fetch")
+
+        self.assertEqual(self.registry.render().splitlines(), [
+            "# HELP test_gauge Test gauge.",
+            "# TYPE test_gauge gauge",
+            "test_gauge 5.0",
+            "# HELP test_seconds Test histogram.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{phase="fetch",le="0.1"} 2',
+            'test_seconds_bucket{phase="fetch",le="1.0"} 3',
+            'test_seconds_bucket{phase="fetch",le="+Inf"} 4',
+            'test_seconds_sum{phase="fetch"} 3.65',
+            'test_seconds_count{phase="fetch"} 4',
+            "# HELP test_total Test counter.",
+            "# TYPE test_total counter",
+            'test_total{endpoint="roles"} 3.0'])
+
+    def test_spend_time(self):
+        @spend_time
+        def get_nothing():
+            return None
+
+        calls = REGISTRY.get(CALL_SECONDS, function="get_nothing")
+        get_nothing()
+        self.assertEqual(REGISTRY.get(CALL_SECONDS, function="get_nothing") - calls, 1)
+        self.assertEqual(get_nothing.__name__, "get_nothing")
+
+    def test_metrics_server(self):
+        MetricsHandler.registry = self.registry
+        self.addCleanup(setattr, MetricsHandler, "registry", REGISTRY)
+        self.registry.inc("test_total")
+        server = start_metrics_server("127.0.0.1", 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with urlopen("http://127.0.0.1:%d/metrics" % server.server_address[1], timeout=5) as response:
+            self.assertIn("text/plain", response.headers["Content-Type"])
+            self.assertIn("test_total 1.0", response.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import itertools
+import time
+import numpy as np
+
+import os
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.optimal_schedule import OptimalSchedule
+from scheduler.base_schedule import PoolStat, PoolDemand, PoolInfo
+from tests.utils import get_test_pools_allocated_mem
+
+
+def get_weighted_queued_mem(pools_info, pools_allocated_mem):
+    queued_mem = 0
+    for pool_name, pool_info in pools_info.items():
+        demand = pool_info.pool_stat.demand
+        demands = np.where(demand.wait_mems > 0, np.maximum(demand.used_mems, pool_info.current_mem) +
+                           demand.wait_mems, demand.used_mems)
+        mem = pools_allocated_mem.get(pool_name, pool_info.current_mem)
+        queued_mem += pool_info.weight * np.maximum(demands - mem, 0).mean()
+    return queued_mem
+
+
+def get_random_pools_info(random, pool_number, current_mem, memory_unit):
+    pools_info = {}
+    for i in range(pool_number):
+        pool_name = "root.test_pool%d" % i
+        used_mems = random.randint(0, current_mem, 20)
+        wait_mems = np.where(random.rand(20) < 0.3, random.randint(1, current_mem, 20), 0)
+        demand = PoolDemand(pool_name, np.arange(20), used_mems, wait_mems)
+        pools_info[pool_name] = PoolInfo(pool_name, current_mem, float(random.randint(1, 4)),
+                                         memory_unit * random.randint(0, 3), current_mem + memory_unit * 5,
+                                         PoolStat(pool_name, demand=demand))
+    return pools_info
+
+
+class TestOptimalScheduleMethods(unittest.TestCase):
+
+    def test_schedule_busy_pool(self):
+        """
+        test the pool(root.test_pool1) takes its queued memory 100MB evenly from the idle pools
+        """
+        pools_stat = {"root.test_pool1": PoolStat("", 10, 10, 10, 10, 100, 100)}
+        pools_allocated_mem = get_test_pools_allocated_mem(OptimalSchedule, pools_stat)
+
+        self.assertEqual(pools_allocated_mem, {"root.test_pool1": 1100, "root.test_pool2": 950,
+                                               "root.test_pool3": 950})
+
+    def test_schedule_idle_pools(self):
+        pools_stat = {"root.test_pool1": PoolStat("", 10, 0, 10, 0, 100, 0)}
+        self.assertEqual(get_test_pools_allocated_mem(OptimalSchedule, pools_stat), {})
+        self.assertEqual(get_test_pools_allocated_mem(OptimalSchedule, {}), {})
+
+    def test_schedule_optimal(self):
+        random = np.random.RandomState(7)
+        section_schedule = {"schedule_memory_unit": 10}
+        for _ in range(20):
+            pools_info = get_random_pools_info(random, 3, 50, 10)
+            pools_allocated_mem = OptimalSchedule.get_pools_allocated_mem(section_schedule, pools_info)
+
+            mems = [pools_allocated_mem.get(pool_name, pool_info.current_mem)
+                    for pool_name, pool_info in pools_info.items()]
+            self.assertEqual(sum(mems), 150)
+            for mem, pool_info in zip(mems, pools_info.values()):
+                self.assertTrue(pool_info.min_mem <= mem <= pool_info.max_mem)
+                self.assertEqual(mem % 10, 0)
+
+            best_queued_mem = min(
+                get_weighted_queued_mem(pools_info, dict(zip(pools_info, allocation)))
+                for allocation in itertools.product(range(0, 101, 10), repeat=3)
+                if sum(allocation) == 150 and all(pool_info.min_mem <= mem <= pool_info.max_mem
+                                                  for mem, pool_info in zip(allocation, pools_info.values())))
+            self.assertAlmostEqual(get_weighted_queued_mem(pools_info, pools_allocated_mem), best_queued_mem)
+
+    def test_schedule_hundreds_pools(self):
+        random = np.random.RandomState(7)
+        pools_info = get_random_pools_info(random, 500, 100000, 1024)
+
+        start = time.time()
+        pools_allocated_mem = OptimalSchedule.get_pools_allocated_mem({"schedule_memory_unit": 1024}, pools_info)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(sum(pools_allocated_mem.get(pool_name, pool_info.current_mem)
+                             for pool_name, pool_info in pools_info.items()), 500 * 100000)
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from scheduler.base_schedule import PoolStat, PoolStatPartial, AbstractSchedule, calculate_pools_stat_partials
+from scheduler.constants import FormativeQueryInfoColumn
+from scheduler import pool_stat_partials as pool_stat_partials_module
+from scheduler.pool_stat_partials import PoolStatPartials
+
+STAT_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+def get_milli_sec(datetime_value):
+    return int(time.mktime(datetime_value.timetuple()) * 1000)
+
+
+def get_random_queries_info(query_number, seed=7):
+    random = np.random.RandomState(seed)
+    return pd.DataFrame({
+        FormativeQueryInfoColumn.QUERY_ID: ["query_%d" % i for i in range(query_number)],
+        FormativeQueryInfoColumn.START_TIME: [STAT_START_TIME + timedelta(milliseconds=int(ms)) for ms in
+                                              random.randint(-120000, 1800000, query_number)],
+        FormativeQueryInfoColumn.DURATION_MILLIS: random.randint(0, 120000, query_number),
+        FormativeQueryInfoColumn.POOL: random.choice(["root.a", "root.b", "root.c"], query_number),
+        FormativeQueryInfoColumn.ADMISSION_WAIT:
+            (random.randint(0, 20000, query_number) * random.randint(0, 2, query_number)).astype(str),
+        FormativeQueryInfoColumn.QUERY_STATE: "FINISHED",
+        FormativeQueryInfoColumn.MEM_LIMIT: random.randint(0, 4096, query_number),
+        FormativeQueryInfoColumn.MAX_HOST: random.randint(0, 10, query_number)})
+
+
+class TestPoolStatPartialsMethods(unittest.TestCase):
+
+    def test_from_partial(self):
+        stat_start = STAT_START_TIME
+        df = pd.read_csv("./resources/query_info_data_test.csv")
+        df["start_time"] = df["start_time"].apply(lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f"))
+        pools_stat = PoolStatPartials(1).get_pools_stat(df, stat_start, stat_start + timedelta(minutes=10))
+        pool_stat = pools_stat["test_pool1"]
+        self.assertEqual(pool_stat.query_total, 2)
+        self.assertEqual(pool_stat.wait_query_total, 1)
+        self.assertEqual(pool_stat.run_secs, 15.0)
+        self.assertEqual(pool_stat.wait_secs, 5.0)
+        self.assertEqual(pool_stat.used_mem_avg, 23333)
+        self.assertEqual(pool_stat.wait_mem_avg, 17500)
+
+    def test_merge_adjacent_partials(self):
+        df = get_random_queries_info(1000)
+        start, middle, end = get_milli_sec(STAT_START_TIME), get_milli_sec(STAT_START_TIME + timedelta(minutes=7)), \
+            get_milli_sec(STAT_START_TIME + timedelta(minutes=30))
+        pools_partial = calculate_pools_stat_partials(df, start, end)
+        head_partials = calculate_pools_stat_partials(df, start, middle)
+        tail_partials = calculate_pools_stat_partials(df, middle, end)
+        for pool_name, pool_partial in pools_partial.items():
+            merged_partial = head_partials[pool_name].merge(tail_partials[pool_name])
+            self.assertEqual(vars(merged_partial), vars(pool_partial))
+
+        with self.assertRaises(ValueError):
+            head_partials["root.a"].merge(PoolStatPartial("root.a", end, end + 1000))
+
+    def test_cached_partials(self):
+        df = get_random_queries_info(1000)
+        pool_stat_partials = PoolStatPartials(1)
+        for minutes in range(0, 10, 3):
+            start_time = STAT_START_TIME + timedelta(minutes=minutes, seconds=17)
+            end_time = start_time + timedelta(minutes=20)
+            pools_stat = pool_stat_partials.get_pools_stat(df, start_time, end_time)
+            expected_pools_stat = {pool_name: PoolStat.from_partial(pool_partial) for pool_name, pool_partial in
+                                   calculate_pools_stat_partials(df, get_milli_sec(start_time),
+                                                                 get_milli_sec(end_time)).items()}
+            self.assertEqual({pool_name: vars(pool_stat) for pool_name, pool_stat in pools_stat.items()},
+                             {pool_name: vars(pool_stat) for pool_name, pool_stat in expected_pools_stat.items()})
+        self.assertGreater(pool_stat_partials.hits, 0)
+
+    def test_same_as_full_window_stat(self):
+        df = get_random_queries_info(1000)
+        # one query started 5 minutes before the window and still running in it
+        df.loc[0, [FormativeQueryInfoColumn.START_TIME, FormativeQueryInfoColumn.DURATION_MILLIS,
+                   FormativeQueryInfoColumn.POOL]] = [STAT_START_TIME - timedelta(minutes=5), 600000, "root.d"]
+        start_time = STAT_START_TIME + timedelta(seconds=17)
+        end_time = start_time + timedelta(minutes=20)
+        pools_stat = PoolStatPartials(5).get_pools_stat(df, start_time, end_time)
+        expected_pools_stat = AbstractSchedule.get_pools_stat(df, start_time, end_time)
+        self.assertEqual(pools_stat["root.d"].query_total, 1)
+        self.assertEqual({pool_name: vars(pool_stat) for pool_name, pool_stat in pools_stat.items()},
+                         {pool_name: vars(pool_stat) for pool_name, pool_stat in expected_pools_stat.items()})
+
+    def test_uncompleted_partials_not_cached(self):
+        df = get_random_queries_info(100)
+        df[FormativeQueryInfoColumn.QUERY_STATE] = "RUNNING"
+        pool_stat_partials = PoolStatPartials(1)
+        for _ in range(2):
+            pool_stat_partials.get_pools_stat(df, STAT_START_TIME, STAT_START_TIME + timedelta(minutes=10))
+        self.assertEqual(pool_stat_partials.hits, 0)
+
+    def test_intervals_got_once(self):
+        df = get_random_queries_info(1000)
+        end_time = STAT_START_TIME + timedelta(minutes=30)
+        pool_stat_partials = PoolStatPartials(1)
+        with mock.patch.object(pool_stat_partials_module, "get_queries_intervals",
+                               wraps=pool_stat_partials_module.get_queries_intervals) as get_queries_intervals:
+            pools_stat = pool_stat_partials.get_pools_stat(df, STAT_START_TIME, end_time)
+        self.assertEqual(get_queries_intervals.call_count, 1)
+        self.assertEqual(pool_stat_partials.misses, 30)
+        expected_pools_stat = AbstractSchedule.get_pools_stat(df, STAT_START_TIME, end_time)
+        self.assertEqual({pool_name: vars(pool_stat) for pool_name, pool_stat in pools_stat.items()},
+                         {pool_name: vars(pool_stat) for pool_name, pool_stat in expected_pools_stat.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import os
+import tempfile
+
+from scheduler.query_details_cache import QueryDetailsCache
+
+
+class TestQueryDetailsCacheMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "query_details_cache.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_and_put(self):
+        cache = QueryDetailsCache(self.cache_path, 24, 10)
+        self.assertIsNone(cache.get("001"))
+        cache.put("001", 500.0, 35)
+        self.assertEqual(cache.get("001"), (500.0, 35))
+        cache.close()
+
+        cache = QueryDetailsCache(self.cache_path, 24, 10)
+        self.assertEqual(cache.get("001"), (500.0, 35))
+        cache.close()
+
+    def test_expired(self):
+        cache = QueryDetailsCache(self.cache_path, -1, 10)
+        cache.put("001", 500.0, 35)
+        self.assertIsNone(cache.get("001"))
+        cache.close()
+
+    def test_evict_least_recently_used(self):
+        cache = QueryDetailsCache(self.cache_path, 24, 2)
+        cache.put("001", 100.0, 1)
+        cache.put("002", 200.0, 2)
+        cache.put("003", 300.0, 3)
+        cache.get("001")
+        cache.evict()
+        self.assertEqual(cache.get("001"), (100.0, 1))
+        self.assertIsNone(cache.get("002"))
+        self.assertEqual(cache.get("003"), (300.0, 3))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
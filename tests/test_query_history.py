@@ -0,0 +1,56 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from scheduler.query_history import QueryHistory
+from tests.utils import get_test_queries_info
+
+HISTORY_START_TIME = datetime(2018, 2, 24, 11, 59, 59, 123000)
+
+
+class TestQueryHistoryMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history_path = os.path.join(self.temp_dir.name, "query_history")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_and_read(self):
+        query_history = QueryHistory(self.history_path, 7)
+        t1, t2 = HISTORY_START_TIME, HISTORY_START_TIME + timedelta(seconds=1)
+        query_history.write(get_test_queries_info([
+            ["001", t1, 1000, "root.pool1", "0", "FINISHED", 500, 3],
+            ["002", t2, None, "root.pool2", "2000", "RUNNING", 600, 4],
+            ["003", t1, 3000, "root.pool1", "1000", "EXCEPTION", 700, 5]]))
+        query_history.write(get_test_queries_info([["002", t2, 5000, "root.pool2", "2000", "FINISHED", 600, 4]]))
+        self.assertEqual(sorted(os.listdir(self.history_path)), ["2018022411.npz", "2018022412.npz"])
+
+        queries_info = query_history.read(t1 - timedelta(hours=1), t2)
+        self.assertEqual(queries_info["query_id"].tolist(), ["001", "003", "002"])
+        self.assertEqual(queries_info["start_time"].tolist(), [t1, t1, t2])
+        self.assertEqual(queries_info["query_state"].tolist(), ["FINISHED", "EXCEPTION", "FINISHED"])
+        self.assertEqual(queries_info["duration_millis"].tolist(), [1000, 3000, 5000])
+        self.assertEqual(queries_info["admission_wait"].tolist(), [0, 1000, 2000])
+        self.assertEqual(queries_info["mem_limit"].tolist(), [500, 700, 600])
+
+        queries_info = query_history.read(t1 + timedelta(milliseconds=1), t2 + timedelta(hours=1), ["root.pool2"])
+        self.assertEqual(queries_info["query_id"].tolist(), ["002"])
+        self.assertIsNone(query_history.read(t1, t2, ["root.pool3"]))
+
+    def test_evict(self):
+        query_history = QueryHistory(self.history_path, 1)
+        query_history.write(get_test_queries_info([
+            ["001", HISTORY_START_TIME, 1000, "root.pool1", "0", "FINISHED", 500, 3],
+            ["002", HISTORY_START_TIME + timedelta(hours=2), 1000, "root.pool1", "0", "FINISHED", 500, 3]]))
+
+        query_history.evict(HISTORY_START_TIME + timedelta(days=1, hours=1))
+        queries_info = query_history.read(HISTORY_START_TIME - timedelta(days=1),
+                                          HISTORY_START_TIME + timedelta(days=1))
+        self.assertEqual(queries_info["query_id"].tolist(), ["002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
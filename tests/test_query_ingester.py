@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+import os
+import tempfile
+import pandas as pd
+from datetime import datetime, timedelta
+
+from scheduler.constants import SCHEDULER_HOME, FormativeQueryInfoColumn
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.query_ingester import QueryIngester
+from scheduler.query_window import QueryWindow
+from tests.utils import get_scheduler_config
+
+INGEST_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+def get_fetched_queries_info(start_times):
+    return pd.DataFrame({
+        FormativeQueryInfoColumn.QUERY_ID: ["%03d" % i for i in range(len(start_times))],
+        FormativeQueryInfoColumn.START_TIME: start_times,
+        FormativeQueryInfoColumn.DURATION_MILLIS: 1000,
+        FormativeQueryInfoColumn.ADMISSION_WAIT: "0",
+        FormativeQueryInfoColumn.QUERY_STATE: "FINISHED"})
+
+
+class TestQueryIngesterMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.section_schedule = get_scheduler_config()["schedule"]
+        self.section_schedule["enable_fetch_queries_file"] = False
+        self.section_schedule["enable_query_details_cache"] = False
+        self.cloudera_manager = mock.Mock()
+        self.query_window = QueryWindow(os.path.join(self.temp_dir.name, "query_window.pkl"))
+
+    def test_ingest(self):
+        query_ingester = QueryIngester(self.cloudera_manager, self.section_schedule, self.query_window, 60)
+        self.cloudera_manager.fetch_impala_query_info.return_value = get_fetched_queries_info(
+            [INGEST_TIME - timedelta(minutes=2), INGEST_TIME - timedelta(minutes=1)])
+        query_ingester.ingest(INGEST_TIME)
+
+        self.assertEqual(query_ingester.ingested_time, INGEST_TIME)
+        self.assertEqual(self.cloudera_manager.fetch_impala_query_info.call_args[0][:2],
+                         (INGEST_TIME - timedelta(minutes=5), INGEST_TIME))
+        self.assertEqual(query_ingester.get_queries_info(INGEST_TIME).shape[0], 2)
+
+        # only the queries newer than the high-water mark are fetched
+        self.cloudera_manager.fetch_impala_query_info.return_value = None
+        query_ingester.ingest(INGEST_TIME + timedelta(minutes=1))
+        self.assertEqual(self.cloudera_manager.fetch_impala_query_info.call_args[0][:2],
+                         (INGEST_TIME - timedelta(minutes=1), INGEST_TIME + timedelta(minutes=1)))
+        self.assertEqual(query_ingester.get_queries_info(INGEST_TIME).shape[0], 2)
+
+    def test_is_stale(self):
+        query_ingester = QueryIngester(self.cloudera_manager, self.section_schedule, self.query_window, 60)
+        self.assertFalse(query_ingester.is_stale(INGEST_TIME))
+        self.cloudera_manager.fetch_impala_query_info.return_value = None
+        query_ingester.ingest(INGEST_TIME)
+        self.assertFalse(query_ingester.is_stale(INGEST_TIME + timedelta(minutes=2)))
+        self.assertTrue(query_ingester.is_stale(INGEST_TIME + timedelta(minutes=2, seconds=1)))
+
+    def test_max_size(self):
+        query_ingester = QueryIngester(self.cloudera_manager, self.section_schedule, self.query_window, 60, 2)
+        self.cloudera_manager.fetch_impala_query_info.return_value = get_fetched_queries_info(
+            [INGEST_TIME - timedelta(minutes=minutes) for minutes in [1, 3, 2]])
+        query_ingester.ingest(INGEST_TIME)
+
+        self.assertEqual(query_ingester.get_queries_info(INGEST_TIME)["query_id"].tolist(), ["002", "000"])
+
+    def test_start_and_stop(self):
+        query_ingester = QueryIngester(self.cloudera_manager, self.section_schedule, self.query_window, 60)
+        self.cloudera_manager.fetch_impala_query_info.return_value = None
+
+        self.assertTrue(query_ingester.start(timeout=5))
+        query_ingester.stop()
+        self.assertIsNotNone(query_ingester.ingested_time)
+        self.assertEqual(self.cloudera_manager.fetch_impala_query_info.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest import mock
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+from scheduler.constants import SCHEDULER_HOME
+os.environ[SCHEDULER_HOME] = ""
+
+from scheduler.query_history import QueryHistory
+from scheduler.query_source import ReplaySource, get_queries_info_at
+from scheduler.scheduler import Scheduler
+from tests.utils import get_scheduler_config, get_test_queries_info
+
+REPLAY_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+class ConcurrentEditSource(ReplaySource):
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.fetches = 0
+
+    def get_impala_config(self):
+        self.fetches += 1
+        impala_config = super().get_impala_config()
+        if self.fetches > 1:
+            impala_config["items"][0]["value"] = impala_config["items"][0]["value"].replace('"weight": 1.0',
+                                                                                            '"weight": 3.0', 1)
+        return impala_config
+
+
+class TestQuerySourceMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.query_history = QueryHistory(os.path.join(self.temp_dir.name, "query_history"), 7)
+        with open("./resources/impala_config_test.json", "r") as f:
+            self.impala_config = json.load(f)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_queries_info_at(self):
+        queries_info = get_test_queries_info([
+            ["001", REPLAY_START_TIME, 60000, "root.test_pool1", "0", "FINISHED", 500, 3],
+            ["002", REPLAY_START_TIME, 60000, "root.test_pool1", "50000", "FINISHED", 500, 3]])
+        seen_queries_info = get_queries_info_at(queries_info, REPLAY_START_TIME + timedelta(seconds=30))
+
+        self.assertEqual(seen_queries_info["query_state"].tolist(), ["RUNNING", "RUNNING"])
+        self.assertEqual(seen_queries_info["admission_wait"].tolist(), [0, 30000])
+        self.assertEqual(seen_queries_info["duration_millis"].tolist(), [30000, 0])
+        self.assertIs(get_queries_info_at(queries_info, REPLAY_START_TIME + timedelta(hours=1)), queries_info)
+
+    def test_replay_schedule(self):
+        rows = []
+        for i in range(60):
+            rows.append(["%03d" % i, REPLAY_START_TIME + timedelta(minutes=i), 120000, "root.test_pool1",
+                         "60000", "FINISHED", 100, 3])
+        self.query_history.write(get_test_queries_info(rows))
+
+        replay_source = ReplaySource(self.query_history, self.impala_config, REPLAY_START_TIME, 5)
+        schedule_times = Scheduler.replay_schedule(get_scheduler_config(), replay_source,
+                                                   REPLAY_START_TIME + timedelta(hours=1))
+
+        self.assertEqual(schedule_times, 13)
+        self.assertEqual(replay_source.now(), REPLAY_START_TIME + timedelta(minutes=65))
+        self.assertGreater(len(replay_source.refreshes), 0)
+        self.assertEqual(replay_source.get_impala_config()["items"][0]["value"], replay_source.refreshes[-1][1])
+        self.assertNotEqual(replay_source.get_impala_config(), self.impala_config)
+
+    def test_skip_concurrent_edit(self):
+        rows = []
+        for i in range(30):
+            rows.append(["%03d" % i, REPLAY_START_TIME + timedelta(minutes=i), 120000, "root.test_pool1",
+                         "60000", "FINISHED", 100, 3])
+        self.query_history.write(get_test_queries_info(rows))
+
+        scheduler_config = get_scheduler_config()
+        scheduler_config["report"] = {"enable_schedule_report": False}
+
+        replay_source = ReplaySource(self.query_history, self.impala_config, REPLAY_START_TIME + timedelta(minutes=30),
+                                     5)
+        Scheduler.execute_schedule(scheduler_config, query_source=replay_source)
+        self.assertEqual(len(replay_source.refreshes), 1)
+        # the plan equals the current memory of pools, so nothing is pushed
+        with mock.patch("scheduler.priority_schedule.PrioritySchedule.get_pools_allocated_mem",
+                        side_effect=lambda section_schedule, pools_info: {
+                            pool_name: pool_info.current_mem for pool_name, pool_info in pools_info.items()}):
+            Scheduler.execute_schedule(scheduler_config, query_source=replay_source)
+        self.assertEqual(len(replay_source.refreshes), 1)
+
+        edit_source = ConcurrentEditSource(self.query_history, self.impala_config,
+                                           REPLAY_START_TIME + timedelta(minutes=30), 5)
+        Scheduler.execute_schedule(scheduler_config, query_source=edit_source)
+        self.assertEqual(edit_source.fetches, 2)
+        self.assertEqual(edit_source.refreshes, [])
+        self.assertEqual(ReplaySource.get_impala_config(edit_source), self.impala_config)
+
+
+if __name__ == "__main__":
+    unittest.main()
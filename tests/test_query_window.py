@@ -0,0 +1,64 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from scheduler.query_window import QueryWindow
+from tests.utils import get_test_queries_info
+
+WINDOW_START_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+class TestQueryWindowMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.window_path = os.path.join(self.temp_dir.name, "query_window.pkl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_incremental_update(self):
+        query_window = QueryWindow(self.window_path)
+        self.assertEqual(query_window.get_fetch_start_time(WINDOW_START_TIME), WINDOW_START_TIME)
+
+        t1 = WINDOW_START_TIME + timedelta(minutes=1)
+        t2 = WINDOW_START_TIME + timedelta(minutes=2)
+        query_window.update(get_test_queries_info([
+            ["001", t1, 1000, "test_pool1", "0", "FINISHED", 500.0, 35],
+            ["002", t2, 1000, "test_pool1", "0", "RUNNING", 500.0, 35],
+            ["003", t2, 1000, "test_pool1", "0", "FINISHED", 500.0, 35]]))
+        self.assertEqual(query_window.watermark_time, t2)
+        self.assertEqual(query_window.size, 3)
+
+        # the uncompleted query 002 has to be fetched again
+        self.assertEqual(query_window.get_fetch_start_time(WINDOW_START_TIME), t2)
+
+        t3 = WINDOW_START_TIME + timedelta(minutes=3)
+        query_window.update(get_test_queries_info([
+            ["002", t2, 5000, "test_pool1", "0", "FINISHED", 500.0, 35],
+            ["003", t2, 1000, "test_pool1", "0", "FINISHED", 500.0, 35],
+            ["004", t3, 1000, "test_pool1", "0", "FINISHED", 500.0, 35]]))
+        self.assertEqual(query_window.watermark_time, t3)
+        self.assertEqual(query_window.get_fetch_start_time(WINDOW_START_TIME), t3)
+
+        queries_info = query_window.get_queries_info(t3)
+        self.assertEqual(sorted(queries_info["query_id"].tolist()), ["001", "002", "003", "004"])
+        self.assertEqual(queries_info.loc[queries_info["query_id"] == "002", "duration_millis"].iloc[0], 5000)
+
+    def test_evict_and_persist(self):
+        query_window = QueryWindow(self.window_path)
+        query_window.update(get_test_queries_info([
+            ["001", WINDOW_START_TIME, 1000, "test_pool1", "0", "FINISHED", 500.0, 35],
+            ["002", WINDOW_START_TIME, 120000, "test_pool1", "0", "FINISHED", 500.0, 35]]))
+        query_window.evict(WINDOW_START_TIME + timedelta(minutes=1))
+        query_window.save()
+
+        loaded_query_window = QueryWindow(self.window_path)
+        self.assertEqual(loaded_query_window.size, 1)
+        self.assertEqual(loaded_query_window.watermark_time, WINDOW_START_TIME)
+        self.assertEqual(loaded_query_window.get_queries_info(WINDOW_START_TIME)["query_id"].tolist(), ["002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import threading
+from datetime import datetime, timedelta
+
+from scheduler.queue_monitor import QueueMonitor
+
+MONITOR_TIME = datetime(2018, 2, 24, 11, 0, 0)
+
+
+class TestQueueMonitorMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.queue_monitor = QueueMonitor(60, 10)
+        self.cycles = []
+
+    def test_get_spiking_pools(self):
+        pools_wait_secs = {"root.test_pool1": 60, "root.test_pool2": 59.9, "root.not_scheduled_pool": 600}
+        self.assertEqual(self.queue_monitor.get_spiking_pools(pools_wait_secs, ["root.test_pool1", "root.test_pool2",
+                                                                                "root.test_pool3"]),
+                         ["root.test_pool1"])
+
+    def test_min_spacing(self):
+        self.assertTrue(self.queue_monitor.run_cycle(self.cycles.append, ["regular"], now=MONITOR_TIME))
+        self.assertFalse(self.queue_monitor.is_due(MONITOR_TIME + timedelta(minutes=9)))
+        self.assertFalse(self.queue_monitor.run_cycle(self.cycles.append, ["out-of-band"], out_of_band=True,
+                                                      now=MONITOR_TIME + timedelta(minutes=9)))
+        self.assertTrue(self.queue_monitor.run_cycle(self.cycles.append, ["out-of-band"], out_of_band=True,
+                                                     now=MONITOR_TIME + timedelta(minutes=10)))
+        # the regular cycle keeps its cadence
+        self.assertTrue(self.queue_monitor.run_cycle(self.cycles.append, ["regular"],
+                                                     now=MONITOR_TIME + timedelta(minutes=11)))
+        self.assertEqual(self.cycles, ["regular", "out-of-band", "regular"])
+
+    def test_exclusive_cycles(self):
+        started, finished = threading.Event(), threading.Event()
+
+        def job(name):
+            self.cycles.append(name)
+            started.set()
+            finished.wait(5)
+
+        thread = threading.Thread(target=self.queue_monitor.run_cycle, args=(job, ["regular"]))
+        thread.start()
+        started.wait(5)
+        self.assertFalse(self.queue_monitor.run_cycle(job, ["out-of-band"], out_of_band=True,
+                                                      now=datetime.now() + timedelta(hours=1)))
+        finished.set()
+        thread.join()
+        self.assertEqual(self.cycles, ["regular"])
+
+
+if __name__ == "__main__":
+    unittest.main()
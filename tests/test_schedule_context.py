@@ -0,0 +1,73 @@
+import unittest
+import json
+from unittest import mock
+
+from scheduler.check import check_required_options, check_impala_health
+from scheduler.schedule_context import ScheduleContext
+from scheduler.ttl_cache import TtlCache
+from tests.utils import get_scheduler_config
+
+TEST_ROLES = {"items": [{"type": "IMPALAD", "healthSummary": "GOOD"},
+                        {"type": "IMPALAD", "healthSummary": "GOOD"},
+                        {"type": "STATESTORE", "healthSummary": "GOOD"}]}
+
+
+class TestScheduleContextMethods(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("scheduler.cloudera_manager.ImpalaApiResource")
+        self.api_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = self.api_class.return_value
+        with open("./resources/impala_config_test.json", "r") as f:
+            self.api.get_impala_config.return_value = json.load(f)
+        self.api.get_roles.return_value = TEST_ROLES
+
+        self.scheduler_config = get_scheduler_config()
+        self.scheduler_config["cloudera_manager"] = {"server_url": "server_url", "api_version": "v17",
+                                                     "cluster_name": "cluster", "username": "username",
+                                                     "password": "password"}
+        self.scheduler_config["report"] = {"enable_schedule_report": False, "enable_monitor_report": False}
+        for pool_value in self.scheduler_config["pool"].values():
+            pool_value["min_mem"] = 1
+
+    def run_checks(self, context):
+        check_required_options(self.scheduler_config, context)
+        self.assertTrue(check_impala_health(self.scheduler_config, context))
+        return context.get_impala_scheduled_allocations()
+
+    def test_share_one_fetch_in_cycle(self):
+        context = ScheduleContext(self.scheduler_config)
+        impala_scheduled_allocations = self.run_checks(context)
+
+        self.assertIs(impala_scheduled_allocations, context.get_impala_scheduled_allocations())
+        self.assertEqual(self.api_class.call_count, 1)
+        self.assertEqual(self.api.get_impala_config.call_count, 1)
+        self.assertEqual(self.api.get_roles.call_count, 1)
+
+    def test_cache_across_cycles(self):
+        context_cache = TtlCache(3600)
+        for _ in range(3):
+            self.run_checks(ScheduleContext(self.scheduler_config, context_cache))
+
+        self.assertEqual(self.api.get_impala_config.call_count, 3)
+        self.assertEqual(self.api.get_roles.call_count, 1)
+
+        for _ in range(2):
+            self.run_checks(ScheduleContext(self.scheduler_config))
+        self.assertEqual(self.api.get_roles.call_count, 3)
+
+    def test_ttl_cache(self):
+        ttl_cache = TtlCache(0)
+        self.assertEqual(ttl_cache.get("key", lambda: 1), 1)
+        self.assertEqual(ttl_cache.get("key", lambda: 2), 2)
+
+        ttl_cache = TtlCache(3600)
+        with self.assertRaises(ValueError):
+            ttl_cache.get("key", mock.Mock(side_effect=ValueError))
+        self.assertEqual(ttl_cache.get("key", lambda: 1), 1)
+        self.assertEqual(ttl_cache.get("key", lambda: 2), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
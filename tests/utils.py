@@ -1,4 +1,5 @@
 import json
+import pandas as pd
 
 from scheduler.config_utils import ConfigUtils
 from scheduler.impala_pool_config import ImpalaScheduledAllocations
@@ -6,6 +7,11 @@ from scheduler.constants import ScheduleSectOpts
 from scheduler.base_schedule import get_pools_info
 
 
+def get_test_queries_info(rows):
+    return pd.DataFrame(data=rows, columns=["query_id", "start_time", "duration_millis", "pool",
+                                            "admission_wait", "query_state", "mem_limit", "max_host"])
+
+
 def get_impala_pool_config():
     with open("./resources/impala_config_test.json", "r") as f:
         content = f.read()